@@ -0,0 +1,107 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed; ``retry_after`` is a hint in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Allows ``rate`` requests per second on average, with bursts up to ``burst``"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take one token; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """Decides whether a request may start work on the shared inference pool.
+
+    Capacity is estimated from the pool's queue depth and a moving average of
+    how long each job has recently taken: a new job waits roughly
+    ``ceil((depth + 1) / workers) * service_time``. Requests whose estimated
+    wait exceeds ``max_wait`` are shed. Separately, each client has a token
+    bucket so a single integration cannot take the whole pool.
+    """
+
+    def __init__(self, max_wait: float = 10.0, client_rate: float = 2.0, client_burst: float = 10.0,
+                 max_clients: int = 10000, mode: str = "reject"):
+        self.max_wait = max_wait
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self.mode = mode
+        self.service_time = None
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def check_client(self, client_id: str):
+        """Raise Overloaded if ``client_id`` is over its rate limit"""
+        if not self.enabled or self.client_rate <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                bucket = self._buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_id)
+            wait = bucket.take()
+        if wait:
+            raise Overloaded("rate_limited", wait)
+
+    def estimated_wait(self, depth: int, workers: int) -> float:
+        if self.service_time is None:
+            return 0.0
+        return math.ceil((depth + 1) / max(1, workers)) * self.service_time
+
+    def check_capacity(self, depth: int, workers: int):
+        """Raise Overloaded if a new job would wait longer than ``max_wait``"""
+        if not self.enabled:
+            return
+        wait = self.estimated_wait(depth, workers)
+        if wait > self.max_wait:
+            # By then the backlog ahead of this request has drained
+            raise Overloaded("overloaded", wait - self.max_wait)
+
+    def record(self, seconds: float):
+        """Feed the duration of a finished inference job into the service time estimate"""
+        self.service_time = seconds if self.service_time is None else 0.8 * self.service_time + 0.2 * seconds
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "max_wait_s": self.max_wait,
+            "service_time_s": round(self.service_time, 4) if self.service_time is not None else None,
+            "clients": len(self._buckets)
+        }
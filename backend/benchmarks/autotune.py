@@ -0,0 +1,173 @@
+"""Choose worker, torch thread and inference pool counts for this machine.
+
+Each candidate configuration runs WORKERS processes with INFERENCE_THREADS
+scheduler threads, TORCH_THREADS intra-op and TORCH_INTEROP_THREADS inter-op
+threads each. Every process imports the app and sends the real
+generate_response workload (GPT-2 generation through the inference
+scheduler, no web search) from closed-loop clients. The total client count
+is the same for every candidate. Of the configurations whose p95 latency is
+within --p95-ms, the one with the highest throughput is written to the
+tuning file that main_distilgpt2.py reads at startup. Without one, the
+lowest-p95 configuration is written and flagged.
+
+By default the candidates split the CPUs evenly: 1, 2, 4... workers, a
+pool of 1, 2 or 4 threads, and the worker's remaining CPUs as torch
+threads per pool thread. --threads and --interop add other values to compare.
+
+Usage: python benchmarks/autotune.py [--p95-ms 3000] [--seconds 20] [--clients N]
+           [--workers 1,2,4] [--pool 1,2] [--threads 1,2] [--interop 1]
+           [--output tuning.json] [--dry-run]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# (message, intent): what reaches generate_response once templates and web search passed on it
+WORKLOAD = [
+    ("I have been thinking about learning to play the guitar", "statement"),
+    ("My favourite season is autumn because of the colours", "statement"),
+    ("What do you think about working from home?", "question"),
+    ("I am planning a trip to the mountains next month", "statement"),
+    ("How should I start a vegetable garden?", "question"),
+    ("Tell me something interesting about the ocean", "statement"),
+    ("Why do people enjoy scary movies?", "question"),
+    ("I just finished reading a long novel", "statement"),
+]
+
+
+def percentile(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000 if samples else 0.0
+
+
+def worker(clients: int, seconds: float):
+    """One server process: load the app, wait for "go", then drive generate_response"""
+    import main_distilgpt2
+    from cancellation import CancellationToken
+    assistant = main_distilgpt2.distilgpt2_assistant
+    # Warm up outside the measurement so lazy initialisation isn't counted
+    message, intent = WORKLOAD[0]
+    assistant.generate_response(message, "english", None, intent)
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+    async def client(number: int, deadline: float, latencies: list):
+        rng = random.Random(number)
+        while time.perf_counter() < deadline:
+            message, intent = rng.choice(WORKLOAD)
+            started = time.perf_counter()
+            await assistant.run_inference(assistant.generate_response, message, "english",
+                                          CancellationToken(main_distilgpt2.REQUEST_TIMEOUT), intent)
+            latencies.append(time.perf_counter() - started)
+
+    async def main():
+        latencies = []
+        started = time.perf_counter()
+        await asyncio.gather(*(client(number, started + seconds, latencies) for number in range(clients)))
+        return latencies, time.perf_counter() - started
+
+    latencies, elapsed = asyncio.run(main())
+    print(json.dumps({"latencies": latencies, "elapsed": elapsed}), flush=True)
+
+
+def measure(config: dict, clients: int, seconds: float) -> dict:
+    """Run one configuration; clients are spread over its workers"""
+    env = dict(os.environ, TUNING_FILE="", LOG_LEVEL="error", SEMANTIC_CACHE="0", PREFETCH="0",
+               REQUEST_TIMEOUT="600", INFERENCE_THREADS=str(config["INFERENCE_THREADS"]),
+               TORCH_THREADS=str(config["TORCH_THREADS"]), TORCH_INTEROP_THREADS=str(config["TORCH_INTEROP_THREADS"]))
+    workers = config["WORKERS"]
+    processes = [
+        subprocess.Popen([sys.executable, __file__, "--run", str(clients // workers + (i < clients % workers)), str(seconds)],
+                         cwd=BACKEND_DIR, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for i in range(workers)
+    ]
+    for process in processes:
+        while process.stdout.readline().strip() != "ready":
+            if process.poll() is not None:
+                raise RuntimeError(f"worker failed to start with {config}")
+    # Start every worker at once, so they compete for the CPUs as they would in production
+    for process in processes:
+        process.stdin.write("go\n")
+        process.stdin.flush()
+    latencies, elapsed = [], 0.0
+    for process in processes:
+        result = json.loads(process.stdout.read().strip().splitlines()[-1])
+        process.wait()
+        latencies += result["latencies"]
+        elapsed = max(elapsed, result["elapsed"])
+    return {
+        "throughput": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.5), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "requests": len(latencies)
+    }
+
+
+def candidates(cpus: int, workers: list, pools: list, threads: list, interops: list) -> list:
+    configs = []
+    for worker_count in workers or [n for n in (1, 2, 4, 8, 16, 32, 64) if n <= cpus]:
+        per_worker = max(1, cpus // worker_count)
+        for pool in pools or [n for n in (1, 2, 4) if n <= per_worker]:
+            for torch_threads in sorted({max(1, per_worker // pool), *threads}):
+                for interop in interops:
+                    configs.append({"WORKERS": worker_count, "INFERENCE_THREADS": pool,
+                                    "TORCH_THREADS": torch_threads, "TORCH_INTEROP_THREADS": interop})
+    return configs
+
+
+def int_list(value: str) -> list:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main():
+    from tuning import TUNING_FILE, cpu_count, save_tuning
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--p95-ms", type=float, default=3000.0, help="p95 latency target per request")
+    parser.add_argument("--seconds", type=float, default=20.0, help="measurement time per configuration")
+    parser.add_argument("--clients", type=int, default=None, help="concurrent clients in total (default: 2 per CPU)")
+    parser.add_argument("--workers", type=int_list, default=[])
+    parser.add_argument("--pool", type=int_list, default=[])
+    parser.add_argument("--threads", type=int_list, default=[], help="torch threads to try besides the even split")
+    parser.add_argument("--interop", type=int_list, default=[1])
+    parser.add_argument("--output", default=TUNING_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="don't write the tuning file")
+    args = parser.parse_args()
+
+    cpus = cpu_count()
+    clients = args.clients or 2 * cpus
+    configs = candidates(cpus, args.workers, args.pool, args.threads, args.interop)
+    print(f"{cpus} CPUs, {clients} clients, {len(configs)} configurations, {args.seconds:.0f} s each, "
+          f"p95 target {args.p95_ms:.0f} ms\n")
+    print(f"{'workers':>7} {'pool':>5} {'torch':>6} {'interop':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    results = []
+    for config in configs:
+        result = measure(config, max(clients, config["WORKERS"]), args.seconds)
+        results.append({**config, **result})
+        print(f"{config['WORKERS']:7d} {config['INFERENCE_THREADS']:5d} {config['TORCH_THREADS']:6d} "
+              f"{config['TORCH_INTEROP_THREADS']:8d} {result['throughput']:8.2f} {result['p50_ms']:8.0f} "
+              f"{result['p95_ms']:8.0f}", flush=True)
+
+    within = [result for result in results if result["p95_ms"] <= args.p95_ms]
+    best = max(within, key=lambda result: result["throughput"]) if within else min(results, key=lambda result: result["p95_ms"])
+    settings = {name: best[name] for name in ("WORKERS", "INFERENCE_THREADS", "TORCH_THREADS", "TORCH_INTEROP_THREADS")}
+    print(f"\nbest: {settings}, {best['throughput']} req/s, p95 {best['p95_ms']:.0f} ms"
+          + ("" if within else f" (no configuration met the {args.p95_ms:.0f} ms target; lowest p95 chosen)"))
+    if not args.dry_run:
+        save_tuning(settings, {"model": os.getenv("MODEL_DEFAULT", "distilgpt2"), "clients": clients, "p95_target_ms": args.p95_ms,
+                               "met_target": bool(within), "results": results}, args.output)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        worker(int(sys.argv[2]), float(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,63 @@
+"""Memory profile of the WebSocket registry with many idle connections.
+
+Usage: python benchmarks/bench_connections.py [max_connections]
+"""
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connections import ConnectionManager
+
+
+class IdleWebSocket:
+    """Stand-in for a connected client that never sends anything"""
+
+    # The handshake offered no subprotocol, so frames are JSON text
+    scope = {"subprotocols": []}
+
+    async def accept(self, subprotocol: str = None):
+        pass
+
+    async def send_text(self, message: str):
+        await asyncio.sleep(0)
+
+    async def close(self, code: int = 1000, reason: str = None):
+        pass
+
+
+async def main(max_connections: int):
+    manager = ConnectionManager()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    step = max(max_connections // 5, 1)
+
+    print(f"{'connections':>12} {'bytes total':>12} {'bytes/conn':>11}")
+    while len(manager.active_connections) < max_connections:
+        for _ in range(step):
+            await manager.connect(IdleWebSocket())
+        used = tracemalloc.get_traced_memory()[0] - baseline
+        count = len(manager.active_connections)
+        print(f"{count:>12} {used:>12} {used // count:>11}")
+
+    # One broadcast round: every connection gets a small frame and drains it
+    start = time.perf_counter()
+    for conn in list(manager.active_connections.values()):
+        manager.send(conn, '{"typing": true}')
+    while any(conn.writer for conn in manager.active_connections.values()):
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    print(f"after broadcast round: {used} bytes, {used // max_connections} bytes/conn, {elapsed * 1000:.1f}ms to drain")
+
+    for conn in list(manager.active_connections.values()):
+        manager.disconnect(conn)
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    print(f"after disconnecting all: {used} bytes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000))
@@ -0,0 +1,103 @@
+"""Conversation log: request-path cost of writing turns, and exporting in constant memory.
+
+  append    caller time per turn when each turn is committed on the spot (as
+            the sqlite state backend does) and when it is queued for the
+            batching writer, plus how long the writer needs to commit them all
+  export    peak Python memory and rate of the streaming NDJSON export over
+            the whole log, next to reading every turn in one query
+  mixed     caller time per turn while an export of the whole log runs on
+            another thread
+
+Usage: python benchmarks/bench_conversation_log.py [turns]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversations import ConversationLog
+
+MESSAGE = "What is the tallest mountain in the Alps and how high is it?"
+RESPONSE = "Mont Blanc is the highest mountain in the Alps, rising 4,806 m above sea level. " * 3
+
+
+def percentile(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1e6
+
+
+def report(label: str, samples: list):
+    print(f"{label:<28} p50 {percentile(samples, 0.5):8.1f} us   p99 {percentile(samples, 0.99):8.1f} us")
+
+
+def append_synchronously(path: str, turns: int) -> list:
+    db = sqlite3.connect(path, timeout=5, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("CREATE TABLE turns (seq INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, ts REAL, message TEXT, response TEXT)")
+    samples = []
+    for i in range(turns):
+        started = time.perf_counter()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT INTO turns (session_id, ts, message, response) VALUES (?, ?, ?, ?)",
+                       (f"session-{i % 100}", time.time(), MESSAGE, RESPONSE))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def append_queued(log: ConversationLog, turns: int) -> list:
+    samples = []
+    for i in range(turns):
+        started = time.perf_counter()
+        log.append(f"session-{i % 100}", MESSAGE, RESPONSE)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    directory = tempfile.mkdtemp()
+    print(f"{turns} turns of {len(MESSAGE) + len(RESPONSE)} characters\n")
+
+    report("append, commit per turn", append_synchronously(os.path.join(directory, "sync.db"), turns))
+    log = ConversationLog(os.path.join(directory, "log.db"), queue_size=turns)
+    samples = append_queued(log, turns)
+    started = time.perf_counter()
+    log.flush(timeout=600)
+    report("append, batched writer", samples)
+    stats = log.stats()
+    print(f"{'':<28} writer finished {time.perf_counter() - started:.2f} s later, {stats['batches']} batches, "
+          f"{stats['bytes'] / 2 ** 20:.1f} MB on disk\n")
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = len(log._db().execute("SELECT seq, session_id, ts, message, response FROM turns").fetchall())
+    elapsed = time.perf_counter() - started
+    print(f"{'export, one query':<28} {rows / elapsed:10.0f} turns/s   peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:7.1f} MB")
+    tracemalloc.reset_peak()
+    started = time.perf_counter()
+    size = sum(len(chunk) for chunk in log.export_ndjson())
+    elapsed = time.perf_counter() - started
+    print(f"{'export, streaming NDJSON':<28} {turns / elapsed:10.0f} turns/s   peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:7.1f} MB"
+          f"   ({size / 2 ** 20:.0f} MB sent)\n")
+    tracemalloc.stop()
+
+    exporting = threading.Thread(target=lambda: sum(len(chunk) for chunk in log.export_ndjson()))
+    exporting.start()
+    samples = append_queued(log, min(turns, 10000))
+    exporting.join()
+    started = time.perf_counter()
+    log.flush(timeout=600)
+    report("append during export", samples)
+    print(f"{'':<28} writer finished {time.perf_counter() - started:.2f} s after the export, "
+          f"{log.stats()['dropped']} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Caller-side cost of logging: print() vs the queued structured logger.
+
+Each scenario logs from the calling thread and reports the time the caller
+spends per record, which on the server is time the event loop is blocked:
+
+  fast      output to /dev/null
+  slow      output whose every write takes ``slow_ms`` (a stalled pipe or terminal)
+  storm     a failing upstream logging an error per request, at full speed
+
+and then the cost of one request's worth of logging (a correlation id and
+three records). For the logger, lines written and records dropped or
+suppressed by the error rate limit are shown too.
+
+Usage: python benchmarks/bench_logging.py [records] [slow_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logs import StructuredLogger, correlation_id, new_correlation_id
+
+
+class Sink:
+    """A text stream that counts lines and optionally stalls on every write"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.lines = 0
+        self.devnull = open(os.devnull, "w")
+
+    def write(self, text: str):
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += text.count("\n")
+        return self.devnull.write(text)
+
+    def flush(self):
+        self.devnull.flush()
+
+
+def timed(func, count: int) -> float:
+    """Microseconds per call"""
+    started = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def scenario(name: str, count: int, delay: float, error: bool):
+    sink = Sink(delay)
+    print_us = timed(lambda i: print(f"Upstream error: timeout after 10s ({i})" if error else f"served request {i}",
+                                     file=sink, flush=True), count)
+    printed = sink.lines
+
+    sink = Sink(delay)
+    logger = StructuredLogger(stream=sink)
+    if error:
+        log_us = timed(lambda i: logger.error("upstream_error", error="timeout after 10s", attempt=i), count)
+    else:
+        log_us = timed(lambda i: logger.info("served", request=i, tier="template"), count)
+    logger.flush()
+    stats = logger.stats()
+    print(f"{name:<6} print {print_us:8.2f} us/record ({printed} lines)   "
+          f"logger {log_us:6.2f} us/record ({sink.lines} lines, {stats['dropped']} dropped, "
+          f"{stats['suppressed']} suppressed)")
+
+
+def per_request(count: int):
+    sink = Sink()
+    logger = StructuredLogger(stream=sink)
+
+    def request(i: int):
+        correlation_id.set(new_correlation_id())
+        logger.info("wikipedia_lookup", lang="en", title="Telephone")
+        logger.info("generation", tokens=42, ms=180.5)
+        logger.info("served", tier="web_search", ms=412.0)
+
+    request_us = timed(request, count)
+    logger.flush()
+    sink_print = Sink()
+
+    def request_print(i: int):
+        print("Wikipedia lookup en Telephone", file=sink_print, flush=True)
+        print("Generated 42 tokens in 180.5 ms", file=sink_print, flush=True)
+        print("Served web_search in 412.0 ms", file=sink_print, flush=True)
+
+    print_us = timed(request_print, count)
+    print(f"request (3 records) print {print_us:6.2f} us   logger {request_us:6.2f} us, "
+          f"{sink.lines} lines written with ids")
+
+
+def main(count: int, slow_ms: float):
+    print(f"{count} records per scenario, slow writes take {slow_ms} ms")
+    scenario("fast", count, 0.0, error=False)
+    # print() blocks for every slow write, so fewer records are enough
+    scenario("slow", max(1, count // 20), slow_ms / 1000, error=False)
+    scenario("storm", count, 0.0, error=True)
+    per_request(count)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+         float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
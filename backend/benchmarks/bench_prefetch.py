@@ -0,0 +1,119 @@
+"""Follow-up latency and upstream requests with and without Wikipedia prefetch.
+
+Runs scripted conversations against the app in-process, with Wikipedia
+replaced by a local stand-in that adds a fixed latency to each request.
+Every conversation asks about a topic, pauses for the user's "think time",
+then asks about pages the answer mentioned. Each mode runs in its own
+process, since the settings are read at import.
+
+Usage: python benchmarks/bench_prefetch.py [latency_ms] [think_ms] [per_answer]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+PAGES = {
+    "Telephone": "A telephone is a telecommunications device. Alexander Graham Bell was granted the first "
+                 "patent for it in the United States in 1876.",
+    "Alexander Graham Bell": "Alexander Graham Bell was a Scottish-born inventor who was born in Edinburgh "
+                             "and later lived in Boston.",
+    "United States": "The United States is a country primarily located in North America.",
+    "Edinburgh": "Edinburgh is the capital city of Scotland.",
+    "Boston": "Boston is the capital and most populous city of Massachusetts.",
+    "Eiffel Tower": "The Eiffel Tower is a wrought-iron lattice tower in Paris, designed by the company of "
+                    "Gustave Eiffel.",
+    "Paris": "Paris is the capital and largest city of France.",
+    "Gustave Eiffel": "Gustave Eiffel was a French civil engineer.",
+    "Mona Lisa": "The Mona Lisa is a portrait by Leonardo da Vinci, displayed at the Louvre in Paris.",
+    "Leonardo da Vinci": "Leonardo da Vinci was an Italian polymath of the High Renaissance.",
+    "Louvre": "The Louvre is a national art museum in Paris, France.",
+}
+CONVERSATIONS = [
+    ["who invented the telephone?", "who was Alexander Graham Bell?", "what is Edinburgh?"],
+    ["what is the Eiffel Tower?", "who was Gustave Eiffel?", "tell me about Paris"],
+    ["who painted the Mona Lisa?", "who was Leonardo da Vinci?", "what is the Louvre?"],
+    ["what is the United States?", "what is Boston?"],
+]
+
+
+def start_stand_in(latency: float) -> dict:
+    import bench_wikipedia_batch
+    from aiohttp import web
+    bench_wikipedia_batch.PAGES.update(PAGES)
+    app = bench_wikipedia_batch.stand_in(latency)
+    ready = threading.Event()
+
+    def serve():
+        async def main():
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            app["port"] = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            await asyncio.Event().wait()
+        asyncio.run(main())
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return app
+
+
+def run(mode: str, latency_ms: float, think_ms: float, per_answer: int):
+    stand_in = start_stand_in(latency_ms / 1000)
+    os.environ.update({
+        "PREFETCH": "1" if mode == "on" else "0",
+        "PREFETCH_PER_ANSWER": str(per_answer),
+        "SEMANTIC_CACHE": "0",
+        "LOG_LEVEL": "error",
+        "WIKIPEDIA_REST_URL": f"http://127.0.0.1:{stand_in['port']}/{{lang}}/api/rest_v1/page/summary/{{title}}",
+    })
+    from fastapi.testclient import TestClient
+    import main_distilgpt2
+
+    first, follow_ups = [], []
+    with TestClient(main_distilgpt2.app) as client:
+        for number, conversation in enumerate(CONVERSATIONS):
+            for turn, question in enumerate(conversation):
+                if turn:
+                    time.sleep(think_ms / 1000)
+                started = time.perf_counter()
+                client.post("/chat", json={"message": question, "session_id": f"s{number}"})
+                (follow_ups if turn else first).append(time.perf_counter() - started)
+        prefetch = client.get("/metrics").json()["prefetch"]
+    print(json.dumps({"first": first, "follow_ups": follow_ups, "upstream": stand_in["counts"]["rest"],
+                      "prefetch": prefetch}))
+
+
+def main(latency_ms: float, think_ms: float, per_answer: int):
+    print(f"{len(CONVERSATIONS)} conversations, {latency_ms:.0f} ms per upstream request, "
+          f"{think_ms:.0f} ms think time, up to {per_answer} pages prefetched per answer\n")
+    for mode in ("off", "on"):
+        output = subprocess.run([sys.executable, __file__, "--run", mode, str(latency_ms), str(think_ms), str(per_answer)],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        follow_ups = sorted(result["follow_ups"])
+        prefetch = result["prefetch"]
+        print(f"prefetch {mode:<3}  first answer mean {sum(result['first']) / len(result['first']) * 1000:5.0f} ms  "
+              f"follow-up mean {sum(follow_ups) / len(follow_ups) * 1000:5.0f} ms  "
+              f"max {follow_ups[-1] * 1000:5.0f} ms  upstream requests {result['upstream']:3d}")
+        if mode == "on":
+            print(f"              prefetched {prefetch['stored']}  used {prefetch['hits']}  "
+                  f"hit rate {prefetch['hit_rate']}  preempted {prefetch['preempted']}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--run"]:
+        run(sys.argv[2], float(sys.argv[3]), float(sys.argv[4]), int(sys.argv[5]))
+    else:
+        main(float(sys.argv[1]) if len(sys.argv) > 1 else 100.0,
+             float(sys.argv[2]) if len(sys.argv) > 2 else 1500.0,
+             int(sys.argv[3]) if len(sys.argv) > 3 else 3)
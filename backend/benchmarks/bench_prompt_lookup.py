@@ -0,0 +1,86 @@
+"""Acceptance rate and decode speedup of prompt-lookup decoding.
+
+Each prompt is a Wikipedia-style extract followed by a question, the shape
+of a grounded answer, where the reply tends to copy spans of the context.
+Greedy decoding is run with generate() and with prompt_lookup_generate(),
+checking that both produce the same tokens; sampled decoding reports how
+many drafted tokens were accepted.
+
+Usage: python benchmarks/bench_prompt_lookup.py [model] [max_new_tokens]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+from prompt_lookup import prompt_lookup_generate
+
+PROMPTS = [
+    ("Python is a high-level, general-purpose programming language. Its design philosophy emphasizes code "
+     "readability with the use of significant indentation. Python was conceived in the late 1980s by Guido "
+     "van Rossum at Centrum Wiskunde & Informatica in the Netherlands as a successor to the ABC programming "
+     "language.", "Who created Python?"),
+    ("The Eiffel Tower is a wrought-iron lattice tower on the Champ de Mars in Paris, France. It is named "
+     "after the engineer Gustave Eiffel, whose company designed and built the tower from 1887 to 1889 as the "
+     "centerpiece of the 1889 World's Fair.", "What is the Eiffel Tower?"),
+    ("Photosynthesis is a process used by plants and other organisms to convert light energy into chemical "
+     "energy that, through cellular respiration, can later be released to fuel the organism's activities. "
+     "Some of this chemical energy is stored in carbohydrate molecules, such as sugars and starches.",
+     "What is photosynthesis?"),
+    ("The telephone is a telecommunications device that permits two or more users to conduct a conversation "
+     "when they are too far apart to be easily heard directly. Alexander Graham Bell was the first to be "
+     "granted a United States patent for a device that produced clearly intelligible replication of the "
+     "human voice.", "Who invented the telephone?"),
+]
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(model_name: str, max_new_tokens: int):
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_pretrained(model_name).eval()
+    torch.set_grad_enabled(False)
+
+    baseline_total = lookup_total = 0.0
+    greedy = {"forward_passes": 0, "drafted": 0, "accepted": 0}
+    sampled = {"forward_passes": 0, "drafted": 0, "accepted": 0}
+    mismatches = generated = 0
+    for context, question in PROMPTS:
+        inputs = tokenizer.encode(f"{context}\n\nQ: {question}\nA:", return_tensors="pt")
+        reference, baseline_s = timed(lambda: model.generate(
+            inputs, max_new_tokens=max_new_tokens, do_sample=False, pad_token_id=tokenizer.eos_token_id))
+        output, lookup_s = timed(lambda: prompt_lookup_generate(
+            model, inputs, max_new_tokens=max_new_tokens, do_sample=False,
+            eos_token_id=tokenizer.eos_token_id, stats=greedy))
+        mismatches += not torch.equal(reference, output)
+        generated += output.shape[-1] - inputs.shape[-1]
+        baseline_total += baseline_s
+        lookup_total += lookup_s
+        print(f"{question:<30} generate {baseline_s * 1e3:7.1f} ms  lookup {lookup_s * 1e3:7.1f} ms  "
+              f"speedup {baseline_s / lookup_s:4.2f}x")
+
+        torch.manual_seed(0)
+        prompt_lookup_generate(model, inputs, max_new_tokens=max_new_tokens, temperature=0.7,
+                               top_k=model.generation_config.top_k or 0,
+                               eos_token_id=tokenizer.eos_token_id, stats=sampled)
+
+    print(f"\ngreedy outputs identical to generate(): {len(PROMPTS) - mismatches}/{len(PROMPTS)}")
+    print(f"decode speedup: {baseline_total / lookup_total:.2f}x ({generated} tokens)")
+    for label, stats in (("greedy", greedy), ("sampled t=0.7", sampled)):
+        # The prefill pass over the prompt is not a decode step
+        steps = stats["forward_passes"] - len(PROMPTS)
+        rate = stats["accepted"] / stats["drafted"] if stats["drafted"] else 0.0
+        print(f"{label:<14} acceptance {rate:6.1%}  drafted {stats['drafted']:5d}  accepted {stats['accepted']:5d}  "
+              f"tokens/forward pass {(steps + stats['accepted']) / steps:4.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "distilgpt2", int(sys.argv[2]) if len(sys.argv) > 2 else 64)
@@ -0,0 +1,122 @@
+"""Hit rate and lookup cost of the semantic answer cache at 100k entries.
+
+The cache is filled with synthetic questions about distinct topics, then
+queried with paraphrases of cached questions, with and without an extra
+word (should hit the right entry), questions about unseen topics (should
+miss), and a Zipf-distributed mix.
+Near misses are questions one number, negation or word away from a cached
+one, which need a different answer: every hit on them is a wrong answer.
+
+Usage: python benchmarks/bench_semantic_cache.py [entries]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_cache import SemanticCache
+
+TEMPLATES = [
+    ("who invented the {}", "{} inventor?"),
+    ("what is the history of the {}", "history of the {}"),
+    ("tell me about the {}", "what do you know about the {}"),
+    ("how does the {} work", "how the {} works"),
+    ("who discovered the {}", "discoverer of the {}"),
+]
+
+# (cached question, a different question that must not get its answer)
+NEAR_MISSES = [
+    ("what is python 2", "what is python 3"),
+    ("when did world war 2 start", "when did world war 1 start"),
+    ("capital of australia", "capital of austria"),
+    ("how old is mount everest", "how tall is mount everest"),
+    ("is it not safe to eat raw chicken", "is it safe to eat raw chicken"),
+    ("is it safe to eat raw eggs", "isn't it safe to eat raw eggs"),
+    ("what happened in 1914", "what happened in 1918"),
+    ("population of the united states in 2010", "population of the united states in 2020"),
+    ("who was the first president of the united states", "who was the second president of the united states"),
+    ("how many legs does a spider have", "how many legs does an insect have"),
+    ("what is the boiling point of water", "what is the freezing point of water"),
+    ("can dogs eat grapes", "can dogs not eat grapes"),
+    ("largest country in europe", "smallest country in europe"),
+    ("who wrote the iliad", "who wrote the odyssey"),
+    ("capital of sweden", "capital of swaziland"),
+    ("how far is the moon", "how far is the sun"),
+    ("what is the speed of light", "what is the speed of sound"),
+    ("is coffee bad for you", "is coffee good for you"),
+    ("who invented the telephone", "who invented the television"),
+    ("when was the eiffel tower built", "when was the eiffel tower painted"),
+]
+
+ONSETS = ["b", "c", "d", "f", "g", "h", "k", "l", "m", "n", "p", "qu", "r", "s", "t", "v", "w", "z", "br", "ch", "st", "tr"]
+VOWELS = ["a", "e", "i", "o", "u", "ou", "ai", "y"]
+CODAS = ["", "", "n", "r", "s", "l", "m", "x", "nd", "st"]
+
+
+def topic(rng: random.Random) -> str:
+    """A made-up two-word topic name, e.g. 'brandol quistem'"""
+    word = lambda: "".join(rng.choice(ONSETS) + rng.choice(VOWELS) + rng.choice(CODAS) for _ in range(rng.randint(2, 3)))
+    return f"{word()} {word()}"
+
+
+def main(entries: int):
+    rng = random.Random(42)
+    cache = SemanticCache(capacity=entries)
+
+    topics = list({topic(rng) for _ in range(entries * 2)})[:entries]
+    start = time.perf_counter()
+    for i, name in enumerate(topics):
+        question, _ = TEMPLATES[i % len(TEMPLATES)]
+        cache.store(question.format(name), "english", name)
+    fill = time.perf_counter() - start
+    print(f"filled {cache.size} entries in {fill:.2f}s ({fill / cache.size * 1e6:.1f}us/store)")
+    print(f"matrix: {cache.vectors.nbytes / 2 ** 20:.1f} MB")
+
+    def run(label: str, queries: list):
+        cache.hits = cache.misses = 0
+        correct = wrong = 0
+        start = time.perf_counter()
+        for query, expected in queries:
+            value = cache.lookup(query, "english")
+            if value is not None:
+                correct += value == expected
+                wrong += value != expected
+        elapsed = time.perf_counter() - start
+        print(f"{label:<22} hit rate {cache.hits / len(queries):6.1%}  wrong answers {wrong / len(queries):6.2%}  "
+              f"{elapsed / len(queries) * 1e3:.3f} ms/lookup")
+
+    sample = rng.sample(range(len(topics)), 1000)
+    run("exact repeats", [(TEMPLATES[i % len(TEMPLATES)][0].format(topics[i]), topics[i]) for i in sample])
+    run("paraphrases", [(TEMPLATES[i % len(TEMPLATES)][1].format(topics[i]), topics[i]) for i in sample])
+    # An extra content word on one side is still the same question
+    run("paraphrases + word", [("briefly, " + TEMPLATES[i % len(TEMPLATES)][1].format(topics[i]), topics[i])
+                               for i in sample])
+    unseen = [name for name in {topic(rng) for _ in range(3000)} if name not in set(topics)][:1000]
+    run("unseen topics", [(TEMPLATES[i % len(TEMPLATES)][0].format(name), None) for i, name in enumerate(unseen)])
+
+    weights = [1 / (rank + 1) for rank in range(len(topics))]
+    mix = []
+    for i in rng.choices(range(len(topics)), weights=weights, k=1000):
+        question, paraphrase = TEMPLATES[i % len(TEMPLATES)]
+        mix.append(((question if rng.random() < 0.5 else paraphrase).format(topics[i]), topics[i]))
+    run("zipf mix", mix)
+
+    for cached, _ in NEAR_MISSES:
+        cache.store(cached, "english", cached)
+    run("near misses", [(query, None) for _, query in NEAR_MISSES])
+    # A made-up topic with a number added, a negation added, or one word swapped for another topic's
+    synthetic = []
+    for n, i in enumerate(sample):
+        question = TEMPLATES[i % len(TEMPLATES)][0]
+        first, second = topics[i].split()
+        other = topics[(i + 1) % len(topics)].split()[1]
+        synthetic.append(([question.format(f"{topics[i]} 2"), "not " + question.format(topics[i]),
+                           question.format(f"{first} {other}")][n % 3], None))
+    run("synthetic near misses", synthetic)
+    print(f"lookups turned down by the conflict check: {cache.near_misses}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,129 @@
+"""Wikipedia 404 rate before and after the title index, and its lookup cost.
+
+For each query, the legacy cleaner (raw str.replace of question words) and
+the tokenizer-based normalizer plus title index each pick the page to
+request; a request "404s" if that page is not in the title list. The
+legacy path gets the benefit of the doubt on letter case (Wikipedia only
+normalises the first letter, so many of its requests would 404 even
+when the words are right). With the index, a miss skips the request.
+
+The index is padded with random titles to measure memory and lookup time
+at dump scale.
+
+Usage: python benchmarks/bench_wiki_titles.py [titles_file] [queries_file] [padding]
+       titles_file: one title per line, e.g. enwiki-latest-all-titles-in-ns0.gz
+       queries_file: one "query" or "language<TAB>query" per line
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wiki_titles import TitleIndex, query_candidates, title_key
+
+TITLES = [
+    "Telephone", "Eiffel_Tower", "Paris", "France", "Photosynthesis", "Python_(programming_language)",
+    "Albert_Einstein", "Theory_of_relativity", "Moon_landing", "Apollo_11", "World_War_II", "Great_Wall_of_China",
+    "Mount_Everest", "Leonardo_da_Vinci", "Mona_Lisa", "Black_hole", "Quantum_mechanics", "DNA",
+    "Artificial_intelligence", "Machine_learning", "Bitcoin", "Climate_change", "Amazon_rainforest",
+    "William_Shakespeare", "Hamlet", "Internet", "Electricity", "Gravity", "Solar_System", "Jupiter",
+    "Teléfono", "Torre_Eiffel", "Fotosíntesis", "Inteligencia_artificial", "Cambio_climático",
+]
+REDIRECTS = [("Capital_of_France", "Paris"), ("Python_language", "Python_(programming_language)"),
+             ("Einstein", "Albert_Einstein"), ("AI", "Artificial_intelligence"), ("Global_warming", "Climate_change")]
+QUERIES = [
+    ("english", "Who invented the telephone?"), ("english", "What is the Eiffel Tower"),
+    ("english", "what is the capital of France"), ("english", "How does photosynthesis work?"),
+    ("english", "Tell me about Albert Einstein"), ("english", "who was einstein"),
+    ("english", "what is the theory of relativity"), ("english", "When was the moon landing"),
+    ("english", "what happened in world war II"), ("english", "how tall is mount everest"),
+    ("english", "who painted the Mona Lisa"), ("english", "what is a black hole"),
+    ("english", "explain quantum mechanics"), ("english", "what is DNA"),
+    ("english", "what is artificial intelligence"), ("english", "what is the current bitcoin price"),
+    ("english", "what is global warming"), ("english", "who wrote hamlet"),
+    ("english", "somewhat interesting facts about jupiter"), ("english", "how does the internet work"),
+    ("english", "what is the weather like tomorrow"), ("english", "who won the game last night"),
+    ("english", "what should I cook for dinner"), ("english", "how are you doing today"),
+    ("english", "what is the latest news"), ("english", "why is the sky blue"),
+    ("spanish", "¿Quién inventó el teléfono?"), ("spanish", "¿Qué es la fotosíntesis?"),
+    ("spanish", "háblame de la torre eiffel"), ("spanish", "¿Qué es el cambio climático?"),
+    ("spanish", "¿Cuál es el clima hoy en Madrid?"),
+]
+LANG_CODES = {'english': 'en', 'spanish': 'es', 'french': 'fr', 'german': 'de', 'portuguese': 'pt', 'italian': 'it'}
+
+
+def legacy_clean(query: str) -> str:
+    """The str.replace cleaner this index replaces"""
+    question_words = ['what', 'who', 'where', 'when', 'why', 'how', 'qué', 'quién', 'dónde', 'cuándo', 'por qué',
+                      'comment', 'où', 'qui', 'wie', 'was', 'wer']
+    cleaned = query.lower()
+    for word in question_words:
+        cleaned = cleaned.replace(word, '').strip()
+    return re.sub(r'[^\w\s]', '', cleaned).strip()[:50]
+
+
+def write_lines(lines: list) -> str:
+    f = tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8")
+    f.write("\n".join(lines) + "\n")
+    f.close()
+    return f.name
+
+
+def main(titles_path: str = None, queries_path: str = None, padding: int = 1000000):
+    rng = random.Random(0)
+    if queries_path:
+        with open(queries_path, encoding="utf-8") as f:
+            queries = [tuple(line.rstrip("\n").split("\t", 1)) if "\t" in line else ("english", line.strip())
+                       for line in f if line.strip()]
+    else:
+        queries = QUERIES
+
+    redirects_path = None
+    if not titles_path:
+        filler = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 14))).capitalize()
+                  for _ in range(padding)]
+        titles_path = write_lines(["page_title"] + TITLES + filler)
+        redirects_path = write_lines([f"{source}\t{target}" for source, target in REDIRECTS])
+
+    index = TitleIndex()
+    start = time.perf_counter()
+    for lang_code in sorted({LANG_CODES.get(language, 'en') for language, _ in queries}):
+        index.load(lang_code, titles_path, redirects_path)
+    print(f"loaded {index.stats()} in {time.perf_counter() - start:.1f}s")
+
+    legacy_requests = legacy_404 = indexed_requests = indexed_404 = 0
+    elapsed = 0.0
+    for language, query in queries:
+        lang_code = LANG_CODES.get(language, 'en')
+        cleaned = legacy_clean(query)
+        if cleaned:
+            legacy_requests += 1
+            legacy_404 += index.lookup(lang_code, title_key(cleaned)) is None
+
+        start = time.perf_counter()
+        title = index.resolve(lang_code, query_candidates(query, language))
+        elapsed += time.perf_counter() - start
+        if title is not None:
+            indexed_requests += 1
+            # A title from a stale or partial index can still 404; here the index is the ground truth
+            indexed_404 += index.lookup(lang_code, title_key(title)) is None
+        print(f"  {query[:42]:<42} legacy {cleaned[:28]!r:<30} -> indexed {title!r}")
+
+    print(f"\nqueries: {len(queries)}")
+    print(f"legacy:  {legacy_requests} Wikipedia requests, {legacy_404} 404s "
+          f"({legacy_404 / max(1, legacy_requests):.0%} of requests)")
+    print(f"indexed: {indexed_requests} Wikipedia requests, {indexed_404} 404s "
+          f"({indexed_404 / max(1, indexed_requests):.0%} of requests), "
+          f"{len(queries) - indexed_requests} skipped locally")
+    print(f"wasted round-trips: legacy {legacy_404}, indexed {indexed_404}; "
+          f"lookup cost {elapsed / len(queries) * 1e6:.1f}us/query")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None,
+         sys.argv[2] if len(sys.argv) > 2 else None,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 1000000)
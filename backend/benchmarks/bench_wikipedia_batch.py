@@ -0,0 +1,170 @@
+"""Round-trips per answered question: REST summaries vs one batched action=query.
+
+Starts a local stand-in for Wikipedia that serves both the REST summary
+endpoint and action=query&prop=extracts (with title normalisation,
+redirects, missing and disambiguation pages) and adds a fixed latency to
+every request. Each query's candidate titles are then resolved three ways:
+
+  rest-first  one REST request for the first candidate (the default mode)
+  rest-each   REST requests for each candidate in turn until one answers
+  batch       one action=query request for all candidates
+
+and the batched pick is checked against rest-each, which sees the same
+candidates one at a time.
+
+Usage: python benchmarks/bench_wikipedia_batch.py [latency_ms] [batch_titles]
+"""
+import asyncio
+import os
+import sys
+import time
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+from aiohttp import web
+
+import wiki_api
+from wiki_titles import query_candidates
+
+PAGES = {
+    "Telephone": "A telephone is a telecommunications device that permits two or more users to conduct a conversation.",
+    "Eiffel Tower": "The Eiffel Tower is a wrought-iron lattice tower on the Champ de Mars in Paris, France.",
+    "Paris": "Paris is the capital and largest city of France.",
+    "France": "France is a country located primarily in Western Europe.",
+    "Photosynthesis": "Photosynthesis is a system of biological processes by which organisms convert light energy.",
+    "Mercury": "Mercury may refer to:",
+    "Mercury (planet)": "Mercury is the first planet from the Sun and the smallest in the Solar System.",
+    "Planet": "A planet is a large, rounded astronomical body that is generally required to be in orbit around a star.",
+    "Albert Einstein": "Albert Einstein was a German-born theoretical physicist.",
+    "Black hole": "A black hole is a massive, compact astronomical object so dense that its gravity prevents anything from escaping.",
+    "Mona Lisa": "The Mona Lisa is a half-length portrait painting by the Italian artist Leonardo da Vinci.",
+    "Bitcoin": "Bitcoin is the first decentralized cryptocurrency.",
+    "Climate change": "Present-day climate change includes both global warming and its effects on Earth's weather patterns.",
+    "Teléfono": "El teléfono es un dispositivo de telecomunicación diseñado para transmitir señales acústicas.",
+}
+REDIRECTS = {
+    "Eiffel tower": "Eiffel Tower",
+    "Capital of France": "Paris",
+    "Einstein": "Albert Einstein",
+    "Planet mercury": "Mercury (planet)",
+    "Global warming": "Climate change",
+    "Mona lisa": "Mona Lisa",
+    "Black holes": "Black hole",
+}
+QUERIES = [
+    ("english", "Who invented the telephone?"), ("english", "What is the Eiffel Tower"),
+    ("english", "what is the capital of France"), ("english", "how does photosynthesis work"),
+    ("english", "tell me about the planet mercury"), ("english", "who was einstein"),
+    ("english", "what is a black hole"), ("english", "who painted the mona lisa"),
+    ("english", "what is the current bitcoin price"), ("english", "what is global warming doing to france"),
+    ("english", "what is the weather like tomorrow"), ("spanish", "¿Quién inventó el teléfono?"),
+]
+LANG_CODES = {'english': 'en', 'spanish': 'es'}
+
+
+def normalize(title: str) -> str:
+    title = unquote(title).replace("_", " ").strip()
+    return title[:1].upper() + title[1:]
+
+
+def stand_in(latency: float) -> web.Application:
+    """Just enough of Wikipedia's two APIs, with every request taking ``latency`` seconds"""
+    counts = {"rest": 0, "action": 0}
+
+    async def summary(request: web.Request):
+        counts["rest"] += 1
+        await asyncio.sleep(latency)
+        title = REDIRECTS.get(normalize(request.match_info["title"]), normalize(request.match_info["title"]))
+        if title not in PAGES:
+            return web.json_response({"title": "Not found."}, status=404)
+        return web.json_response({"title": title, "extract": PAGES[title]})
+
+    async def action(request: web.Request):
+        counts["action"] += 1
+        await asyncio.sleep(latency)
+        normalized, redirects, pages = [], [], []
+        for title in request.query["titles"].split("|"):
+            name = normalize(title)
+            if name != title:
+                normalized.append({"from": title, "to": name})
+            if name in REDIRECTS:
+                redirects.append({"from": name, "to": REDIRECTS[name]})
+                name = REDIRECTS[name]
+            if name in PAGES:
+                pages.append({"title": name, "extract": PAGES[name]})
+            else:
+                pages.append({"title": name, "missing": True})
+        return web.json_response({"batchcomplete": True, "query": {
+            "normalized": normalized, "redirects": redirects, "pages": pages}})
+
+    app = web.Application()
+    app["counts"] = counts
+    app.router.add_get("/{lang}/api/rest_v1/page/summary/{title}", summary)
+    app.router.add_get("/{lang}/w/api.php", action)
+    return app
+
+
+def usable(extract) -> bool:
+    return bool(extract) and not any(marker in extract[:200].lower() for marker in wiki_api.DISAMBIGUATION)
+
+
+async def main(latency_ms: float, batch_titles: int):
+    app = stand_in(latency_ms / 1000)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    rest_url = f"http://127.0.0.1:{port}/{{lang}}/api/rest_v1/page/summary/{{title}}"
+    action_url = f"http://127.0.0.1:{port}/{{lang}}/w/api.php"
+
+    totals = {name: {"answered": 0, "requests": 0, "seconds": 0.0} for name in ("rest-first", "rest-each", "batch")}
+    agree = 0
+    async with aiohttp.ClientSession() as session:
+        for language, query in QUERIES:
+            lang = LANG_CODES[language]
+            titles = query_candidates(query, language)[:batch_titles]
+
+            started = time.perf_counter()
+            _, extract = await wiki_api.fetch_summary(session, lang, titles[0], 10, rest_url) if titles else (None, None)
+            totals["rest-first"]["seconds"] += time.perf_counter() - started
+            totals["rest-first"]["requests"] += bool(titles)
+            totals["rest-first"]["answered"] += usable(extract)
+
+            started = time.perf_counter()
+            each = None
+            for title in titles:
+                totals["rest-each"]["requests"] += 1
+                _, extract = await wiki_api.fetch_summary(session, lang, title, 10, rest_url)
+                if usable(extract):
+                    each = extract
+                    break
+            totals["rest-each"]["seconds"] += time.perf_counter() - started
+            totals["rest-each"]["answered"] += each is not None
+
+            started = time.perf_counter()
+            best = wiki_api.best_extract(await wiki_api.fetch_extracts(session, lang, titles, 10, action_url), titles)
+            totals["batch"]["seconds"] += time.perf_counter() - started
+            totals["batch"]["requests"] += bool(titles)
+            totals["batch"]["answered"] += best is not None
+
+            batched = best[1] if best else None
+            agree += batched == each
+            print(f"  {query[:40]:<40} {len(titles)} candidates -> {best[0] if best else None!r}"
+                  f"{'' if batched == each else '  MISMATCH'}")
+
+    await runner.cleanup()
+    print(f"\n{len(QUERIES)} queries, {latency_ms:.0f} ms per upstream request, up to {batch_titles} titles per batch")
+    for name, total in totals.items():
+        per_answer = total["requests"] / max(1, total["answered"])
+        print(f"{name:<10} answered {total['answered']:2d}  requests {total['requests']:3d}  "
+              f"requests/answer {per_answer:4.2f}  total {total['seconds'] * 1000:7.0f} ms")
+    print(f"batch picks the same extract as rest-each: {agree}/{len(QUERIES)}")
+    print(f"stand-in served {app['counts']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 100.0,
+                     int(sys.argv[2]) if len(sys.argv) > 2 else 5))
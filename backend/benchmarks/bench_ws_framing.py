@@ -0,0 +1,88 @@
+"""Bytes per frame and encode/decode cost: JSON vs the MessagePack subprotocol.
+
+Replays a typical /ws session (typing indicators, template, web search and
+generated answers in several languages, errors) through both
+codecs. Sizes are shown raw and after permessage-deflate, compressed here
+with zlib the way the extension does it (raw deflate, sync flush, trailing
+0x00 0x00 0xff 0xff dropped), both with context takeover (the default,
+one compressor per connection) and without it.
+
+Usage: python benchmarks/bench_ws_framing.py [repeat]
+"""
+import os
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framing import JSON, SUBPROTOCOLS, MsgpackCodec
+
+ANSWERS = [
+    ("Hello! How can I assist you today?", "greeting", 0.9, "english", "Templates"),
+    ("According to my web search: A telephone is a telecommunications device that permits two or more users "
+     "to conduct a conversation when they are too far apart to be easily heard directly.", "question", 0.9,
+     "english", "Web Search + Free AI"),
+    ("Según mi búsqueda en la web: El teléfono es un dispositivo de telecomunicación diseñado para transmitir "
+     "señales acústicas a distancia por medio de señales eléctricas.", "question", 0.9, "spanish",
+     "Web Search + Free AI"),
+    ("I think that depends on what you want to do next. Tell me a bit more and I will try to help.",
+     "statement", 0.6, "english", "Free AI"),
+    ("Merci ! N'hésitez pas si vous avez d'autres questions.", "thanks", 0.9, "french", "Templates"),
+    ("Die Hauptstadt von Deutschland ist Berlin, die auch die größte Stadt des Landes ist.", "question",
+     0.9, "german", "Web Search + Free AI"),
+]
+
+
+def session() -> list:
+    """Server frames of one conversation, in order"""
+    frames = []
+    for number, (response, intent, confidence, language, model_used) in enumerate(ANSWERS):
+        frames.append({"typing": True, "id": number})
+        frames.append({"response": response, "intent": intent, "confidence": confidence,
+                       "language": language, "model_used": model_used, "id": number})
+    frames.append({"error": "Server busy", "busy": True, "retry_after": 2.5, "id": len(ANSWERS)})
+    return frames
+
+
+def deflated(payloads: list, takeover: bool) -> int:
+    total = 0
+    compressor = zlib.compressobj(wbits=-15)
+    for payload in payloads:
+        if not takeover:
+            compressor = zlib.compressobj(wbits=-15)
+        data = payload.encode("utf-8") if isinstance(payload, str) else payload
+        chunk = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        total += len(chunk) - 4
+    return total
+
+
+def per_frame_us(func, items: list, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for item in items:
+            func(item)
+    return (time.perf_counter() - started) / (repeat * len(items)) * 1e6
+
+
+def main(repeat: int):
+    frames = session()
+    codecs = [JSON] + [codec for codec in SUBPROTOCOLS.values() if isinstance(codec, MsgpackCodec)]
+    if len(codecs) == 1:
+        print("msgpack is not installed; showing JSON only")
+    print(f"{len(frames)} frames per session, timings over {repeat} sessions\n")
+    print(f"{'encoding':<12} {'raw B/frame':>12} {'deflate B/frame':>16} {'no-takeover B/frame':>20} "
+          f"{'encode us':>10} {'decode us':>10}")
+    for codec in codecs:
+        payloads = [codec.encode(frame) for frame in frames]
+        for frame, payload in zip(frames, payloads):
+            assert codec.decode(payload) == frame
+        raw = sum(len(payload.encode("utf-8") if isinstance(payload, str) else payload) for payload in payloads)
+        encode_us = per_frame_us(codec.encode, frames, repeat)
+        decode_us = per_frame_us(codec.decode, payloads, repeat)
+        print(f"{codec.label:<12} {raw / len(frames):12.1f} {deflated(payloads, True) / len(frames):16.1f} "
+              f"{deflated(payloads, False) / len(frames):20.1f} {encode_us:10.2f} {decode_us:10.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
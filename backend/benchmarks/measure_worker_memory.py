@@ -0,0 +1,125 @@
+"""Per-worker unique memory and startup time for each weight loading mode.
+
+Starts N processes that load distilgpt2 and run one forward pass, then reads
+/proc/<pid>/smaps_rollup (Linux) for each of them. "unique" is the memory only
+that worker holds (Private_Clean + Private_Dirty); "pss" splits shared pages
+between the processes sharing them, so its sum is the real footprint.
+
+Usage: python benchmarks/measure_worker_memory.py [max_workers] [modes...]
+       e.g. python benchmarks/measure_worker_memory.py 8 private mmap fork
+"""
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+MODEL_NAME = "distilgpt2"
+
+
+def warm_up(model):
+    import torch
+    with torch.no_grad():
+        model(torch.tensor([[464, 2068, 7586, 21831]]))
+
+
+def worker(mode: str):
+    os.environ["WEIGHT_LOADING"] = mode
+    from weights import load_model
+    model = load_model(MODEL_NAME)
+    warm_up(model)
+    print(f"ready {os.getpid()}", flush=True)
+    sys.stdin.read()
+
+
+def preload(count: int):
+    """Load once, then fork ``count`` workers that share the weights"""
+    import gc
+    from weights import load_model
+    model = load_model(MODEL_NAME)
+    gc.collect()
+    gc.freeze()
+    children = []
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            warm_up(model)
+            print(f"ready {os.getpid()}", flush=True)
+            sys.stdin.read()
+            os._exit(0)
+        children.append(pid)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+def smaps(pid: int) -> dict:
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return values
+
+
+def measure(mode: str, count: int) -> dict:
+    started = time.perf_counter()
+    if mode == "fork":
+        procs = [subprocess.Popen([sys.executable, __file__, "--preload", str(count)],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)]
+    else:
+        procs = [subprocess.Popen([sys.executable, __file__, "--worker", mode],
+                                  stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+                 for _ in range(count)]
+
+    pids = []
+    for proc in procs:
+        while len(pids) < count:
+            line = proc.stdout.readline()
+            if not line:
+                break
+            pids.append(int(line.split()[1]))
+            if mode != "fork":
+                break
+    elapsed = time.perf_counter() - started
+
+    usage = [smaps(pid) for pid in pids]
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+
+    unique = [u.get("Private_Clean", 0) + u.get("Private_Dirty", 0) for u in usage]
+    return {
+        "startup_s": elapsed,
+        "unique_mb": sum(unique) / len(unique) / 2 ** 20,
+        "pss_total_mb": sum(u.get("Pss", 0) for u in usage) / 2 ** 20,
+        "rss_mb": sum(u.get("Rss", 0) for u in usage) / len(usage) / 2 ** 20
+    }
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    modes = sys.argv[2:] or ["private", "mmap", "fork"]
+    if "mmap" in modes:
+        from weights import export_weights
+        export_weights(MODEL_NAME)
+
+    print(f"{'mode':<8} {'workers':>7} {'startup s':>10} {'rss MB':>8} {'unique MB':>10} {'total PSS MB':>13}")
+    count = 1
+    while count <= max_workers:
+        for mode in modes:
+            result = measure(mode, count)
+            print(f"{mode:<8} {count:>7} {result['startup_s']:>10.2f} {result['rss_mb']:>8.1f} "
+                  f"{result['unique_mb']:>10.1f} {result['pss_total_mb']:>13.1f}")
+        count *= 2
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--worker":
+        worker(sys.argv[2])
+    elif len(sys.argv) > 2 and sys.argv[1] == "--preload":
+        preload(int(sys.argv[2]))
+    else:
+        main()
@@ -0,0 +1,165 @@
+"""Re-drive a server from a traffic capture log, keeping the original timing.
+
+Each captured request is sent at its original offset from the first one,
+divided by --speed, over /chat or multiplexed over a few /ws connections
+(as it was captured, unless --channel overrides it). Reports status
+counts, latency percentiles, how late requests were sent, and how the
+served tiers compare with the capture.
+
+The server rate-limits each client address (CLIENT_RATE_LIMIT, default 5
+requests per second), and every replayed request comes from this host, so
+start the server with CLIENT_RATE_LIMIT=0 unless the limit is what is being
+tested; otherwise most of a busy capture comes back as rate_limited.
+
+Usage: python benchmarks/replay_traffic.py capture.jsonl [--url http://127.0.0.1:8006]
+           [--speed 1] [--limit N] [--channel http|ws] [--ws-connections 8]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+
+from capture import read_capture
+
+
+def percentile(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000 if samples else 0.0
+
+
+class WebSocketPool:
+    """A few /ws connections with requests multiplexed by id"""
+
+    def __init__(self, session: aiohttp.ClientSession, url: str, size: int):
+        self.session = session
+        self.url = url.replace("http", "ws", 1) + "/ws"
+        self.size = size
+        self.sockets = []
+        self.pending = {}
+        self.ids = itertools.count()
+        self.readers = []
+
+    async def start(self):
+        for _ in range(self.size):
+            ws = await self.session.ws_connect(self.url, max_msg_size=0)
+            self.sockets.append(ws)
+            self.readers.append(asyncio.create_task(self._read(ws)))
+
+    async def _read(self, ws):
+        async for frame in ws:
+            data = json.loads(frame.data)
+            future = self.pending.get(data.get("id"))
+            if future is None or data.get("typing"):
+                continue
+            if not future.done():
+                future.set_result(data)
+
+    async def ask(self, message: str) -> tuple:
+        request_id = next(self.ids)
+        future = self.pending[request_id] = asyncio.get_running_loop().create_future()
+        await self.sockets[request_id % self.size].send_str(json.dumps({"id": request_id, "message": message}))
+        try:
+            data = await future
+        finally:
+            del self.pending[request_id]
+        if "response" in data:
+            return "ok", data.get("model_used")
+        return ("busy" if data.get("busy") else "timeout" if "timed out" in data.get("error", "") else "error"), None
+
+    async def close(self):
+        for reader in self.readers:
+            reader.cancel()
+        for ws in self.sockets:
+            await ws.close()
+
+
+async def ask_http(session: aiohttp.ClientSession, url: str, message: str) -> tuple:
+    async with session.post(url + "/chat", json={"message": message}) as response:
+        if response.status == 200:
+            return "ok", (await response.json()).get("model_used")
+        return {429: "rate_limited", 503: "busy", 504: "timeout"}.get(response.status, "error"), None
+
+
+async def replay(args):
+    records = [record for record in read_capture(args.log) if record.get("msg")]
+    records.sort(key=lambda record: record["ts"])
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("no records")
+        return
+    span = records[-1]["ts"] - records[0]["ts"]
+    print(f"{len(records)} requests over {span:.1f}s captured; replaying at {args.speed}x "
+          f"({span / args.speed:.1f}s)")
+
+    latencies, lateness = [], []
+    statuses, served = Counter(), Counter()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        pool = None
+        if args.channel == "ws" or (args.channel is None and any(record.get("ch") == "ws" for record in records)):
+            pool = WebSocketPool(session, args.url, args.ws_connections)
+            await pool.start()
+
+        async def send(record: dict, due: float):
+            lateness.append(max(0.0, time.perf_counter() - due))
+            channel = args.channel or record.get("ch", "http")
+            started = time.perf_counter()
+            try:
+                if channel == "ws":
+                    status, model = await pool.ask(record["msg"])
+                else:
+                    status, model = await ask_http(session, args.url, record["msg"])
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status, model = "error", None
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+            if model:
+                served[model] += 1
+
+        start = time.perf_counter()
+        origin = records[0]["ts"]
+        tasks = []
+        for record in records:
+            due = start + (record["ts"] - origin) / args.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(record, due)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - start
+        if pool:
+            await pool.close()
+
+    print(f"sent {len(records)} in {elapsed:.1f}s ({len(records) / elapsed:.1f} req/s)")
+    print(f"send lateness p50 {percentile(lateness, 0.5):.1f} ms  p99 {percentile(lateness, 0.99):.1f} ms")
+    print(f"latency p50 {percentile(latencies, 0.5):.0f} ms  p95 {percentile(latencies, 0.95):.0f} ms  "
+          f"p99 {percentile(latencies, 0.99):.0f} ms")
+    print(f"status   replay {dict(statuses)}  captured {dict(Counter(record.get('status') for record in records))}")
+    print(f"served   replay {dict(served)}  captured {dict(Counter(record.get('model') for record in records if record.get('model')))}")
+    if statuses.get("rate_limited"):
+        print("requests were rate limited: restart the server with CLIENT_RATE_LIMIT=0 to replay from one host")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log")
+    parser.add_argument("--url", default="http://127.0.0.1:8006")
+    parser.add_argument("--speed", type=float, default=1.0, help="2 replays twice as fast")
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--channel", choices=["http", "ws"], default=None)
+    parser.add_argument("--ws-connections", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(replay(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
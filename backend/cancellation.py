@@ -0,0 +1,58 @@
+import threading
+import time
+
+
+class RequestCancelled(Exception):
+    """Raised when a request's cancellation token fires before it completes"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancellationToken:
+    """Cancellation flag shared between the event loop and inference threads.
+
+    A token fires when ``cancel`` is called (client disconnected or sent a
+    cancel message), when its deadline passes, or when its parent fires.
+    """
+
+    def __init__(self, timeout: float = None, parent: "CancellationToken" = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.parent = parent
+        self.reason = None
+        self._event = threading.Event()
+
+    def child(self) -> "CancellationToken":
+        """A token that can be cancelled on its own but also fires with this one"""
+        return CancellationToken(parent=self)
+
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("deadline")
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            self.cancel(self.parent.reason)
+            return True
+        return False
+
+    def remaining(self, default: float = None) -> float:
+        """Seconds left before the deadline, capped at ``default``"""
+        if self.parent is not None:
+            default = self.parent.remaining(default)
+        if self.deadline is None:
+            return default
+        left = max(0.0, self.deadline - time.monotonic())
+        return left if default is None else min(left, default)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise RequestCancelled(self.reason)
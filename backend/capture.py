@@ -0,0 +1,92 @@
+import json
+import os
+import random
+import re
+from collections import Counter
+
+from logs import logger
+from semantic_cache import normalize_query
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+_URL = re.compile(r"https?://\S+|www\.\S+")
+# Nine or more digits, optionally separated: phone and card numbers, not years
+_NUMBER = re.compile(r"(?<!\w)\+?\(?\d(?:[\s().-]{0,2}\d){8,}")
+
+
+def anonymize(text: str) -> str:
+    """Replace e-mail addresses, URLs and phone or card numbers with placeholders"""
+    text = _EMAIL.sub("<email>", text)
+    text = _URL.sub("<url>", text)
+    return _NUMBER.sub("<number>", text)
+
+
+class TrafficCapture:
+    """Appends one compact JSON line per request to a capture log.
+
+    Records hold the anonymised message, detected language and intent, the
+    tier that answered, the start time and duration, but no session or
+    client identifiers. Each record is a single O_APPEND write, so workers
+    sharing the file never interleave lines.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.records = 0
+        self._fd = None
+        self._pid = None
+
+    def _file(self) -> int:
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def record(self, channel: str, message: str, started: float, seconds: float, language: str = None,
+               intent: str = None, model_used: str = None, status: str = "ok"):
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        line = json.dumps({
+            "ts": round(started, 3),
+            "ch": channel,
+            "msg": anonymize(message),
+            "lang": language,
+            "intent": intent,
+            "model": model_used,
+            "ms": round(seconds * 1000, 1),
+            "status": status
+        }, ensure_ascii=False, separators=(",", ":"))
+        try:
+            os.write(self._file(), (line + "\n").encode("utf-8"))
+            self.records += 1
+        except OSError as e:
+            logger.error("capture_error", error=repr(e))
+
+
+def read_capture(path: str):
+    """Records of a capture log in file order, skipping torn or invalid lines"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def top_queries(records, k: int, intents: set = None) -> list:
+    """The ``k`` most frequent answered queries as (message, language, count).
+
+    Queries count as the same when their normalised words match; the most
+    recent wording is kept.
+    """
+    counts = Counter()
+    latest = {}
+    for record in records:
+        if record.get("status") != "ok" or not record.get("lang") or not record.get("msg"):
+            continue
+        if intents is not None and record.get("intent") not in intents:
+            continue
+        key = (record["lang"], " ".join(normalize_query(record["msg"], record["lang"])))
+        counts[key] += 1
+        latest[key] = record["msg"]
+    return [(latest[key], key[0], count) for key, count in counts.most_common(k)]
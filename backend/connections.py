@@ -0,0 +1,145 @@
+import asyncio
+import os
+import uuid
+from collections import Counter, deque
+from typing import Dict
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from framing import JSON, negotiate
+from logs import logger
+
+# Measured cost of an idle connection (benchmarks/bench_connections.py), socket buffers excluded
+CONNECTION_OVERHEAD = 1024
+
+
+class Connection:
+    """One WebSocket client, its frame encoding and its bounded outbound queue"""
+    __slots__ = ("id", "websocket", "codec", "outbox", "writer", "closed")
+
+    def __init__(self, websocket: WebSocket, codec=JSON):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.codec = codec
+        self.outbox = deque()
+        self.writer = None
+        self.closed = False
+
+
+class ConnectionManager:
+    """Registry of live WebSocket connections keyed by connection id.
+
+    Sends never block the caller: messages go onto the connection's outbox and
+    a writer task drains it. The writer only exists while there is something
+    to send, so idle connections cost a dict entry and an empty deque. A client
+    whose outbox overflows, or whose socket write stalls, is evicted. Dead
+    peers are detected by uvicorn's protocol-level pings (see run() in
+    main_distilgpt2.py), which every WebSocket client answers on its own.
+
+    Frames are JSON text unless the client asks for one of ``subprotocols``
+    (see framing.py) in its handshake.
+    """
+
+    def __init__(self, subprotocols: dict = None):
+        self.subprotocols = subprotocols or {}
+        self.active_connections: Dict[str, Connection] = {}
+        self.queue_size = int(os.getenv("WS_QUEUE_SIZE", "32"))
+        self.send_timeout = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+        self.evicted = 0
+
+    async def connect(self, websocket: WebSocket) -> Connection:
+        codec = negotiate(websocket.scope.get("subprotocols", []), self.subprotocols)
+        await websocket.accept(subprotocol=codec.subprotocol)
+        conn = Connection(websocket, codec)
+        self.active_connections[conn.id] = conn
+        return conn
+
+    def disconnect(self, conn: Connection):
+        conn.closed = True
+        conn.outbox.clear()
+        self.active_connections.pop(conn.id, None)
+        if conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    async def receive_frame(self, conn: Connection):
+        """Next client frame, text or binary, still encoded"""
+        message = await conn.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        return message["text"] if message.get("text") is not None else message.get("bytes")
+
+    def send(self, conn: Connection, message) -> bool:
+        """Queue an encoded frame (str for text, bytes for binary); returns False if the
+        connection is gone or was evicted"""
+        if conn.closed:
+            return False
+        if len(conn.outbox) >= self.queue_size:
+            self.evicted += 1
+            logger.warning("websocket_evicted", connection=conn.id, reason="outbound queue overflow")
+            self._close(conn, 1013, "Outbound queue overflow")
+            return False
+        conn.outbox.append(message)
+        if conn.writer is None:
+            conn.writer = asyncio.create_task(self._drain(conn))
+        return True
+
+    def send_json(self, conn: Connection, data: dict) -> bool:
+        """Queue ``data`` in the connection's negotiated encoding"""
+        return self.send(conn, conn.codec.encode(data))
+
+    async def _drain(self, conn: Connection):
+        try:
+            while conn.outbox:
+                message = conn.outbox.popleft()
+                send = conn.websocket.send_bytes if isinstance(message, bytes) else conn.websocket.send_text
+                await asyncio.wait_for(send(message), self.send_timeout)
+        except asyncio.TimeoutError:
+            self.evicted += 1
+            logger.warning("websocket_evicted", connection=conn.id, reason="send timeout")
+            self._close(conn, 1013, "Send timeout")
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            self.disconnect(conn)
+        finally:
+            conn.writer = None
+
+    def _close(self, conn: Connection, code: int, reason: str):
+        self.disconnect(conn)
+        asyncio.create_task(self._close_socket(conn.websocket, code, reason))
+
+    async def _close_socket(self, websocket: WebSocket, code: int, reason: str):
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    async def close(self, connections: list, code: int, reason: str, farewell: dict = None,
+                    flush_timeout: float = 2.0) -> int:
+        """Close ``connections`` with ``code`` after sending ``farewell`` and any queued
+        frames; writers get ``flush_timeout`` seconds in total"""
+        if farewell is not None:
+            for conn in connections:
+                self.send_json(conn, farewell)
+        writers = [conn.writer for conn in connections if conn.writer is not None]
+        if writers:
+            await asyncio.wait(writers, timeout=flush_timeout)
+        for conn in connections:
+            self.disconnect(conn)
+        await asyncio.gather(*(self._close_socket(conn.websocket, code, reason) for conn in connections))
+        return len(connections)
+
+    async def close_all(self, code: int, reason: str, farewell: dict = None, flush_timeout: float = 2.0) -> int:
+        return await self.close(list(self.active_connections.values()), code, reason, farewell, flush_timeout)
+
+    def memory_usage(self) -> int:
+        """Per-connection overhead plus the frames waiting in outboxes"""
+        return sum(CONNECTION_OVERHEAD + sum(len(frame) for frame in conn.outbox)
+                   for conn in list(self.active_connections.values()))
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self.active_connections),
+            "encodings": dict(Counter(conn.codec.label for conn in list(self.active_connections.values()))),
+            "evicted": self.evicted
+        }
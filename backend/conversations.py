@@ -0,0 +1,261 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from logs import logger
+
+# Rows deleted per transaction by compaction, so writers are never locked out for long
+COMPACT_CHUNK = 10000
+
+
+class ConversationLog:
+    """Every conversation turn, in an append-only SQLite table in WAL mode.
+
+    ``append`` only queues the turn; a background thread commits queued turns
+    in batches of up to ``batch_size``, waiting up to ``flush_interval``
+    seconds for a batch to fill. If more than ``queue_size`` turns are
+    waiting, new ones are dropped and counted. Turns get increasing sequence
+    numbers that are never reused, so readers page through the log with a
+    ``seq`` cursor and never hold a transaction open between pages.
+
+    Every ``compact_interval`` seconds the writer drops turns older than
+    ``retention_days`` and the oldest turns beyond ``max_turns`` (0 disables
+    either), a chunk at a time, then returns the freed pages to the
+    filesystem and checkpoints the WAL.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.1, queue_size: int = 10000,
+                 retention_days: float = 0, max_turns: int = 0, compact_interval: float = 3600):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.retention_days = retention_days
+        self.max_turns = max_turns
+        self.compact_interval = compact_interval
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.compactions = 0
+        self.deleted = 0
+        self._local = threading.local()
+        self._reset()
+        self._db().executescript("""
+            CREATE TABLE IF NOT EXISTS turns (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                ts REAL NOT NULL,
+                message TEXT NOT NULL,
+                response TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, seq);
+        """)
+        # The writer thread does not survive fork; children start their own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._turns = deque()
+        self._batch = []
+        # Turns moved into batches, and turns whose batch has been written (or failed)
+        self._taken = 0
+        self._finished = 0
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writing = False
+        self._compacted = time.monotonic()
+
+    def _db(self) -> sqlite3.Connection:
+        # A connection inherited across fork() must not be used by the child
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            # Only takes effect while the database is still empty, so it has to come first
+            db.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def append(self, session_id: str, message: str, response: str, ts: float = None) -> bool:
+        """Queue a turn for the writer; returns False if the queue is full"""
+        if len(self._turns) >= self.queue_size:
+            self.dropped += 1
+            return False
+        self._turns.append((session_id, time.time() if ts is None else ts, message, response))
+        if self._writer is None:
+            self._start()
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+        return True
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write, name="conversation_writer", daemon=True)
+                self._writer.start()
+
+    def _write(self):
+        turns = self._turns
+        while True:
+            woken = self._wakeup.wait(self._until_compaction())
+            self._writing = True
+            self._wakeup.clear()
+            if woken and len(turns) < self.batch_size:
+                # Let a few more turns arrive so they share one commit
+                time.sleep(self.flush_interval)
+            while turns:
+                # Moved in one step, so history() always finds a turn in one of the two
+                with self._lock:
+                    self._batch = batch = [turns.popleft() for _ in range(min(len(turns), self.batch_size))]
+                    self._taken += len(batch)
+                try:
+                    db = self._db()
+                    with db:
+                        db.execute("BEGIN IMMEDIATE")
+                        db.executemany("INSERT INTO turns (session_id, ts, message, response) VALUES (?, ?, ?, ?)",
+                                       batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    self.dropped += len(batch)
+                    logger.error("conversation_write_error", turns=len(batch), error=repr(e))
+                self._finished += len(batch)
+                self._batch = []
+            self._writing = False
+            if self._until_compaction() == 0:
+                try:
+                    self.compact()
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    logger.error("conversation_compact_error", error=repr(e))
+
+    def _until_compaction(self) -> float:
+        if not self.compact_interval or not (self.retention_days or self.max_turns):
+            return None
+        return max(0.0, self._compacted + self.compact_interval - time.monotonic())
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until every queued turn is committed, or ``timeout`` seconds pass"""
+        deadline = time.monotonic() + timeout
+        while self._writer is not None and (self._turns or self._writing or self._wakeup.is_set()):
+            if time.monotonic() > deadline:
+                return
+            time.sleep(0.001)
+
+    def compact(self) -> int:
+        """Apply the retention limits now; returns the number of turns deleted"""
+        self._compacted = time.monotonic()
+        db = self._db()
+        cutoff = 0
+        if self.max_turns:
+            row = db.execute("SELECT seq FROM turns ORDER BY seq DESC LIMIT 1 OFFSET ?", (self.max_turns,)).fetchone()
+            if row is not None:
+                cutoff = row[0]
+        if self.retention_days:
+            # Turns are appended in time order, so the first one new enough ends the expired range
+            row = db.execute("SELECT seq FROM turns WHERE ts >= ? ORDER BY seq LIMIT 1",
+                             (time.time() - self.retention_days * 86400,)).fetchone()
+            expired = row[0] - 1 if row is not None else db.execute("SELECT max(seq) FROM turns").fetchone()[0]
+            cutoff = max(cutoff, expired or 0)
+        deleted = 0
+        low = db.execute("SELECT min(seq) FROM turns").fetchone()[0]
+        while low is not None and low <= cutoff:
+            high = min(cutoff, low + COMPACT_CHUNK - 1)
+            deleted += db.execute("DELETE FROM turns WHERE seq <= ?", (high,)).rowcount
+            low = high + 1
+        if deleted:
+            # execute() would step it once and free a single page
+            db.executescript("PRAGMA incremental_vacuum;")
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            logger.info("conversations_compacted", deleted=deleted, cutoff=cutoff)
+        self.compactions += 1
+        self.deleted += deleted
+        return deleted
+
+    def history(self, session_id: str, limit: int = 10, before: int = None) -> list:
+        """The session's last ``limit`` turns (before the ``before`` cursor, if given),
+        oldest first; turns still queued are included and have no ``seq`` yet"""
+        if limit <= 0:
+            return []
+        query = ("SELECT seq, session_id, ts, message, response FROM turns WHERE session_id = ? AND seq < ? "
+                 "ORDER BY seq DESC LIMIT ?", (session_id, before if before is not None else 2 ** 63 - 1, limit))
+        if before is not None:
+            return [_turn(*row) for row in reversed(self._db().execute(*query).fetchall())]
+        for _ in range(3):
+            with self._lock:
+                first = self._taken - len(self._batch)
+                pending = [(first + i, turn) for i, turn in enumerate([*self._batch, *self._turns])
+                           if turn[0] == session_id][-limit:]
+            finished = self._finished
+            rows = self._db().execute(*query).fetchall()
+            # Otherwise a batch was committed around the query and may be missing from it
+            if self._finished == finished:
+                break
+        # Turns of finished batches are committed (or lost) and older than the rows
+        pending = [turn for i, turn in pending if i >= finished]
+        # The batch being written may be committed but not yet counted as finished
+        committed = {row[1:4] for row in rows}
+        turns = [_turn(*row) for row in reversed(rows)]
+        turns += [_turn(None, *turn) for turn in pending if turn[:3] not in committed]
+        return turns[-limit:]
+
+    def export(self, cursor: int = 0, session_id: str = None, limit: int = None, page_size: int = 1000):
+        """Committed turns after ``cursor`` in order, as pages of at most ``page_size`` dicts.
+
+        Each page is a separate short read, so memory stays constant however
+        many turns there are and the writer is never held up; resume an
+        interrupted export from the last ``seq`` received.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            if session_id is None:
+                rows = self._db().execute(
+                    "SELECT seq, session_id, ts, message, response FROM turns WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (cursor, size)
+                ).fetchall()
+            else:
+                rows = self._db().execute(
+                    "SELECT seq, session_id, ts, message, response FROM turns WHERE session_id = ? AND seq > ? "
+                    "ORDER BY seq LIMIT ?",
+                    (session_id, cursor, size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [_turn(*row) for row in rows]
+            cursor = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+
+    def export_ndjson(self, cursor: int = 0, session_id: str = None, limit: int = None, page_size: int = 1000):
+        """``export`` as newline-delimited JSON, one chunk per page"""
+        for page in self.export(cursor, session_id, limit, page_size):
+            yield "".join([json.dumps(turn, ensure_ascii=False) + "\n" for turn in page])
+
+    def stats(self) -> dict:
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ("", "-wal") if os.path.exists(self.path + suffix))
+        return {
+            "queued": len(self._turns) + len(self._batch),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "compactions": self.compactions,
+            "deleted": self.deleted,
+            "bytes": size
+        }
+
+
+def _turn(seq: int, session_id: str, ts: float, message: str, response: str) -> dict:
+    return {"seq": seq, "session_id": session_id, "message": message, "response": response,
+            "timestamp": datetime.fromtimestamp(ts).isoformat()}
@@ -0,0 +1,74 @@
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Short names for the keys that appear in every frame; other keys are sent as they are
+SHORT_KEYS = {
+    "response": "r",
+    "intent": "i",
+    "confidence": "c",
+    "language": "l",
+    "model_used": "m",
+    "typing": "t",
+    "error": "e",
+    "busy": "b",
+    "retry_after": "ra",
+    "cancelled": "x",
+    "message": "q",
+    "session_id": "s",
+    "priority": "p",
+    "model": "md",
+    "type": "ty",
+}
+LONG_KEYS = {short: key for key, short in SHORT_KEYS.items()}
+
+
+class JsonCodec:
+    """JSON text frames; what every client gets unless it negotiates otherwise"""
+    subprotocol = None
+    label = "JSON"
+
+    def encode(self, data: dict) -> str:
+        return json.dumps(data)
+
+    def decode(self, frame) -> dict:
+        if not isinstance(frame, str):
+            raise ValueError("expected a text frame")
+        return json.loads(frame)
+
+
+class MsgpackCodec:
+    """MessagePack binary frames with the SHORT_KEYS names.
+
+    Repeated key names shrink to one or two bytes and values are sent in
+    binary, so frames are smaller and cheaper to encode than JSON.
+    """
+    subprotocol = "chat.msgpack.v1"
+    label = "MessagePack"
+
+    def encode(self, data: dict) -> bytes:
+        return msgpack.packb({SHORT_KEYS.get(key, key): value for key, value in data.items()})
+
+    def decode(self, frame) -> dict:
+        if not isinstance(frame, bytes):
+            raise ValueError("expected a binary frame")
+        data = msgpack.unpackb(frame)
+        if not isinstance(data, dict):
+            raise ValueError("expected a map")
+        return {LONG_KEYS.get(key, key): value for key, value in data.items()}
+
+
+JSON = JsonCodec()
+# Subprotocols a client can ask for in Sec-WebSocket-Protocol; MessagePack needs the msgpack package
+SUBPROTOCOLS = {MsgpackCodec.subprotocol: MsgpackCodec()} if msgpack is not None else {}
+
+
+def negotiate(offered: list, supported: dict):
+    """The first subprotocol the client offered that we support, else JSON"""
+    for name in offered:
+        if name in supported:
+            return supported[name]
+    return JSON
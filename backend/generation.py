@@ -0,0 +1,87 @@
+import re
+
+from transformers import StoppingCriteria
+
+from cancellation import CancellationToken
+
+# A sentence ends with . ! or ? (optionally followed by a closing quote or
+# bracket), but not in a number like "3.5"
+SENTENCE_END = re.compile(r"[^\d\s][.!?][\"')\]]?$")
+# GPT-2 tends to continue with a new speaker turn or paragraph; stop there
+TURN_BOUNDARIES = ("\n\n", "\nUser:", "\nQ:", "\nA:", "\nAssistant:", "\nYou:")
+
+
+class CancellationCriteria(StoppingCriteria):
+    """Stops generate() between decode steps once the request is cancelled"""
+
+    def __init__(self, cancel_token: CancellationToken):
+        self.cancel_token = cancel_token
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.cancel_token.cancelled
+
+
+class SentenceBoundaryCriteria(StoppingCriteria):
+    """Stops at the first sentence or turn boundary once ``min_tokens`` are generated.
+
+    Only the newest token is decoded at each step, so the check costs the same
+    however long the reply gets.
+    """
+
+    def __init__(self, tokenizer, prompt_length: int, min_tokens: int = 8):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.min_tokens = min_tokens
+        self.text = ""
+        self.at_boundary = False
+
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        self.text += self.tokenizer.decode(input_ids[0, -1:])
+        if any(boundary in self.text for boundary in TURN_BOUNDARIES):
+            self.at_boundary = True
+        elif input_ids.shape[-1] - self.prompt_length >= self.min_tokens:
+            self.at_boundary = SENTENCE_END.search(self.text.rstrip()) is not None
+        return self.at_boundary
+
+
+class GenerationBudget:
+    """Number of new tokens a reply may use.
+
+    Each intent has its own budget; while the inference queue is deeper than
+    the number of inference threads, budgets shrink so the backlog drains
+    faster, down to ``min_tokens``.
+    """
+
+    def __init__(self, budgets: dict = None, default: int = 64, min_tokens: int = 16, shrink: float = 0.5):
+        self.budgets = budgets or {}
+        self.default = default
+        self.min_tokens = min_tokens
+        self.shrink = shrink
+
+    def for_request(self, intent: str, queue_depth: int = 0, workers: int = 1) -> int:
+        backlog = max(0, queue_depth - workers)
+        scale = 1 / (1 + self.shrink * backlog)
+        return max(self.min_tokens, int(self.budgets.get(intent, self.default) * scale))
+
+
+def parse_budgets(spec: str) -> dict:
+    """Parse ``question=96,statement=64`` into a dict"""
+    budgets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        intent, _, value = item.partition("=")
+        budgets[intent.strip()] = int(value)
+    return budgets
+
+
+def finalize_text(text: str, max_chars: int = 500) -> str:
+    """Cut a generated reply at its turn boundary and its last complete sentence"""
+    for boundary in TURN_BOUNDARIES:
+        index = text.find(boundary)
+        if index != -1:
+            text = text[:index]
+    text = text.strip()[:max_chars]
+    if SENTENCE_END.search(text):
+        return text
+    # Drop a trailing half sentence, unless that would leave nothing
+    last_end = max(text.rfind(". "), text.rfind("! "), text.rfind("? "))
+    return text[:last_end + 1] if last_end > 0 else text
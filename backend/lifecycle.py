@@ -0,0 +1,95 @@
+import asyncio
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import uvicorn
+
+from admission import Overloaded
+from logs import logger
+
+
+class Lifecycle:
+    """Stops admitting work on shutdown and waits for the work already admitted.
+
+    Requests run inside ``request()`` so they can be counted. Once ``drain``
+    starts, ``admit`` raises Overloaded with a ``reconnect_after`` hint; drain
+    waits up to ``timeout`` seconds for the in-flight requests and then runs
+    the ``on_drained`` hooks, e.g. to close WebSockets with a reconnect frame.
+    """
+
+    def __init__(self, timeout: float = 30.0, reconnect_after: float = 5.0):
+        self.timeout = timeout
+        self.reconnect_after = reconnect_after
+        self.draining = False
+        self.in_flight = 0
+        self.counts = Counter()
+        self._hooks = []
+        self._started = None
+
+    def on_drained(self, hook):
+        """Register a coroutine function to run once in-flight requests finish or time out"""
+        self._hooks.append(hook)
+
+    def admit(self):
+        if self.draining:
+            self.counts["rejected"] += 1
+            raise Overloaded("draining", self.reconnect_after)
+
+    @contextmanager
+    def request(self):
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    async def drain(self, timeout: float = None, stop=None) -> int:
+        """Stop admitting requests and wait for the in-flight ones; returns how many are left.
+
+        ``stop`` is polled while waiting; once it returns true the wait ends early.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        if not self.draining:
+            self.draining = True
+            self._started = time.monotonic()
+            logger.info("drain_started", in_flight=self.in_flight, timeout=timeout)
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline and not (stop and stop()):
+            await asyncio.sleep(0.05)
+        remaining = self.in_flight
+        self.counts["abandoned"] += remaining
+        for hook in self._hooks:
+            try:
+                await hook()
+            except Exception as e:
+                logger.error("drain_hook_error", error=repr(e))
+        log = logger.warning if remaining else logger.info
+        log("drain_done", remaining=remaining, seconds=round(time.monotonic() - self._started, 2))
+        return remaining
+
+    def stats(self) -> dict:
+        return {
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "draining_seconds": round(time.monotonic() - self._started, 1) if self._started else None,
+            "rejected": self.counts["rejected"],
+            "abandoned": self.counts["abandoned"]
+        }
+
+
+class GracefulServer(uvicorn.Server):
+    """uvicorn server that drains ``lifecycle`` on SIGTERM/SIGINT before closing connections.
+
+    uvicorn's own shutdown closes every connection first and only then waits
+    for tasks, so in-flight WebSocket answers would be lost. A second SIGINT
+    skips the rest of the drain.
+    """
+
+    def __init__(self, config: uvicorn.Config, lifecycle: Lifecycle):
+        super().__init__(config)
+        self.lifecycle = lifecycle
+
+    async def shutdown(self, sockets=None):
+        await self.lifecycle.drain(stop=lambda: self.force_exit)
+        await super().shutdown(sockets=sockets)
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+
+import torch
+from transformers import StoppingCriteriaList
+
+from cancellation import CancellationToken, RequestCancelled
+from generation import CancellationCriteria, SentenceBoundaryCriteria, GenerationBudget, parse_budgets, finalize_text
+from logs import logger
+from metrics import metrics
+from models import ModelRegistry, ModelUnavailable, parse_models
+from prompt_lookup import prompt_lookup_generate
+from tracing import tracer
+
+# This module is only imported when the gpt2 provider is enabled: it is what
+# brings in torch and transformers
+
+# New-token budgets per intent; shrunk automatically while the inference queue is deep
+generation_budget = GenerationBudget(
+    budgets=parse_budgets(os.getenv("GENERATION_BUDGETS", "greeting=32,thanks=32,goodbye=32,question=96,statement=64")),
+    default=int(os.getenv("GENERATION_DEFAULT_BUDGET", "64")),
+    min_tokens=int(os.getenv("GENERATION_MIN_BUDGET", "16")),
+    shrink=float(os.getenv("GENERATION_LOAD_SHRINK", "0.5"))
+)
+
+# Causal LMs that can answer, as name=Hugging Face id. Models load on first
+# use and are unloaded least recently used once they exceed MODEL_MEMORY_MB
+MODELS = parse_models(os.getenv("MODELS", "distilgpt2=distilgpt2,gpt2=gpt2,multilingual=facebook/xglm-564M"))
+MODEL_DEFAULT = os.getenv("MODEL_DEFAULT", "distilgpt2")
+# Model per detected language, e.g. "spanish=multilingual,french=multilingual"
+MODEL_LANGUAGES = parse_models(os.getenv("MODEL_LANGUAGES", ""))
+MODEL_MEMORY_CAP = int(float(os.getenv("MODEL_MEMORY_MB", "0")) * 2 ** 20)
+# A model that failed to load isn't retried for this long
+MODEL_RETRY_SECONDS = float(os.getenv("MODEL_RETRY_SECONDS", "300"))
+# Precision the models load at; POST /admin/models/{name}/swap can change it per model
+MODEL_DTYPE = os.getenv("MODEL_DTYPE", "float32")
+
+# Draft tokens by n-gram lookup in the prompt and verify them in one forward pass
+PROMPT_LOOKUP = os.getenv("PROMPT_LOOKUP", "0") == "1"
+PROMPT_LOOKUP_DRAFT = int(os.getenv("PROMPT_LOOKUP_DRAFT", "8"))
+
+
+class LocalModel:
+    """Answers from the causal LMs in ``models``, run in this process.
+
+    ``generate_response`` blocks, so it runs on the inference scheduler's
+    threads; ``queue_depth()`` and ``threads`` describe that scheduler, and
+    budgets shrink while it is backed up.
+    """
+
+    def __init__(self, queue_depth, threads: int):
+        self.queue_depth = queue_depth
+        self.threads = threads
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        logger.info("device", device=self.device)
+        
+        # The default model loads now (before any fork, so workers share it);
+        # the others on first use
+        self.models = ModelRegistry(MODELS, MODEL_DEFAULT, MODEL_LANGUAGES, self.device, MODEL_MEMORY_CAP,
+                                    MODEL_RETRY_SECONDS, MODEL_DTYPE)
+        try:
+            self.models.load(MODEL_DEFAULT)
+        except ModelUnavailable:
+            pass
+        # Running average of seconds per generated token, used to price cancelled work
+        self.token_seconds = None
+        # Bytes held in key/value caches by generations in progress
+        self.kv_bytes = 0
+        self._kv_lock = threading.Lock()
+    
+    def generate_response(self, message: str, language: str = 'en', cancel_token: CancellationToken = None, intent: str = 'statement', context: str = None) -> str:
+        model_name = self.models.select(language)
+        if not self.models.available(model_name):
+            return "I'm having trouble with my AI model right now. Please try again later."
+        
+        entry = None
+        try:
+            budget = generation_budget.for_request(intent, self.queue_depth(), self.threads)
+            if cancel_token and cancel_token.cancelled:
+                # Cancelled while queued for the inference pool: nothing was decoded
+                metrics.inc("generation.cancelled_before_start")
+                metrics.inc("generation.tokens_saved", budget)
+                raise RequestCancelled(cancel_token.reason)
+            entry = self.models.acquire(model_name)
+            model, tokenizer = entry.model, entry.tokenizer
+
+            # Add context about multilingual capabilities
+            context_prompt = f"You are a multilingual AI assistant. Respond in {language} if the message is in {language}. Be helpful and conversational."
+            
+            prompt = f"{context}\n\nQ: {message}\nA:" if context else message
+            with tracer.span("tokenize"):
+                inputs = tokenizer.encode(prompt, return_tensors='pt')
+                inputs = inputs.to(self.device)
+            
+            prompt_length = inputs.shape[-1]
+            boundary = SentenceBoundaryCriteria(tokenizer, prompt_length)
+            stopping_criteria = StoppingCriteriaList([boundary])
+            if cancel_token:
+                stopping_criteria.append(CancellationCriteria(cancel_token))
+            # Upper bound on this generation's key/value cache, for memory accounting
+            kv_bytes = (prompt_length + budget) * entry.kv_bytes_per_token
+            self.add_kv_bytes(kv_bytes)
+            try:
+                started = time.perf_counter()
+                with tracer.span("generate", model=model_name, prompt_tokens=prompt_length, budget=budget), torch.no_grad():
+                    if PROMPT_LOOKUP:
+                        lookup_stats = {}
+                        outputs = prompt_lookup_generate(
+                            model,
+                            inputs,
+                            max_new_tokens=budget,
+                            temperature=0.7,
+                            top_k=model.generation_config.top_k or 0,
+                            eos_token_id=tokenizer.eos_token_id,
+                            stopping_criteria=stopping_criteria,
+                            num_draft=PROMPT_LOOKUP_DRAFT,
+                            stats=lookup_stats
+                        )
+                        for name, value in lookup_stats.items():
+                            metrics.inc(f"prompt_lookup.{name}", value)
+                    else:
+                        outputs = model.generate(
+                            inputs,
+                            max_new_tokens=budget,
+                            num_return_sequences=1,
+                            temperature=0.7,
+                            pad_token_id=tokenizer.eos_token_id,
+                            do_sample=True,
+                            stopping_criteria=stopping_criteria
+                        )
+            finally:
+                self.add_kv_bytes(-kv_bytes)
+            self._record_generation(prompt_length, outputs.shape[-1], budget, time.perf_counter() - started, cancel_token)
+            metrics.inc("generation.stopped_at_boundary" if boundary.at_boundary else "generation.budget_exhausted")
+            
+            # Only the new tokens: the prompt is not echoed back
+            with tracer.span("decode"):
+                response = tokenizer.decode(outputs[0, prompt_length:], skip_special_tokens=True)
+                response = finalize_text(response)
+                metrics.inc("generation.tokens_delivered", len(tokenizer.encode(response)) if response else 0)
+            return response or "I'm having trouble generating a response right now."
+        
+        except ModelUnavailable:
+            return "I'm having trouble with my AI model right now. Please try again later."
+        except RequestCancelled:
+            raise
+        except Exception as e:
+            logger.error("generation_error", model=model_name, error=repr(e))
+            return "I'm having trouble generating a response right now."
+        finally:
+            if entry is not None:
+                self.models.release(entry)
+    
+    def add_kv_bytes(self, count: int):
+        with self._kv_lock:
+            self.kv_bytes += count
+    
+    def kv_cache_bytes(self) -> int:
+        return self.kv_bytes
+    
+    def _record_generation(self, prompt_tokens: int, total_tokens: int, budget: int, seconds: float, cancel_token: CancellationToken = None):
+        new_tokens = total_tokens - prompt_tokens
+        metrics.inc("generation.tokens_generated", new_tokens)
+        if new_tokens > 0:
+            per_token = seconds / new_tokens
+            self.token_seconds = per_token if self.token_seconds is None else 0.9 * self.token_seconds + 0.1 * per_token
+        
+        if cancel_token and cancel_token.cancelled:
+            saved = max(0, budget - new_tokens)
+            metrics.inc("generation.cancelled")
+            metrics.inc("generation.tokens_saved", saved)
+            if self.token_seconds is not None:
+                metrics.inc("generation.seconds_saved", saved * self.token_seconds)
+            cancel_token.raise_if_cancelled()
@@ -0,0 +1,198 @@
+import atexit
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+# json.dumps with options builds a new encoder on every call
+_encode = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+# Correlation id of the request being handled; set by the endpoints
+correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+
+def new_correlation_id(supplied: str = None) -> str:
+    """A caller-supplied id if it is short and printable, else a fresh random one"""
+    if supplied and len(supplied) <= 64 and supplied.isprintable():
+        return supplied
+    return os.urandom(8).hex()
+
+
+class _Budget:
+    """Token bucket for one event name, counting what it suppressed"""
+    __slots__ = ("tokens", "updated", "suppressed")
+
+    def __init__(self, burst: float):
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.suppressed = 0
+
+
+class StructuredLogger:
+    """Structured log records written by a background thread.
+
+    Callers only build a dict and append it to a bounded deque; JSON encoding
+    and the write to the stream happen on the writer thread, which wakes at
+    most every ``flush_interval`` seconds, so a slow or blocked stdout never
+    stalls the event loop. When the queue is full, records are dropped and
+    counted, and once the writer catches up it writes a
+    ``log_records_dropped`` warning with the number lost. Warnings and errors
+    are rate limited per event name (``error_rate`` per second after a burst
+    of ``error_burst``) and the next record that gets through carries the
+    number suppressed, so a failing upstream cannot flood the output.
+    """
+
+    def __init__(self, stream=None, level: str = "info", fmt: str = "json", queue_size: int = 50000,
+                 error_rate: float = 1.0, error_burst: float = 10.0, flush_interval: float = 0.05):
+        self.stream = stream or sys.stdout
+        self.flush_interval = flush_interval
+        self.level = LEVELS.get(level, LEVELS["info"])
+        self.fmt = fmt
+        self.error_rate = error_rate
+        self.error_burst = error_burst
+        self.queue_size = queue_size
+        self.dropped = 0
+        self.reported = 0
+        self.suppressed = 0
+        self._records = deque()
+        self._wakeup = threading.Event()
+        self._writing = False
+        self._budgets = {}
+        self._lock = threading.Lock()
+        self._writer = None
+        # The writer thread does not survive fork; children start their own
+        os.register_at_fork(after_in_child=self._reset)
+
+    def debug(self, event: str, **fields):
+        self.log("debug", event, **fields)
+
+    def info(self, event: str, **fields):
+        self.log("info", event, **fields)
+
+    def warning(self, event: str, **fields):
+        self.log("warning", event, **fields)
+
+    def error(self, event: str, **fields):
+        self.log("error", event, **fields)
+
+    def log(self, level: str, event: str, **fields):
+        if LEVELS[level] < self.level:
+            return
+        if LEVELS[level] >= LEVELS["warning"] and self.error_rate > 0:
+            suppressed = self._admit(event)
+            if suppressed is None:
+                return
+            if suppressed:
+                fields["suppressed"] = suppressed
+        record = {"ts": time.time(), "level": level, "event": event}
+        current = correlation_id.get()
+        if current is not None:
+            record["request_id"] = current
+        record.update(fields)
+        if len(self._records) >= self.queue_size:
+            self.dropped += 1
+            return
+        self._records.append(record)
+        if self._writer is None:
+            self._start()
+        if not self._wakeup.is_set():
+            self._wakeup.set()
+
+    def _admit(self, event: str):
+        """None if the event is over its rate, else how many were suppressed since the last one"""
+        now = time.monotonic()
+        with self._lock:
+            budget = self._budgets.get(event)
+            if budget is None:
+                budget = self._budgets[event] = _Budget(self.error_burst)
+            budget.tokens = min(self.error_burst, budget.tokens + (now - budget.updated) * self.error_rate)
+            budget.updated = now
+            if budget.tokens < 1:
+                budget.suppressed += 1
+                self.suppressed += 1
+                return None
+            budget.tokens -= 1
+            suppressed, budget.suppressed = budget.suppressed, 0
+            return suppressed
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write, name="log_writer", daemon=True)
+                self._writer.start()
+
+    def _reset(self):
+        self._records.clear()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._writing = False
+        self._writer = None
+
+    def format(self, record: dict) -> str:
+        if self.fmt == "text":
+            ts = time.strftime("%H:%M:%S", time.localtime(record["ts"]))
+            extra = " ".join(f"{key}={value}" for key, value in record.items() if key not in ("ts", "level", "event"))
+            return f"{ts} {record['level'].upper():<7} {record['event']} {extra}".rstrip()
+        return _encode(record)
+
+    def _write(self):
+        records = self._records
+        while True:
+            self._wakeup.wait()
+            self._writing = True
+            self._wakeup.clear()
+            # Let records pile up so the writer takes the GIL once per batch, not once per record
+            time.sleep(self.flush_interval)
+            while records:
+                # Everything queued so far goes out in one write
+                batch = [records.popleft() for _ in range(min(len(records), 1024))]
+                try:
+                    self.stream.write("".join([self.format(record) + "\n" for record in batch]))
+                    self.stream.flush()
+                except Exception:
+                    self.dropped += len(batch)
+            if self.dropped > self.reported:
+                self._report_dropped()
+            self._writing = False
+
+    def _report_dropped(self):
+        dropped, self.reported = self.dropped - self.reported, self.dropped
+        try:
+            self.stream.write(self.format({"ts": time.time(), "level": "warning", "event": "log_records_dropped",
+                                           "dropped": dropped}) + "\n")
+            self.stream.flush()
+        except Exception:
+            pass
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until every queued record is written, or ``timeout`` seconds pass"""
+        deadline = time.monotonic() + timeout
+        while self._writer is not None and (self._records or self._writing or self._wakeup.is_set()):
+            if time.monotonic() > deadline:
+                return
+            time.sleep(0.001)
+
+    def stats(self) -> dict:
+        return {"queued": len(self._records), "dropped": self.dropped, "suppressed": self.suppressed}
+
+
+# LOG_QUEUE_SIZE bounds the records waiting for the writer (about 300 bytes
+# each, so 15 MB at the default). A tight burst can outrun the writer, which
+# shares the GIL with the handlers; 50000 covers bursts far beyond normal
+# traffic, and anything past it is dropped and reported. The trade-off: the
+# JSON encoding still costs CPU, so under full load a request's few records
+# cost more than print() to a fast terminal (benchmarks/bench_logging.py),
+# but a slow or stalled stdout never blocks the event loop.
+logger = StructuredLogger(
+    level=os.getenv("LOG_LEVEL", "info"),
+    fmt=os.getenv("LOG_FORMAT", "json"),
+    queue_size=int(os.getenv("LOG_QUEUE_SIZE", "50000")),
+    error_rate=float(os.getenv("LOG_ERROR_RATE", "1")),
+    error_burst=float(os.getenv("LOG_ERROR_BURST", "10"))
+)
+atexit.register(logger.flush)
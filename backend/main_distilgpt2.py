@@ -1,17 +1,53 @@
 import asyncio
+import atexit
+import contextvars
 from datetime import datetime
 import os
-import json
 import random
-import torch
-from transformers import GPT2LMHeadModel, GPT2Tokenizer
+import time
+import tracemalloc
 import warnings
 warnings.filterwarnings("ignore")
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Header, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.requests import HTTPConnection
 from pydantic import BaseModel
 import aiohttp
 import re
+from tracing import tracer
+from profiler import profiler
+from connections import ConnectionManager
+from framing import SUBPROTOCOLS
+from cancellation import CancellationToken, RequestCancelled
+from metrics import metrics
+from state import create_state_backend
+from conversations import ConversationLog
+from models import DTYPES, request_model
+from providers import FREE_PROVIDERS, parse_providers, remote_providers
+from semantic_cache import SemanticCache, parse_thresholds
+from templates import get_template_response, get_multilingual_response
+from admission import AdmissionController, Overloaded
+from scheduler import InferenceScheduler, PRIORITIES, request_priority
+from wiki_titles import TitleIndex, clean_query, query_candidates, parse_paths, title_key
+import wiki_api
+from capture import TrafficCapture, read_capture, top_queries
+from prefetch import Prefetcher, extract_entities
+from memory import memory, tracemalloc_top
+from lifecycle import GracefulServer, Lifecycle
+from tuning import apply_tuning, thread_stats
+from logs import logger, correlation_id, new_correlation_id
+
+# Providers that answer: templates and cache (the semantic answer cache) first,
+# then web (Wikipedia, DuckDuckGo), huggingface, ollama and gpt2 (local models)
+# in the order given. Only enabled providers are imported; without gpt2 the
+# app never loads torch
+PROVIDERS = parse_providers(os.getenv("PROVIDERS", "templates,cache,web,gpt2"))
+ANSWERING_PROVIDERS = [name for name in PROVIDERS if name not in FREE_PROVIDERS]
+
+# Worker and thread counts chosen by benchmarks/autotune.py fill in the settings
+# that aren't set explicitly; this sizes torch's thread pools, so it runs first
+TUNING = apply_tuning(configure_torch="gpt2" in PROVIDERS)
 
 app = FastAPI(title="Free Chatbot with Web Search", version="9.0.0", description="Advanced Chatbot with DistilGPT2 and Real-time Web Search")
 
@@ -24,9 +60,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Conversations without an explicit session id share this one
+DEFAULT_SESSION = "default"
+
 # Models
 class ChatMessage(BaseModel):
     message: str
+    session_id: str = DEFAULT_SESSION
+    # "batch" lets bulk integrations yield to interactive users
+    priority: str = "normal"
+    # One of MODELS; by default the model is chosen by language
+    model: str = None
 
 class ChatResponse(BaseModel):
     response: str
@@ -36,24 +80,162 @@ class ChatResponse(BaseModel):
     language: str
     model_used: str
 
+# Seconds a request may run before its generation and upstream calls are abandoned
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "30"))
+
+# Generation runs on dedicated threads so it never blocks the event loop;
+# queued jobs run by priority and deadline rather than arrival order
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "1"))
+inference_scheduler = InferenceScheduler(
+    workers=INFERENCE_THREADS,
+    aging=float(os.getenv("SCHEDULER_AGING", "5")),
+    default_timeout=REQUEST_TIMEOUT,
+    observe=lambda priority, waited: metrics.observe(f"queue_wait.{priority}", waited)
+)
+
+# Model, generation budget and prompt lookup settings are in local_model.py
+
+# Ground GPT-2 on the web search result instead of returning the extract verbatim
+GROUNDED_GENERATION = os.getenv("GROUNDED_GENERATION", "0") == "1"
+
+# Opt-in: answers to paraphrased questions are served from the semantic cache
+SEMANTIC_CACHE_ENABLED = "cache" in PROVIDERS and os.getenv("SEMANTIC_CACHE", "0") == "1"
+SEMANTIC_CACHE_INTENTS = {'question', 'statement'}
+
+# Social intents that are answered from templates without touching the model
+TEMPLATE_INTENTS = set(filter(None, os.getenv("TEMPLATE_INTENTS", "greeting,thanks,goodbye").split(","))) if "templates" in PROVIDERS else set()
+TEMPLATE_MIN_CONFIDENCE = float(os.getenv("TEMPLATE_MIN_CONFIDENCE", "0.9"))
+# Longer messages usually carry a request beyond the pleasantry
+TEMPLATE_MAX_WORDS = int(os.getenv("TEMPLATE_MAX_WORDS", "6"))
+
+# Low-confidence intents run web search and generation concurrently; the web
+# answer is still preferred, and is waited for this long after generation wins
+# Needs gpt2 to come right after web in PROVIDERS
+SPECULATIVE = (os.getenv("SPECULATIVE", "0") == "1" and "web" in ANSWERING_PROVIDERS
+               and ANSWERING_PROVIDERS[ANSWERING_PROVIDERS.index("web") + 1:][:1] == ["gpt2"])
+SPECULATIVE_GRACE = float(os.getenv("SPECULATIVE_GRACE_MS", "250")) / 1000
+
+# Requests are shed once the inference queue would make them wait longer than
+# ADMISSION_MAX_WAIT; ADMISSION_MODE=degrade answers them from templates instead
+admission = AdmissionController(
+    max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "10")),
+    client_rate=float(os.getenv("CLIENT_RATE_LIMIT", "5")),
+    client_burst=float(os.getenv("CLIENT_RATE_BURST", "20")),
+    mode=os.getenv("ADMISSION_MODE", "reject")
+)
+# Rate limits are per peer address. Behind a reverse proxy, name the header it
+# puts the client address in (X-Forwarded-For, X-Real-IP); only set this when
+# every request comes through that proxy, since clients can send the header too
+TRUSTED_PROXY_HEADER = os.getenv("TRUSTED_PROXY_HEADER") or None
+
+# WIKIPEDIA_MODE=batch sends several candidate titles in one action=query
+# request instead of a single REST summary request
+WIKIPEDIA_MODE = os.getenv("WIKIPEDIA_MODE", "rest")
+WIKIPEDIA_BATCH_TITLES = min(int(os.getenv("WIKIPEDIA_BATCH_TITLES", "5")), wiki_api.MAX_EXTRACTS)
+WIKIPEDIA_REST_URL = os.getenv("WIKIPEDIA_REST_URL", wiki_api.REST_URL)
+WIKIPEDIA_ACTION_URL = os.getenv("WIKIPEDIA_ACTION_URL", wiki_api.ACTION_URL)
+
+# Successful web search results are shared through the state backend for this long
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+
+# Opt-in: after a web answer, fetch summaries of the pages it mentions in the
+# background, so follow-up questions about them are answered from the cache
+PREFETCH = "web" in PROVIDERS and os.getenv("PREFETCH", "0") == "1"
+PREFETCH_PER_ANSWER = int(os.getenv("PREFETCH_PER_ANSWER", "3"))
+# Earlier turns of the session whose answers are also mined for pages
+PREFETCH_HISTORY = int(os.getenv("PREFETCH_HISTORY", "3"))
+
+# Opt-in: keep every conversation turn in an append-only SQLite log that survives
+# restarts; turns are committed in batches by a background thread, and old ones
+# are compacted away after CONVERSATION_RETENTION_DAYS or beyond CONVERSATION_MAX_TURNS
+CONVERSATION_LOG = os.getenv("CONVERSATION_LOG")
+conversation_log = ConversationLog(
+    CONVERSATION_LOG,
+    batch_size=int(os.getenv("CONVERSATION_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("CONVERSATION_FLUSH_MS", "100")) / 1000,
+    queue_size=int(os.getenv("CONVERSATION_QUEUE_SIZE", "10000")),
+    retention_days=float(os.getenv("CONVERSATION_RETENTION_DAYS", "30")),
+    max_turns=int(os.getenv("CONVERSATION_MAX_TURNS", "1000000")),
+    compact_interval=float(os.getenv("CONVERSATION_COMPACT_INTERVAL", "3600"))
+) if CONVERSATION_LOG else None
+if conversation_log is not None:
+    atexit.register(conversation_log.flush)
+
+# Opt-in: append anonymised request records to a JSONL log for replay and warm-up
+TRAFFIC_CAPTURE = os.getenv("TRAFFIC_CAPTURE")
+traffic_capture = TrafficCapture(TRAFFIC_CAPTURE, float(os.getenv("TRAFFIC_CAPTURE_SAMPLE", "1"))) if TRAFFIC_CAPTURE else None
+# Capture log whose most frequent queries are answered at startup to fill the caches
+CACHE_WARMUP = os.getenv("CACHE_WARMUP")
+CACHE_WARMUP_TOP_K = int(os.getenv("CACHE_WARMUP_TOP_K", "100"))
+
+def word_pattern(words: list) -> re.Pattern:
+    """Regex matching any of ``words`` as whole words"""
+    return re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")\b")
+
+def _discard_result(task: asyncio.Future):
+    """Consume the outcome of an abandoned task so it isn't reported as unhandled"""
+    if not task.cancelled():
+        task.exception()
+
+# Fire-and-forget tasks; the loop only keeps weak references to them
+_background_tasks = set()
+
+def run_in_background(coro, name: str) -> asyncio.Task:
+    """Start ``coro`` without waiting for it; a failure is logged, not raised"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_finish_background)
+    return task
+
+def _finish_background(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("background_task_error", task=task.get_name(), error=repr(task.exception()))
+
 class DistilGPT2Assistant:
     def __init__(self):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"Using device: {self.device}")
-        
-        # Initialize DistilGPT2
-        print("Loading DistilGPT2 model...")
-        try:
-            self.gpt2_model = GPT2LMHeadModel.from_pretrained('distilgpt2')
-            self.gpt2_tokenizer = GPT2Tokenizer.from_pretrained('distilgpt2')
-            self.gpt2_model.to(self.device)
-            print("DistilGPT2 loaded successfully!")
-        except Exception as e:
-            print(f"Error loading DistilGPT2: {e}")
-            self.gpt2_model = None
-            self.gpt2_tokenizer = None
+        # Generation jobs submitted to the inference pool and not yet finished
+        self.inference_depth = 0
+        # Imported only when enabled: the local models need torch
+        self.local_model = None
+        self.models = None
+        if "gpt2" in PROVIDERS:
+            from local_model import LocalModel
+            self.local_model = LocalModel(lambda: self.inference_depth, INFERENCE_THREADS)
+            self.models = self.local_model.models
+        self.remote = remote_providers(PROVIDERS)
         
-        self.conversation_history = []
+        # History and caches live in the state backend so all workers share them
+        self.state = create_state_backend()
+        self.answer_cache = None
+        if SEMANTIC_CACHE_ENABLED:
+            ttl = float(os.getenv("SEMANTIC_CACHE_TTL", "3600"))
+            self.answer_cache = SemanticCache(
+                capacity=int(os.getenv("SEMANTIC_CACHE_SIZE", "10000")),
+                thresholds=parse_thresholds(os.getenv("SEMANTIC_CACHE_THRESHOLDS", "")),
+                ttl=ttl or None
+            )
+        # Queries are resolved to page titles locally; for languages with an
+        # index, a miss skips Wikipedia instead of waiting for a 404
+        self.title_index = TitleIndex()
+        redirects = parse_paths(os.getenv("WIKI_REDIRECTS", ""))
+        for lang_code, path in parse_paths(os.getenv("WIKI_TITLES", "")).items():
+            try:
+                count = self.title_index.load(lang_code, path, redirects.get(lang_code))
+                logger.info("wikipedia_titles_loaded", lang=lang_code, titles=count)
+            except Exception as e:
+                logger.error("wikipedia_titles_error", lang=lang_code, error=str(e))
+        # Fetches pages that follow-up questions are likely to need, only while
+        # no foreground request is running
+        self.prefetcher = Prefetcher(
+            self.prefetch_summary,
+            enabled=PREFETCH,
+            rate=float(os.getenv("PREFETCH_RATE", "1")),
+            burst=float(os.getenv("PREFETCH_BURST", "5")),
+            session_rate=float(os.getenv("PREFETCH_SESSION_RATE", "0.1")),
+            session_burst=float(os.getenv("PREFETCH_SESSION_BURST", "6")),
+            max_age=float(os.getenv("PREFETCH_MAX_AGE", "60"))
+        )
         
         # Language patterns for detection
         self.language_patterns = {
@@ -64,6 +246,14 @@ class DistilGPT2Assistant:
             'italian': ['ciao', 'arrivederci', 'grazie', 'per favore', 'come', 'dove', 'quando']
         }
         
+        # Intent patterns, checked in order
+        self.intent_patterns = [
+            ('greeting', 0.9, word_pattern(['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'hola', 'bonjour', 'hallo', 'olá', 'ciao'])),
+            ('goodbye', 0.9, word_pattern(['goodbye', 'bye', 'see you', 'farewell', 'adiós', 'au revoir', 'auf wiedersehen', 'tchau', 'arrivederci'])),
+            ('thanks', 0.9, word_pattern(['thank', 'thanks', 'gracias', 'merci', 'danke', 'obrigado', 'grazie'])),
+            ('question', 0.8, word_pattern(['what', 'how', 'why', 'when', 'where', 'who', 'which', 'can', 'could', 'would', 'should']))
+        ]
+        
         # Wikipedia language codes
         self.wikipedia_languages = {
             'spanish': 'es',
@@ -84,58 +274,139 @@ class DistilGPT2Assistant:
     def classify_intent_fallback(self, message: str) -> tuple:
         message_lower = message.lower().strip()
         
-        greeting_patterns = ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening', 'hola', 'bonjour', 'hallo', 'olá', 'ciao']
-        if any(pattern in message_lower for pattern in greeting_patterns):
-            return 'greeting', 0.9
-        
-        goodbye_patterns = ['goodbye', 'bye', 'see you', 'farewell', 'adiós', 'au revoir', 'auf wiedersehen', 'tchau', 'arrivederci']
-        if any(pattern in message_lower for pattern in goodbye_patterns):
-            return 'goodbye', 0.9
-        
-        thanks_patterns = ['thank', 'thanks', 'gracias', 'merci', 'danke', 'obrigado', 'grazie']
-        if any(pattern in message_lower for pattern in thanks_patterns):
-            return 'thanks', 0.9
-        
-        if any(word in message_lower for word in ['what', 'how', 'why', 'when', 'where', 'who', 'which', 'can', 'could', 'would', 'should']):
-            return 'question', 0.8
+        # Whole words only: 'hi' must not match "which" or "this"
+        for intent, confidence, pattern in self.intent_patterns:
+            if pattern.search(message_lower):
+                return intent, confidence
         
         return 'statement', 0.6
     
     def clean_query_for_wikipedia(self, query: str, language: str) -> str:
-        # Remove common question words and clean for Wikipedia
-        question_words = ['what', 'who', 'where', 'when', 'why', 'how', 'qué', 'quién', 'dónde', 'cuándo', 'por qué', 'comment', 'où', 'qui', 'wie', 'was', 'wer']
-        
-        cleaned_query = query.lower()
-        for word in question_words:
-            cleaned_query = cleaned_query.replace(word, '').strip()
-        
-        # Remove special characters and limit length
-        cleaned_query = re.sub(r'[^\w\s]', '', cleaned_query)
-        cleaned_query = cleaned_query.strip()[:50]
-        
-        return cleaned_query
+        """Page title for the query: from the title index if there is one for the language"""
+        lang_code = self.wikipedia_languages.get(language, 'en')
+        if self.title_index.has(lang_code):
+            return self.title_index.resolve(lang_code, query_candidates(query, language))
+        return clean_query(query, language)[:50] or None
+    
+    def wikipedia_candidates(self, query: str, language: str, limit: int) -> list:
+        """Up to ``limit`` plausible page titles for the query, most specific first"""
+        lang_code = self.wikipedia_languages.get(language, 'en')
+        candidates = query_candidates(query, language)
+        if self.title_index.has(lang_code):
+            return self.title_index.resolve_all(lang_code, candidates, limit)
+        return candidates[:limit]
+    
+    async def search_wikipedia(self, query: str, language: str = 'en', cancel_token: CancellationToken = None) -> str:
+        if WIKIPEDIA_MODE == "batch":
+            return await self.search_wikipedia_batch(query, language, cancel_token)
+        try:
+            lang_code = self.wikipedia_languages.get(language, 'en')
+            title = self.clean_query_for_wikipedia(query, language)
+            if title is None:
+                metrics.inc("wikipedia.skipped")
+                return None
+            
+            cached = await self.cached_summary(lang_code, [title])
+            if cached is not None:
+                return cached
+            
+            with tracer.span("search_wikipedia", lang=lang_code, title=title):
+                async with aiohttp.ClientSession() as session:
+                    status, extract = await wiki_api.fetch_summary(
+                        session, lang_code, title, self._upstream_timeout(cancel_token), WIKIPEDIA_REST_URL)
+                tracer.annotate(status=status)
+                metrics.inc("wikipedia.requests")
+                if status == 404:
+                    metrics.inc("wikipedia.not_found")
+                return extract
+        except Exception as e:
+            logger.error("wikipedia_error", error=repr(e))
+            return None
     
-    async def search_wikipedia(self, query: str, language: str = 'en') -> str:
+    async def search_wikipedia_batch(self, query: str, language: str = 'en', cancel_token: CancellationToken = None) -> str:
+        """Fetch extracts for several candidate titles, following redirects, in one request"""
         try:
             lang_code = self.wikipedia_languages.get(language, 'en')
-            cleaned_query = self.clean_query_for_wikipedia(query, language)
+            titles = self.wikipedia_candidates(query, language, WIKIPEDIA_BATCH_TITLES)
+            if not titles:
+                metrics.inc("wikipedia.skipped")
+                return None
             
-            url = f"https://{lang_code}.wikipedia.org/api/rest_v1/page/summary/{cleaned_query}"
+            cached = await self.cached_summary(lang_code, titles)
+            if cached is not None:
+                return cached
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'extract' in data and data['extract']:
-                            return data['extract'][:500]
-                        elif 'description' in data:
-                            return data['description'][:300]
+            with tracer.span("search_wikipedia", lang=lang_code, titles=len(titles)):
+                async with aiohttp.ClientSession() as session:
+                    data = await wiki_api.fetch_extracts(
+                        session, lang_code, titles, self._upstream_timeout(cancel_token), WIKIPEDIA_ACTION_URL)
+                metrics.inc("wikipedia.requests")
+                metrics.inc("wikipedia.batch_titles", len(titles))
+                best = wiki_api.best_extract(data, titles)
+                if best is None:
+                    metrics.inc("wikipedia.not_found")
                     return None
+                tracer.annotate(title=best[0])
+                return best[1]
         except Exception as e:
-            print(f"Wikipedia search error: {e}")
+            logger.error("wikipedia_error", error=repr(e))
             return None
     
-    async def search_duckduckgo(self, query: str) -> str:
+    async def cached_summary(self, lang_code: str, titles: list) -> str:
+        """A prefetched summary for the first of ``titles`` that has one"""
+        if not self.prefetcher.enabled:
+            return None
+        for title in titles:
+            key = f"{lang_code}:{title_key(title)}"
+            extract = await self.call_state(self.state.cache_get, "wiki", key)
+            if extract is not None:
+                metrics.inc("wikipedia.cache_hits")
+                self.prefetcher.record_hit(key)
+                return extract
+        return None
+    
+    async def prefetch_summary(self, lang_code: str, title: str) -> bool:
+        """Fetch a page summary into the cache; whether there was one to store"""
+        key = f"{lang_code}:{title_key(title)}"
+        if await self.call_state(self.state.cache_get, "wiki", key) is not None:
+            return False
+        async with aiohttp.ClientSession() as session:
+            _, extract = await wiki_api.fetch_summary(session, lang_code, title, 10, WIKIPEDIA_REST_URL)
+        metrics.inc("wikipedia.prefetch_requests")
+        if not extract:
+            return False
+        await self.call_state(self.state.cache_set, "wiki", key, extract, SEARCH_CACHE_TTL)
+        return True
+    
+    async def prefetch_related(self, message: str, response: str, language: str, session_id: str = DEFAULT_SESSION):
+        """Offer the pages named in a web answer and the session's recent answers for prefetching"""
+        if not self.prefetcher.enabled:
+            return
+        lang_code = self.wikipedia_languages.get(language, 'en')
+        # Names in the answer just given count double
+        entities = extract_entities(response)
+        for entity in entities:
+            entities[entity] *= 2
+        for turn in (await self.fetch_history(session_id))[-PREFETCH_HISTORY:]:
+            entities.update(extract_entities(turn['response']))
+        # The question's own topic has just been fetched
+        asked = set(query_candidates(message, language))
+        titles = []
+        for entity, _ in entities.most_common():
+            key = title_key(entity)
+            if key in asked:
+                continue
+            if self.title_index.has(lang_code):
+                entity = self.title_index.resolve(lang_code, [key])
+                if entity is None:
+                    continue
+            if entity not in titles:
+                titles.append(entity)
+            if len(titles) >= PREFETCH_PER_ANSWER:
+                break
+        self.prefetcher.offer(session_id, lang_code, titles)
+    
+    async def search_duckduckgo(self, query: str, cancel_token: CancellationToken = None) -> str:
         try:
             url = "https://api.duckduckgo.com/"
             params = {
@@ -145,29 +416,55 @@ class DistilGPT2Assistant:
                 'skip_disambig': '1'
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'AbstractText' in data:
-                            return data['AbstractText'][:500]
-                    return None
+            with tracer.span("search_duckduckgo"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(url, params=params, timeout=self._upstream_timeout(cancel_token)) as response:
+                        tracer.annotate(status=response.status)
+                        if response.status == 200:
+                            data = await response.json()
+                            if 'AbstractText' in data:
+                                return data['AbstractText'][:500]
+                        return None
         except Exception as e:
-            print(f"DuckDuckGo search error: {e}")
+            logger.error("duckduckgo_error", error=repr(e))
             return None
     
-    async def search_web(self, query: str, language: str = 'en') -> str:
+    def _upstream_timeout(self, cancel_token: CancellationToken = None, default: float = 10) -> float:
+        if cancel_token is None:
+            return default
+        return max(cancel_token.remaining(default), 0.01)
+    
+    async def search_web(self, query: str, language: str = 'en', cancel_token: CancellationToken = None) -> str:
+        # Keyed on the whole normalised query, which is what DuckDuckGo is sent:
+        # content words alone would give "how does a car work" the answer to
+        # "what is a car". Queries that are nothing but filler words aren't cached
+        cache_key = f"{language}:{title_key(query)}" if clean_query(query, language) else None
+        if cache_key is not None:
+            cached = await self.call_state(self.state.cache_get, "search", cache_key)
+            if cached is not None:
+                metrics.inc("search_cache.hits")
+                return cached
+            metrics.inc("search_cache.misses")
+
+        result = await self._search_web(query, language, cancel_token)
+        if result:
+            if cache_key is not None:
+                await self.call_state(self.state.cache_set, "search", cache_key, result, SEARCH_CACHE_TTL)
+            return result
+        return f"I couldn't find information about '{query}' on the web."
+    
+    async def _search_web(self, query: str, language: str = 'en', cancel_token: CancellationToken = None) -> str:
         # Try Wikipedia first
-        wiki_result = await self.search_wikipedia(query, language)
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        wiki_result = await self.search_wikipedia(query, language, cancel_token)
         if wiki_result:
             return wiki_result
         
         # Fall back to DuckDuckGo
-        ddg_result = await self.search_duckduckgo(query)
-        if ddg_result:
-            return ddg_result
-        
-        return f"I couldn't find information about '{query}' on the web."
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        return await self.search_duckduckgo(query, cancel_token)
     
     def format_web_response(self, response: str, language: str = 'en') -> str:
         if not response:
@@ -184,97 +481,414 @@ class DistilGPT2Assistant:
         intro = greetings.get(language, "According to my web search")
         return f"{intro}: {response}"
     
-    def generate_response(self, message: str, language: str = 'en') -> str:
-        if not self.gpt2_model or not self.gpt2_tokenizer:
-            return "I'm having trouble with my AI model right now. Please try again later."
+    def generate_response(self, message: str, language: str = 'en', cancel_token: CancellationToken = None, intent: str = 'statement', context: str = None) -> str:
+        return self.local_model.generate_response(message, language, cancel_token, intent, context)
+    
+    async def run_inference(self, func, *args):
+        """Run a blocking model call on the inference scheduler, keeping the tracing context.
+
+        Raises Overloaded instead of queueing if the job would wait too long.
+        """
+        admission.check_capacity(self.inference_depth, INFERENCE_THREADS)
+        context = contextvars.copy_context()
+        # Lets the scheduler order by deadline and drop jobs cancelled while queued
+        cancel_token = next((arg for arg in args if isinstance(arg, CancellationToken)), None)
         
+        def job():
+            started = time.perf_counter()
+            result = context.run(func, *args)
+            admission.record(time.perf_counter() - started)
+            return result
+        
+        self.inference_depth += 1
         try:
-            # Add context about multilingual capabilities
-            context_prompt = f"You are a multilingual AI assistant. Respond in {language} if the message is in {language}. Be helpful and conversational."
-            
-            inputs = self.gpt2_tokenizer.encode(message, return_tensors='pt')
-            inputs = inputs.to(self.device)
-            
-            with torch.no_grad():
-                outputs = self.gpt2_model.generate(
-                    inputs,
-                    max_length=150,
-                    num_return_sequences=1,
-                    temperature=0.7,
-                    pad_token_id=self.gpt2_tokenizer.eos_token_id,
-                    do_sample=True
-                )
-            
-            response = self.gpt2_tokenizer.decode(outputs[0], skip_special_tokens=True)
-            return response[:500]
+            return await asyncio.wrap_future(inference_scheduler.submit(job, request_priority.get(), cancel_token))
+        finally:
+            self.inference_depth -= 1
+    
+    async def get_response(self, message: str, cancel_token: CancellationToken = None) -> tuple:
+        started = time.perf_counter()
+        tier, result = await self._tiered_response(message, cancel_token)
+        metrics.inc(f"tier.{tier}")
+        # Tail latency per cost class
+        metrics.observe(f"latency.{tier}", time.perf_counter() - started)
+        return result
+    
+    async def _tiered_response(self, message: str, cancel_token: CancellationToken = None) -> tuple:
+        """(tier, result): the cheapest tier that can answer runs inline, generation is scheduled"""
+        with tracer.span("detect_language"):
+            language = self.detect_language(message)
+        with tracer.span("classify_intent"):
+            intent, confidence = self.classify_intent_fallback(message)
         
-        except Exception as e:
-            print(f"Generation error: {e}")
-            return "I'm having trouble generating a response right now."
+        if self.use_template(message, intent, confidence):
+            response = get_template_response(language, intent)
+            if response:
+                return "template", (response, intent, confidence, language, "Templates")
+        
+        cacheable = self.answer_cache is not None and intent in SEMANTIC_CACHE_INTENTS
+        if cacheable:
+            with tracer.span("semantic_cache"):
+                # Milliseconds of matrix product on a full cache; keep it off the event loop
+                cached = await asyncio.get_running_loop().run_in_executor(None, self.answer_cache.lookup, message, language)
+            if cached is not None:
+                return "semantic_cache", cached
+        
+        # Only answers that need the inference pool can be shed: run_inference checks its depth
+        try:
+            tier, result = await self._answer(message, language, intent, confidence, cancel_token)
+        except Overloaded:
+            metrics.inc("admission.overloaded")
+            if admission.mode != "degrade":
+                raise
+            return "degraded", (get_template_response(language, 'busy'), intent, confidence, language, "Templates")
+        # Don't remember generation failures or the rule-based fallback
+        if cacheable and tier != "template" and not result[0].startswith("I'm having trouble"):
+            self.answer_cache.store(message, language, result)
+        return tier, result
+    
+    def use_template(self, message: str, intent: str, confidence: float) -> bool:
+        """Policy for the zero-compute tier"""
+        return (intent in TEMPLATE_INTENTS
+                and confidence >= TEMPLATE_MIN_CONFIDENCE
+                and len(message.split()) <= TEMPLATE_MAX_WORDS)
     
-    async def get_response(self, message: str) -> tuple:
-        language = self.detect_language(message)
-        intent, confidence = self.classify_intent_fallback(message)
+    async def _answer(self, message: str, language: str, intent: str, confidence: float, cancel_token: CancellationToken = None) -> tuple:
+        """(tier, result) from the first provider in PROVIDERS order that has an answer"""
+        for provider in ANSWERING_PROVIDERS:
+            if provider == "web":
+                # Use web search for questions or low confidence
+                if intent != 'question' and confidence >= 0.7:
+                    continue
+                if SPECULATIVE and intent != 'question':
+                    result = await self._answer_speculatively(message, language, intent, confidence, cancel_token)
+                    return "web_search" if result[4].startswith("Web Search") else "generation", result
+                with tracer.span("search_web"):
+                    web_response = await self.search_web(message, language, cancel_token)
+                if web_response and not web_response.startswith("I couldn't find"):
+                    if GROUNDED_GENERATION and self.models is not None and self.models.available(self.models.select(language)):
+                        try:
+                            with tracer.span("grounded_generation"):
+                                grounded = await self.run_inference(self.generate_response, message, language, cancel_token, intent, web_response)
+                            if not grounded.startswith("I'm having trouble"):
+                                return "web_search", (grounded, intent, 0.9, language, "Web Search + Free AI")
+                        except Overloaded:
+                            # The search result alone is still an answer
+                            metrics.inc("admission.grounding_skipped")
+                    formatted_response = self.format_web_response(web_response, language)
+                    return "web_search", (formatted_response, intent, 0.9, language, "Web Search + Free AI")
+            elif provider == "gpt2":
+                # The local models always answer, so providers after gpt2 are never reached
+                with tracer.span("generate_response"):
+                    ai_response = await self.run_inference(self.generate_response, message, language, cancel_token, intent)
+                return "generation", (ai_response, intent, confidence, language, "Free AI")
+            elif provider in self.remote:
+                remote = self.remote[provider]
+                with tracer.span(provider):
+                    response = await remote.answer(message, language, cancel_token)
+                if response:
+                    return provider, (response, intent, confidence, language, remote.label)
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
         
-        # Use web search for questions or low confidence
-        if intent == 'question' or confidence < 0.7:
-            web_response = await self.search_web(message, language)
-            if web_response and not web_response.startswith("I couldn't find"):
-                formatted_response = self.format_web_response(web_response, language)
-                return formatted_response, intent, 0.9, language, "Web Search + Free AI"
+        # No provider had an answer: rule-based reply
+        return "template", (get_multilingual_response(message, language), intent, confidence, language, "Templates")
+    
+    async def _answer_speculatively(self, message: str, language: str, intent: str, confidence: float, cancel_token: CancellationToken = None) -> tuple:
+        """Start web search and generation together and keep the preferred result.
         
-        # Use DistilGPT2 for other cases
-        ai_response = self.generate_response(message, language)
-        return ai_response, intent, confidence, language, "Free AI"
+        Same preference as the sequential path: a web answer wins if there is
+        one. The losing branch is cancelled (generation stops at its next
+        decode step) and its cost is recorded as wasted work.
+        """
+        metrics.inc("speculation.started")
+        generation_token = cancel_token.child() if cancel_token else CancellationToken()
+        started = time.perf_counter()
+        finished = []
+        with tracer.span("speculate"):
+            search = asyncio.create_task(self.search_web(message, language, cancel_token))
+            generation = asyncio.create_task(self.run_inference(self.generate_response, message, language, generation_token, intent))
+            generation.add_done_callback(lambda task: finished.append(time.perf_counter()))
+            try:
+                done, _ = await asyncio.wait({search, generation}, return_when=asyncio.FIRST_COMPLETED)
+                if search not in done and generation.done() and isinstance(generation.exception(), Overloaded):
+                    # Generation was shed, so the search is the only answer left
+                    await asyncio.wait({search})
+                elif search not in done and SPECULATIVE_GRACE > 0:
+                    await asyncio.wait({search}, timeout=SPECULATIVE_GRACE)
+                
+                if search.done():
+                    web_response = search.result()
+                    if web_response and not web_response.startswith("I couldn't find"):
+                        metrics.inc("speculation.web_won")
+                        if generation.done():
+                            metrics.inc("speculation.wasted_generation_seconds", finished[0] - started)
+                        else:
+                            generation_token.cancel("speculation")
+                            generation.add_done_callback(lambda task: metrics.inc(
+                                "speculation.wasted_generation_seconds", time.perf_counter() - started))
+                        return self.format_web_response(web_response, language), intent, 0.9, language, "Web Search + Free AI"
+                    metrics.inc("speculation.web_failed")
+                else:
+                    metrics.inc("speculation.generation_won")
+                    metrics.inc("speculation.wasted_searches")
+                
+                ai_response = await generation
+                return ai_response, intent, confidence, language, "Free AI"
+            finally:
+                if not search.done():
+                    search.cancel()
+                if not generation.done():
+                    generation_token.cancel("speculation")
+                    generation.add_done_callback(_discard_result)
     
-    def add_to_history(self, message: str, response: str):
-        self.conversation_history.append({
+    async def call_state(self, method, *args):
+        """Call a state backend method from the threadpool; the SQLite backend
+        can wait seconds for a write lock held by another worker"""
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    async def add_to_history(self, message: str, response: str, session_id: str = DEFAULT_SESSION):
+        # The conversation log keeps every turn; otherwise only the last 10 are kept
+        if conversation_log is not None:
+            conversation_log.append(session_id, message, response)
+            return
+        await self.call_state(self.state.append_history, session_id, {
             'message': message,
             'response': response,
             'timestamp': datetime.now().isoformat()
-        })
-        
-        # Keep only last 10 conversations
-        if len(self.conversation_history) > 10:
-            self.conversation_history = self.conversation_history[-10:]
+        }, 10)
+    
+    def get_history(self, session_id: str = DEFAULT_SESSION, limit: int = 10, before: int = None) -> list:
+        if conversation_log is not None:
+            return conversation_log.history(session_id, limit, before)
+        return self.state.get_history(session_id)[-limit:]
+
+    async def fetch_history(self, session_id: str = DEFAULT_SESSION, limit: int = 10, before: int = None) -> list:
+        """``get_history`` from the threadpool, since it queries a database"""
+        return await self.call_state(self.get_history, session_id, limit, before)
+    
+    @property
+    def conversation_history(self) -> list:
+        return self.get_history(DEFAULT_SESSION)
 
 # Initialize assistant
 distilgpt2_assistant = DistilGPT2Assistant()
+# Clients may negotiate a compact binary encoding; JSON is the default
+manager = ConnectionManager(SUBPROTOCOLS)
+
+# Everything that holds memory reports to the accountant; above MEMORY_BUDGET_MB
+# the largest evictable components drop their coldest entries
+memory.budget = int(float(os.getenv("MEMORY_BUDGET_MB", "0")) * 2 ** 20)
+MEMORY_CHECK_INTERVAL = float(os.getenv("MEMORY_CHECK_INTERVAL", "10"))
+if distilgpt2_assistant.local_model is not None:
+    memory.register("models", distilgpt2_assistant.models.memory_usage, distilgpt2_assistant.models.evict)
+    memory.register("kv_cache", distilgpt2_assistant.local_model.kv_cache_bytes)
+memory.register("state", distilgpt2_assistant.state.memory_usage, distilgpt2_assistant.state.evict)
+if distilgpt2_assistant.answer_cache is not None:
+    memory.register("semantic_cache", distilgpt2_assistant.answer_cache.memory_usage, distilgpt2_assistant.answer_cache.evict)
+memory.register("title_index", lambda: sum(index["bytes"] for index in distilgpt2_assistant.title_index.stats().values()))
+memory.register("connections", manager.memory_usage)
+
+# On SIGTERM new requests are refused, in-flight ones get SHUTDOWN_TIMEOUT
+# seconds to finish, then WebSockets are closed with a reconnect hint
+lifecycle = Lifecycle(
+    timeout=float(os.getenv("SHUTDOWN_TIMEOUT", "30")),
+    reconnect_after=float(os.getenv("RECONNECT_AFTER", "5"))
+)
+
+def reconnect_frame(request_id=None) -> dict:
+    tag = {"id": request_id} if request_id is not None else {}
+    return {"error": "Server restarting", "busy": True, "reconnect": True, "retry_after": lifecycle.reconnect_after, **tag}
+
+async def close_websockets():
+    # 1012 "Service Restart" tells clients to come back
+    closed = await manager.close_all(1012, "Server restarting", reconnect_frame())
+    logger.info("websockets_closed", connections=closed)
+
+lifecycle.on_drained(close_websockets)
+
+if conversation_log is not None:
+    async def flush_conversations():
+        # Forked workers exit without running atexit handlers
+        await asyncio.get_running_loop().run_in_executor(None, conversation_log.flush)
 
-async def get_ai_response(message: str) -> tuple:
+    lifecycle.on_drained(flush_conversations)
+
+# Concurrent requests allowed per WebSocket connection
+WS_MAX_INFLIGHT = int(os.getenv("WS_MAX_INFLIGHT", "4"))
+
+async def get_ai_response(message: str, cancel_token: CancellationToken = None, session_id: str = DEFAULT_SESSION) -> tuple:
     try:
-        response, intent, confidence, language, model_used = await distilgpt2_assistant.get_response(message)
-        distilgpt2_assistant.add_to_history(message, response)
+        with lifecycle.request(), tracer.span("get_ai_response"), distilgpt2_assistant.prefetcher.foreground():
+            response, intent, confidence, language, model_used = await distilgpt2_assistant.get_response(message, cancel_token)
+            tracer.annotate(intent=intent, language=language, model_used=model_used)
+        if model_used.startswith("Web Search") and distilgpt2_assistant.prefetcher.enabled:
+            # Speculative work for later questions; the answer doesn't wait for it
+            run_in_background(distilgpt2_assistant.prefetch_related(message, response, language, session_id),
+                              "prefetch_related")
+        await distilgpt2_assistant.add_to_history(message, response, session_id)
         return response, intent, confidence, language, model_used
+    except RequestCancelled:
+        metrics.inc("requests.cancelled")
+        raise
+    except Overloaded:
+        raise
     except Exception as e:
-        print(f"Error in get_ai_response: {e}")
+        logger.error("response_error", error=repr(e))
         return "I'm having trouble processing your request right now. Please try again.", "error", 0.0, "english", "Fallback"
 
+def require_admin(x_admin_token: str = Header(None)):
+    """Admin endpoints are disabled unless ADMIN_TOKEN is set, and then require it"""
+    admin_token = os.getenv("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def client_key(connection: HTTPConnection) -> str:
+    """Rate-limit key: the peer address, or the one the trusted proxy reports.
+
+    Nothing the client chooses is part of the key, or it could take a fresh
+    bucket for every request.
+    """
+    if TRUSTED_PROXY_HEADER:
+        forwarded = connection.headers.get(TRUSTED_PROXY_HEADER)
+        if forwarded:
+            # The proxy appends the address it saw; earlier entries came from the client
+            return forwarded.rsplit(",", 1)[-1].strip()
+    return connection.client.host if connection.client else "unknown"
+
+async def watch_disconnect(request: Request, cancel_token: CancellationToken):
+    """Cancel the request's token as soon as the HTTP client goes away"""
+    while not cancel_token.cancelled:
+        if await request.is_disconnected():
+            cancel_token.cancel("client disconnected")
+            return
+        await asyncio.sleep(0.5)
+
+def capture_request(channel: str, message: str, started: float, result: tuple = None, status: str = "ok"):
+    """Append a record to the traffic capture log, if capture is on"""
+    if traffic_capture is None:
+        return
+    _, intent, _, language, model_used = result or (None, None, None, None, None)
+    traffic_capture.record(channel, message, started, time.time() - started, language, intent, model_used, status)
+
+async def warm_caches(path: str, top_k: int):
+    """Answer the most frequent captured queries so their answers and searches are cached"""
+    queries = top_queries(read_capture(path), top_k, SEMANTIC_CACHE_INTENTS)
+    request_priority.set("background")
+    started = time.perf_counter()
+    for message, _, _ in queries:
+        try:
+            await distilgpt2_assistant.get_response(message, CancellationToken(REQUEST_TIMEOUT))
+            metrics.inc("warmup.queries")
+        except Exception as e:
+            logger.error("warmup_error", error=repr(e))
+    logger.info("warmup_done", queries=len(queries), seconds=round(time.perf_counter() - started, 1))
+
+@app.on_event("startup")
+async def start_background_tasks():
+    asyncio.create_task(tracer.monitor_loop_lag())
+    if CACHE_WARMUP:
+        asyncio.create_task(warm_caches(CACHE_WARMUP, CACHE_WARMUP_TOP_K))
+    if memory.budget:
+        asyncio.create_task(memory.monitor(MEMORY_CHECK_INTERVAL))
+    if PREFETCH:
+        asyncio.create_task(distilgpt2_assistant.prefetcher.run())
+
 # API Endpoints
 @app.get("/")
 async def root():
-    return {"message": "Free Chatbot with Web Search is running", "version": "9.0.0", "features": ["DistilGPT2", "Web Search", "6 Languages"]}
+    return {"message": "Free Chatbot with Web Search is running", "version": "9.0.0", "features": ["DistilGPT2", "Web Search", "6 Languages"], "providers": PROVIDERS}
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(message: ChatMessage):
-    response, intent, confidence, language, model_used = await get_ai_response(message.message)
+async def chat(message: ChatMessage, request: Request, http_response: Response):
+    started = time.time()
+    correlation_id.set(new_correlation_id(request.headers.get("x-request-id")))
+    http_response.headers["X-Request-Id"] = correlation_id.get()
+    try:
+        lifecycle.admit()
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail="Server restarting",
+                            headers={"Retry-After": e.retry_after_header, "Connection": "close"})
+    try:
+        admission.check_client(client_key(request))
+    except Overloaded as e:
+        metrics.inc("admission.rate_limited")
+        capture_request("http", message.message, started, status="rate_limited")
+        raise HTTPException(status_code=429, detail="Too many requests", headers={"Retry-After": e.retry_after_header})
     
-    return ChatResponse(
-        response=response,
-        timestamp=datetime.now().isoformat(),
-        intent=intent,
-        confidence=confidence,
-        language=language,
-        model_used=model_used
-    )
+    if message.model is not None:
+        if distilgpt2_assistant.models is None or message.model not in distilgpt2_assistant.models:
+            raise HTTPException(status_code=400, detail=f"Unknown model: {message.model}")
+        request_model.set(message.model)
+    
+    cancel_token = CancellationToken(REQUEST_TIMEOUT)
+    # Clients can only lower their own priority
+    if PRIORITIES.get(message.priority, 0) > PRIORITIES["normal"]:
+        request_priority.set(message.priority)
+    watcher = asyncio.create_task(watch_disconnect(request, cancel_token))
+    try:
+        with tracer.trace_request("POST /chat"):
+            result = await get_ai_response(message.message, cancel_token, message.session_id)
+            capture_request("http", message.message, started, result)
+            response, intent, confidence, language, model_used = result
+            
+            with tracer.span("serialize"):
+                return ChatResponse(
+                    response=response,
+                    timestamp=datetime.now().isoformat(),
+                    intent=intent,
+                    confidence=confidence,
+                    language=language,
+                    model_used=model_used
+                )
+    except RequestCancelled as e:
+        capture_request("http", message.message, started, status="timeout" if e.reason == "deadline" else "cancelled")
+        if e.reason == "deadline":
+            raise HTTPException(status_code=504, detail="Request timed out")
+        raise HTTPException(status_code=499, detail="Client closed request")
+    except Overloaded as e:
+        capture_request("http", message.message, started, status="busy")
+        raise HTTPException(status_code=503, detail="Server busy", headers={"Retry-After": e.retry_after_header})
+    finally:
+        watcher.cancel()
 
 @app.get("/models")
 async def get_models():
-    return {
-        "gpt2_loaded": distilgpt2_assistant.gpt2_model is not None,
-        "web_search_enabled": True,
+    models = distilgpt2_assistant.models
+    status = {
+        "providers": PROVIDERS,
+        "gpt2_loaded": models is not None and models.is_loaded(models.default),
+        "web_search_enabled": "web" in PROVIDERS,
         "supported_languages": ["english", "spanish", "french", "german", "portuguese", "italian"]
     }
+    if models is not None:
+        status.update({
+            "default_model": models.default,
+            "language_models": models.languages,
+            "memory_cap_bytes": models.memory_cap,
+            "resident_bytes": models.resident_bytes(),
+            "models": models.stats()
+        })
+    return status
+
+@app.get("/metrics")
+async def get_metrics():
+    """Counters and latency percentiles"""
+    snapshot = metrics.snapshot()
+    if distilgpt2_assistant.answer_cache is not None:
+        snapshot["semantic_cache"] = distilgpt2_assistant.answer_cache.stats()
+    snapshot["admission"] = admission.stats()
+    snapshot["scheduler"] = inference_scheduler.stats()
+    snapshot["wikipedia_titles"] = distilgpt2_assistant.title_index.stats()
+    snapshot["logging"] = logger.stats()
+    snapshot["prefetch"] = distilgpt2_assistant.prefetcher.stats()
+    snapshot["lifecycle"] = lifecycle.stats()
+    if conversation_log is not None:
+        snapshot["conversations"] = conversation_log.stats()
+    snapshot["threads"] = {**thread_stats(), "inference_threads": INFERENCE_THREADS, "tuned": TUNING}
+    return snapshot
 
 @app.get("/intents")
 async def get_intents():
@@ -286,52 +900,257 @@ async def get_intents():
     }
 
 @app.get("/conversation/history")
-async def get_conversation_history():
-    """Get conversation history"""
-    return {"history": distilgpt2_assistant.conversation_history}
+async def get_conversation_history(session_id: str = DEFAULT_SESSION, limit: int = 10, before: int = None):
+    """Get conversation history, ``limit`` turns at a time; with the conversation log,
+    ``cursor`` is the ``before`` value that fetches the next older page"""
+    limit = min(max(limit, 1), 1000)
+    history = await distilgpt2_assistant.fetch_history(session_id, limit, before)
+    seqs = [turn["seq"] for turn in history if turn.get("seq") is not None]
+    cursor = seqs[0] if conversation_log is not None and len(history) == limit and seqs else None
+    return {"history": history, "cursor": cursor}
+
+async def process_ws_message(conn, message: str, request_id=None, session_id: str = DEFAULT_SESSION, priority: str = "interactive", model: str = None):
+    """Answer one /ws message; frames are tagged with the client's request id, if any"""
+    tag = {"id": request_id} if request_id is not None else {}
+    cancel_token = CancellationToken(REQUEST_TIMEOUT)
+    request_priority.set(priority)
+    request_model.set(model)
+    correlation_id.set(new_correlation_id())
+    started = time.time()
+    try:
+        with tracer.trace_request("WS /ws"):
+            # Show typing indicator
+            manager.send_json(conn, {"typing": True, **tag})
+            
+            # Get response
+            result = await get_ai_response(message, cancel_token, session_id)
+            capture_request("ws", message, started, result)
+            response, intent, confidence, language, model_used = result
+            
+            # Send response
+            with tracer.span("encode", encoding=conn.codec.label):
+                payload = conn.codec.encode({
+                    "response": response,
+                    "intent": intent,
+                    "confidence": confidence,
+                    "language": language,
+                    "model_used": model_used,
+                    **tag
+                })
+            manager.send(conn, payload)
+    except asyncio.CancelledError:
+        # Client sent a cancel message or disconnected; stop generation in its thread too
+        cancel_token.cancel("client")
+        capture_request("ws", message, started, status="cancelled")
+        manager.send_json(conn, {"cancelled": True, **tag})
+        raise
+    except RequestCancelled:
+        capture_request("ws", message, started, status="timeout")
+        manager.send_json(conn, {"error": "Request timed out", **tag})
+    except Overloaded as e:
+        capture_request("ws", message, started, status="busy")
+        manager.send_json(conn, {"error": "Server busy", "busy": True, "retry_after": round(e.retry_after, 1), **tag})
+    except Exception as e:
+        logger.error("websocket_error", connection=conn.id, error=repr(e))
+        manager.send_json(conn, {"error": str(e), **tag})
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    print("WebSocket connection established")
+    conn = await manager.connect(websocket)
+    if lifecycle.draining:
+        await manager.close([conn], 1012, "Server restarting", reconnect_frame())
+        return
+    # Messages get their own ids; connection-level records carry the connection's
+    correlation_id.set(conn.id[:16])
+    logger.info("websocket_connected")
+    inflight = {}
+    session_id = websocket.query_params.get("session_id", DEFAULT_SESSION)
+    rate_key = client_key(websocket)
     
     try:
         while True:
-            data = await websocket.receive_text()
+            data = await manager.receive_frame(conn)
             try:
-                message_data = json.loads(data)
+                message_data = conn.codec.decode(data)
+                request_id = message_data.get("id")
+                
+                if message_data.get("type") == "cancel":
+                    task = inflight.get(request_id)
+                    if task:
+                        task.cancel()
+                    continue
+                
                 message = message_data.get("message", "")
+                if not message:
+                    continue
+                if request_id is not None and request_id in inflight:
+                    manager.send_json(conn, {"error": "Duplicate request id", "id": request_id})
+                    continue
+                model = message_data.get("model")
+                if model is not None and (distilgpt2_assistant.models is None or model not in distilgpt2_assistant.models):
+                    manager.send_json(conn, {"error": f"Unknown model: {model}", "id": request_id})
+                    continue
+                if lifecycle.draining:
+                    manager.send_json(conn, reconnect_frame(request_id))
+                    continue
+                if len(inflight) >= WS_MAX_INFLIGHT:
+                    manager.send_json(conn, {"error": "Too many requests in flight", "busy": True, "id": request_id})
+                    continue
+                try:
+                    admission.check_client(rate_key)
+                except Overloaded as e:
+                    metrics.inc("admission.rate_limited")
+                    capture_request("ws", message, time.time(), status="rate_limited")
+                    manager.send_json(conn, {"error": "Too many requests", "busy": True, "retry_after": round(e.retry_after, 1), "id": request_id})
+                    continue
                 
-                if message:
-                    # Show typing indicator
-                    await websocket.send_json({"typing": True})
-                    
-                    # Get response
-                    response, intent, confidence, language, model_used = await get_ai_response(message)
-                    
-                    # Send response
-                    await websocket.send_json({
-                        "response": response,
-                        "intent": intent,
-                        "confidence": confidence,
-                        "language": language,
-                        "model_used": model_used
-                    })
+                priority = "batch" if message_data.get("priority") == "batch" else "interactive"
+                task = asyncio.create_task(process_ws_message(conn, message, request_id, message_data.get("session_id", session_id), priority, model))
+                key = request_id if request_id is not None else task
+                inflight[key] = task
+                task.add_done_callback(lambda _, key=key: inflight.pop(key, None))
                     
-                    # Add to history
-                    distilgpt2_assistant.add_to_history(message, response)
-                    
-            except json.JSONDecodeError:
-                await websocket.send_json({"error": "Invalid JSON format"})
+            except ValueError:
+                manager.send_json(conn, {"error": f"Invalid {conn.codec.label} format"})
             except Exception as e:
-                print(f"WebSocket error: {e}")
-                await websocket.send_json({"error": str(e)})
+                logger.error("websocket_error", error=repr(e))
+                manager.send_json(conn, {"error": str(e)})
                 
     except WebSocketDisconnect:
-        print("WebSocket connection closed")
+        logger.info("websocket_disconnected")
     except Exception as e:
-        print(f"WebSocket error: {e}")
+        logger.error("websocket_error", error=repr(e))
+    finally:
+        for task in list(inflight.values()):
+            task.cancel()
+        manager.disconnect(conn)
 
-if __name__ == "__main__":
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(seconds: float = 10.0, mode: str = "sample", interval_ms: float = 5.0):
+    """Profile the server for N seconds.
+
+    ``mode=sample`` returns collapsed stacks for flamegraph tools,
+    ``mode=cprofile`` returns pstats text for the event loop thread.
+    """
+    if profiler.busy:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    seconds = min(max(seconds, 0.1), 300.0)
+    # Below 1 ms the sampler would starve the server it is measuring
+    interval_ms = min(max(interval_ms, 1.0), 1000.0)
+    if mode == "cprofile":
+        result = await profiler.cprofile(seconds)
+    elif mode == "sample":
+        result = await profiler.sample(seconds, interval_ms / 1000)
+    else:
+        raise HTTPException(status_code=400, detail="mode must be 'sample' or 'cprofile'")
+    return PlainTextResponse(result)
+
+@app.get("/admin/traces", dependencies=[Depends(require_admin)])
+async def admin_traces():
+    """Recent slow request traces with their span trees"""
+    return {
+        "enabled": tracer.enabled,
+        "slow_ms": tracer.slow_ms,
+        "loop_lag_ms": tracer.loop_lag_ms,
+        "traces": list(tracer.recent_slow)
+    }
+
+@app.get("/admin/connections", dependencies=[Depends(require_admin)])
+async def admin_connections():
+    """WebSocket registry size and eviction counters"""
+    return manager.stats()
+
+@app.get("/admin/memory", dependencies=[Depends(require_admin)])
+async def admin_memory(top: int = 0):
+    """Bytes held per component, process RSS, and with ``top=N`` the N largest
+    allocation sites (needs tracemalloc, see POST /admin/memory/tracemalloc)"""
+    loop = asyncio.get_running_loop()
+    report = await loop.run_in_executor(None, memory.report)
+    if top > 0:
+        report["tracemalloc"] = {
+            "tracing": tracemalloc.is_tracing(),
+            "top": await loop.run_in_executor(None, tracemalloc_top, min(top, 200))
+        }
+    return report
+
+@app.post("/admin/memory/tracemalloc", dependencies=[Depends(require_admin)])
+async def admin_tracemalloc(enabled: bool = True, frames: int = 1):
+    """Start or stop allocation tracing; it slows allocations down while on"""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, min(frames, 25)))
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return {"tracing": tracemalloc.is_tracing()}
+
+@app.post("/admin/traces", dependencies=[Depends(require_admin)])
+async def admin_configure_tracing(enabled: bool = True, slow_ms: float = None):
+    """Turn request tracing on or off at runtime"""
+    tracer.enabled = enabled
+    if slow_ms is not None:
+        tracer.slow_ms = slow_ms
+    return {"enabled": tracer.enabled, "slow_ms": tracer.slow_ms}
+
+@app.post("/admin/models/{name}/swap", dependencies=[Depends(require_admin)])
+async def admin_swap_model(name: str, repo: str = None, dtype: str = None, warm: bool = True):
+    """Load a new version of a model (other weights, or another dtype) beside the
+    current one, warm it, and switch new requests to it. Generations already
+    running finish on the old version, which is released after the last one."""
+    models = distilgpt2_assistant.models
+    if models is None or name not in models:
+        raise HTTPException(status_code=404, detail=f"Unknown model: {name}")
+    if dtype is not None and dtype not in DTYPES:
+        raise HTTPException(status_code=400, detail=f"dtype must be one of {sorted(DTYPES)}")
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, lambda: models.swap(name, repo, dtype, warm))
+    except Exception as e:
+        # The current version keeps serving
+        raise HTTPException(status_code=502, detail=f"Swap failed: {e}")
+
+@app.post("/admin/drain", dependencies=[Depends(require_admin)])
+async def admin_drain(timeout: float = None):
+    """Stop admitting requests, wait for the in-flight ones and close WebSockets with a
+    reconnect hint, without exiting; e.g. before taking the worker out of a load balancer"""
+    remaining = await lifecycle.drain(timeout)
+    return {**lifecycle.stats(), "remaining": remaining}
+
+@app.get("/admin/conversations/export", dependencies=[Depends(require_admin)])
+async def admin_export_conversations(cursor: int = 0, session_id: str = None, limit: int = None, page_size: int = 1000):
+    """Stream logged turns after ``cursor`` as NDJSON, oldest first. Pages are read on a
+    worker thread as the client consumes them, so memory stays flat; resume an
+    interrupted export with ``cursor`` set to the last ``seq`` received."""
+    if conversation_log is None:
+        raise HTTPException(status_code=404, detail="The conversation log is disabled; set CONVERSATION_LOG")
+    return StreamingResponse(
+        conversation_log.export_ndjson(cursor, session_id, limit, min(max(page_size, 1), 10000)),
+        media_type="application/x-ndjson"
+    )
+
+def run(port: int = 8006):
+    """Serve the app on ``port`` with WORKERS processes"""
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8006)
+    workers = int(os.getenv("WORKERS", "1"))
+    ws_options = {
+        # permessage-deflate for WebSocket clients that offer it in the handshake
+        "ws_per_message_deflate": os.getenv("WS_DEFLATE", "1") == "1",
+        # Protocol-level pings, which clients answer without any code of their own;
+        # a peer that doesn't answer within WS_PING_TIMEOUT seconds is disconnected
+        "ws_ping_interval": float(os.getenv("WS_PING_INTERVAL", "30")),
+        "ws_ping_timeout": float(os.getenv("WS_PING_TIMEOUT", "30"))
+    }
+    # Drains in-flight requests on SIGTERM; uvicorn's own --workers mode can't, see README
+    graceful_server = lambda config: GracefulServer(config, lifecycle)
+    fork = False
+    if workers > 1 and distilgpt2_assistant.local_model is not None:
+        from weights import WEIGHT_LOADING
+        fork = WEIGHT_LOADING == "fork"
+    if fork:
+        import prefork
+        prefork.serve(app, "0.0.0.0", port, workers, server_factory=graceful_server, **ws_options)
+    elif workers > 1:
+        uvicorn.run("main_distilgpt2:app", host="0.0.0.0", port=port, workers=workers, **ws_options)
+    else:
+        graceful_server(uvicorn.Config(app, host="0.0.0.0", port=port, **ws_options)).run()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+import threading
+import tracemalloc
+
+from logs import logger
+
+
+def approx_size(obj) -> int:
+    """Rough deep size of plain data (str, numbers, lists, tuples, dicts) in bytes"""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(approx_size(key) + approx_size(value) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(approx_size(item) for item in obj)
+    return size
+
+
+def process_rss() -> int:
+    """Resident set size of this process in bytes, or 0 where unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class _Consumer:
+    __slots__ = ("name", "size", "evict")
+
+    def __init__(self, name: str, size, evict):
+        self.name = name
+        self.size = size
+        self.evict = evict
+
+
+class MemoryAccountant:
+    """Central record of what holds memory, with an optional global byte budget.
+
+    Components register a ``size()`` callable and, if they can give memory
+    back, an ``evict(nbytes)`` callable that drops their coldest entries and
+    returns the bytes freed. When the total is over budget, evictable
+    components are asked to shrink, largest first, until it fits.
+    """
+
+    def __init__(self, budget: int = 0):
+        self.budget = budget
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._consumers = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, size, evict=None):
+        with self._lock:
+            self._consumers[name] = _Consumer(name, size, evict)
+
+    def unregister(self, name: str):
+        with self._lock:
+            self._consumers.pop(name, None)
+
+    def usage(self) -> dict:
+        with self._lock:
+            consumers = list(self._consumers.values())
+        usage = {}
+        for consumer in consumers:
+            try:
+                usage[consumer.name] = int(consumer.size())
+            except Exception as e:
+                logger.error("memory_accounting_error", component=consumer.name, error=repr(e))
+        return usage
+
+    def enforce(self) -> dict:
+        """Evict until the total fits the budget; returns bytes freed per component"""
+        if not self.budget:
+            return {}
+        usage = self.usage()
+        total = sum(usage.values())
+        freed = {}
+        with self._lock:
+            evictable = [consumer for consumer in self._consumers.values() if consumer.evict and consumer.name in usage]
+        for consumer in sorted(evictable, key=lambda consumer: usage[consumer.name], reverse=True):
+            if total <= self.budget:
+                break
+            released = consumer.evict(total - self.budget)
+            if released:
+                freed[consumer.name] = released
+                total -= released
+                self.evictions += 1
+                self.evicted_bytes += released
+        return freed
+
+    async def monitor(self, interval: float = 10.0):
+        """Enforce the budget every ``interval`` seconds"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            freed = await loop.run_in_executor(None, self.enforce)
+            if freed:
+                logger.warning("memory_evicted", freed=freed)
+
+    def report(self) -> dict:
+        usage = self.usage()
+        accounted = sum(usage.values())
+        rss = process_rss()
+        return {
+            "budget_bytes": self.budget,
+            "accounted_bytes": accounted,
+            "rss_bytes": rss,
+            "unaccounted_bytes": max(0, rss - accounted) if rss else None,
+            "components": dict(sorted(usage.items(), key=lambda item: item[1], reverse=True)),
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes
+        }
+
+
+def tracemalloc_top(limit: int = 20, key_type: str = "lineno") -> list:
+    """Largest allocation sites since tracemalloc was started, or [] when it is off"""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    return [
+        {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+        for stat in snapshot.statistics(key_type)[:limit]
+    ]
+
+
+memory = MemoryAccountant()
@@ -0,0 +1,48 @@
+import threading
+from collections import defaultdict, deque
+
+
+class Metrics:
+    """Process-wide counters and latency samples, safe to update from worker threads"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.counters = defaultdict(float)
+        self.latencies = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            samples = self.latencies.get(name)
+            if samples is None:
+                samples = self.latencies[name] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentiles(self, name: str) -> dict:
+        with self._lock:
+            samples = sorted(self.latencies.get(name, ()))
+        if not samples:
+            return {"count": 0}
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+        return {
+            "count": len(samples),
+            "p50_ms": round(pick(0.50), 3),
+            "p95_ms": round(pick(0.95), 3),
+            "p99_ms": round(pick(0.99), 3)
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+            names = list(self.latencies)
+        return {
+            "counters": counters,
+            "latency": {name: self.percentiles(name) for name in names}
+        }
+
+
+metrics = Metrics()
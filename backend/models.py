@@ -0,0 +1,328 @@
+import contextvars
+import gc
+import threading
+import time
+
+from logs import logger
+
+# torch, transformers and weights.py are imported on the first load, so the
+# app can import this module without them when the local models are disabled
+
+# Model the client asked for, if any; otherwise it is chosen by language
+request_model = contextvars.ContextVar("request_model", default=None)
+
+# Precisions a model can be loaded or swapped in at
+DTYPES = ("float32", "float16", "bfloat16")
+
+
+class ModelUnavailable(Exception):
+    """The model failed to load, now or recently enough that it isn't retried yet"""
+
+
+def parse_models(spec: str) -> dict:
+    """"name=value,name=value" as a dict; a bare name maps to itself"""
+    models = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        models[name.strip()] = value.strip() or name.strip()
+    return models
+
+
+def model_bytes(model) -> int:
+    if model is None:
+        return 0
+    return sum(tensor.numel() * tensor.element_size() for tensor in list(model.parameters()) + list(model.buffers()))
+
+
+def kv_bytes_per_token(model) -> int:
+    """Key and value vectors per layer for one token of this model's cache"""
+    config = model.config
+    layers = getattr(config, "num_hidden_layers", 0) or 0
+    hidden = getattr(config, "hidden_size", 0) or 0
+    return 2 * layers * hidden * next(model.parameters()).element_size()
+
+
+class ModelVersion:
+    """One loaded copy of a model's weights; generations hold it until they finish"""
+    __slots__ = ("name", "number", "repo", "dtype", "model", "tokenizer", "bytes", "kv_bytes_per_token",
+                 "load_seconds", "active", "retired")
+
+    def __init__(self, name: str, number: int, repo: str, dtype: str, model, tokenizer, load_seconds: float):
+        self.name = name
+        self.number = number
+        self.repo = repo
+        self.dtype = dtype
+        self.model = model
+        self.tokenizer = tokenizer
+        self.bytes = model_bytes(model)
+        self.kv_bytes_per_token = kv_bytes_per_token(model)
+        self.load_seconds = load_seconds
+        self.active = 0
+        self.retired = False
+
+
+class _Entry:
+    __slots__ = ("name", "repo", "dtype", "current", "draining", "versions", "last_used", "loads", "unloads",
+                 "swaps", "requests", "failed_at", "error", "lock")
+
+    def __init__(self, name: str, repo: str, dtype: str):
+        self.name = name
+        self.repo = repo
+        self.dtype = dtype
+        self.current = None
+        # Replaced versions that generations still hold
+        self.draining = []
+        self.versions = 0
+        self.last_used = 0.0
+        self.loads = 0
+        self.unloads = 0
+        self.swaps = 0
+        self.requests = 0
+        self.failed_at = None
+        self.error = None
+        # Held while loading or swapping, so they happen one at a time per model
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """Causal language models served by name, loaded on first use.
+
+    ``models`` maps a name to its Hugging Face id. A request uses the model
+    it asked for (``request_model``), else the one configured for its
+    language, else ``default``. When the resident weights exceed
+    ``memory_cap`` bytes, idle models are unloaded least recently used
+    first. A model that fails to load is not retried for ``retry_after``
+    seconds.
+
+    Generations ``acquire`` a ModelVersion and ``release`` it when done, so
+    neither unloading nor ``swap`` frees weights that are still in use:
+    ``swap`` loads and warms a new version beside the current one, switches
+    new requests to it, and the old version is released by its last user.
+    """
+
+    def __init__(self, models: dict, default: str, languages: dict = None, device: str = "cpu",
+                 memory_cap: int = 0, retry_after: float = 300.0, dtype: str = "float32"):
+        if default not in models:
+            raise ValueError(f"Default model {default!r} is not one of {sorted(models)}")
+        self.default = default
+        self.languages = {language: name for language, name in (languages or {}).items() if name in models}
+        self.device = device
+        self.memory_cap = memory_cap
+        self.retry_after = retry_after
+        self._entries = {name: _Entry(name, repo, dtype) for name, repo in models.items()}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def select(self, language: str = None) -> str:
+        return request_model.get() or self.languages.get(language, self.default)
+
+    def is_loaded(self, name: str) -> bool:
+        return self._entries[name].current is not None
+
+    def available(self, name: str) -> bool:
+        """Loaded, or expected to load: it hasn't failed within ``retry_after`` seconds"""
+        entry = self._entries[name]
+        return entry.current is not None or entry.failed_at is None or time.monotonic() - entry.failed_at >= self.retry_after
+
+    def acquire(self, name: str) -> ModelVersion:
+        """The current version, held against release until ``release``; loads it if needed"""
+        entry = self._entries[name]
+        with self._lock:
+            version = entry.current
+            if version is not None:
+                return self._hold(entry, version)
+        with entry.lock:
+            with self._lock:
+                version = entry.current
+                if version is not None:
+                    return self._hold(entry, version)
+            if entry.failed_at is not None and time.monotonic() - entry.failed_at < self.retry_after:
+                raise ModelUnavailable(f"{name}: {entry.error}")
+            try:
+                version = self._load(entry, entry.repo, entry.dtype)
+            except Exception as e:
+                entry.failed_at = time.monotonic()
+                entry.error = str(e)
+                raise ModelUnavailable(f"{name}: {e}") from e
+            entry.failed_at = entry.error = None
+            with self._lock:
+                entry.current = version
+                self._hold(entry, version)
+        self._enforce_cap()
+        return version
+
+    def release(self, version: ModelVersion):
+        with self._lock:
+            version.active -= 1
+            if not (version.retired and version.active == 0):
+                return
+            entry = self._entries[version.name]
+            entry.draining.remove(version)
+        self._free([version])
+
+    def load(self, name: str):
+        """Load ``name`` now, e.g. at startup, without counting a request"""
+        self.release(self.acquire(name))
+        self._entries[name].requests -= 1
+
+    def swap(self, name: str, repo: str = None, dtype: str = None, warm: bool = True) -> dict:
+        """Load a new version of ``name`` beside the current one, warm it and switch to it.
+
+        Blocks for the load; requests keep using the current version until the
+        switch. Raises if the new version fails to load or warm up.
+        """
+        entry = self._entries[name]
+        repo = repo or entry.repo
+        dtype = dtype or entry.dtype
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype must be one of {sorted(DTYPES)}")
+        with entry.lock:
+            version = self._load(entry, repo, dtype)
+            warm_seconds = self._warm(version) if warm else 0.0
+            with self._lock:
+                old, entry.current = entry.current, version
+                entry.repo, entry.dtype = repo, dtype
+                entry.failed_at = entry.error = None
+                entry.swaps += 1
+                entry.last_used = time.monotonic()
+                if old is not None:
+                    old.retired = True
+                    if old.active:
+                        entry.draining.append(old)
+        if old is not None and not old.active:
+            self._free([old])
+        self._enforce_cap()
+        logger.info("model_swapped", model=name, version=version.number, repo=repo, dtype=dtype,
+                    draining=old.active if old is not None else 0)
+        return {
+            "model": name,
+            "version": version.number,
+            "repo": repo,
+            "dtype": dtype,
+            "load_seconds": round(version.load_seconds, 3),
+            "warm_seconds": round(warm_seconds, 3),
+            "previous_version": old.number if old is not None else None,
+            "previous_in_flight": old.active if old is not None else 0
+        }
+
+    def _hold(self, entry: _Entry, version: ModelVersion) -> ModelVersion:
+        version.active += 1
+        entry.requests += 1
+        entry.last_used = time.monotonic()
+        return version
+
+    def _load(self, entry: _Entry, repo: str, dtype: str) -> ModelVersion:
+        import torch
+        from transformers import AutoTokenizer
+        from weights import load_model
+        logger.info("model_loading", model=entry.name, repo=repo, dtype=dtype)
+        started = time.perf_counter()
+        try:
+            model = load_model(repo, self.device)
+            if dtype != "float32":
+                model = model.to(getattr(torch, dtype))
+            tokenizer = AutoTokenizer.from_pretrained(repo)
+        except Exception as e:
+            logger.error("model_load_error", model=entry.name, repo=repo, error=str(e))
+            raise
+        entry.versions += 1
+        entry.loads += 1
+        version = ModelVersion(entry.name, entry.versions, repo, dtype, model, tokenizer, time.perf_counter() - started)
+        logger.info("model_loaded", model=entry.name, version=version.number, seconds=round(version.load_seconds, 2),
+                    bytes=version.bytes)
+        return version
+
+    def _warm(self, version: ModelVersion) -> float:
+        """One short greedy generation, so the first real request doesn't pay for lazy initialisation"""
+        import torch
+        started = time.perf_counter()
+        inputs = version.tokenizer("Hello, how are you?", return_tensors="pt").input_ids.to(self.device)
+        with torch.no_grad():
+            version.model.generate(inputs, max_new_tokens=4, do_sample=False, pad_token_id=version.tokenizer.eos_token_id)
+        return time.perf_counter() - started
+
+    def _free(self, versions: list):
+        import torch
+        for version in versions:
+            version.model = version.tokenizer = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        logger.info("model_versions_freed", models=[f"{version.name}@{version.number}" for version in versions],
+                    bytes=sum(version.bytes for version in versions))
+
+    def _unload_idle(self, nbytes: int, keep: int = 0) -> int:
+        """Unload idle models, least recently used first, until ``nbytes`` are freed.
+
+        The ``keep`` most recently used models stay loaded.
+        """
+        freed = 0
+        unloaded = []
+        with self._lock:
+            resident = sorted((entry for entry in self._entries.values() if entry.current is not None),
+                              key=lambda entry: entry.last_used)
+            for entry in resident[:max(0, len(resident) - keep)]:
+                if freed >= nbytes:
+                    break
+                if entry.current.active:
+                    continue
+                unloaded.append(entry.current)
+                freed += entry.current.bytes
+                entry.current = None
+                entry.unloads += 1
+        if unloaded:
+            self._free(unloaded)
+        return freed
+
+    def _enforce_cap(self):
+        if not self.memory_cap:
+            return
+        excess = self.resident_bytes() - self.memory_cap
+        if excess > 0:
+            self._unload_idle(excess)
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum((entry.current.bytes if entry.current is not None else 0)
+                       + sum(version.bytes for version in entry.draining)
+                       for entry in self._entries.values())
+
+    def memory_usage(self) -> int:
+        return self.resident_bytes()
+
+    def evict(self, nbytes: int) -> int:
+        """Memory accountant hook: unload idle models but keep the most recently used one"""
+        return self._unload_idle(nbytes, keep=1)
+
+    def in_flight(self) -> int:
+        """Generations holding any version of any model"""
+        with self._lock:
+            return sum((entry.current.active if entry.current is not None else 0)
+                       + sum(version.active for version in entry.draining)
+                       for entry in self._entries.values())
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                entry.name: {
+                    "repo": entry.repo,
+                    "dtype": entry.dtype,
+                    "loaded": entry.current is not None,
+                    "version": entry.current.number if entry.current is not None else None,
+                    "bytes": entry.current.bytes if entry.current is not None else 0,
+                    "load_seconds": round(entry.current.load_seconds, 3) if entry.current is not None else None,
+                    "loads": entry.loads,
+                    "unloads": entry.unloads,
+                    "swaps": entry.swaps,
+                    "requests": entry.requests,
+                    "active": entry.current.active if entry.current is not None else 0,
+                    "draining": [{"version": version.number, "active": version.active, "bytes": version.bytes}
+                                 for version in entry.draining],
+                    "idle_seconds": round(now - entry.last_used, 1) if entry.last_used else None,
+                    "error": entry.error
+                }
+                for entry in self._entries.values()
+            }
@@ -0,0 +1,186 @@
+import asyncio
+import re
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+
+from admission import TokenBucket
+from logs import logger
+from wiki_titles import MAX_TITLE_WORDS, title_key
+
+_SENTENCE = re.compile(r"(?<=[.!?:;])\s+|\n+")
+_WORD = re.compile(r"[\w][\w'’-]*")
+# Lower-case words that may sit inside a name: "Leonardo da Vinci", "Bay of Biscay"
+CONNECTORS = {'of', 'the', 'and', 'de', 'del', 'la', 'le', 'les', 'du', 'des', 'da', 'do', 'dos', 'di', 'von',
+              'van', 'der', 'den', 'y', 'e', 'et', 'und'}
+# Articles that start a sentence but not a page title: "The Mona Lisa" -> "Mona Lisa"
+ARTICLES = {'the', 'a', 'an', 'el', 'la', 'los', 'las', 'un', 'una', 'le', 'les', 'der', 'die', 'das', 'ein',
+            'eine', 'il', 'lo', 'gli', 'o', 'os', 'as'}
+
+
+def extract_entities(text: str) -> Counter:
+    """Runs of capitalised words in ``text``, counted.
+
+    A single capitalised word at the start of a sentence is skipped, since it
+    is usually capitalised only because of its position.
+    """
+    entities = Counter()
+    for sentence in _SENTENCE.split(text):
+        words = _WORD.findall(sentence)
+        run, start = [], 0
+        for i, word in enumerate(words + [""]):
+            if word[:1].isupper():
+                if not run:
+                    start = i
+                run.append(word)
+                continue
+            if run and word.lower() in CONNECTORS and i + 1 < len(words) and words[i + 1][:1].isupper():
+                run.append(word)
+                continue
+            if run and start == 0 and run[0].lower() in ARTICLES:
+                run, start = run[1:], 1
+            if run and not (len(run) == 1 and start == 0) and len(run) <= MAX_TITLE_WORDS:
+                entities[" ".join(run)] += 1
+            run = []
+    return entities
+
+
+class Prefetcher:
+    """Fetches pages a session is likely to ask about next, in the background.
+
+    ``fetch(lang_code, title)`` is a coroutine that stores the page in the
+    cache and returns whether there was one. Titles are offered with a
+    session id; each session has a token bucket of ``session_rate`` titles
+    per second (bursts of ``session_burst``) and all fetches share a global
+    bucket of ``rate`` (``burst``). Fetches run one at a time and only while
+    no foreground request is in progress: entering ``foreground()`` cancels
+    the running fetch and puts its title back at the head of the queue.
+    Titles older than ``max_age`` seconds are dropped instead of fetched.
+    """
+
+    def __init__(self, fetch, enabled: bool = True, rate: float = 1.0, burst: float = 5.0,
+                 session_rate: float = 0.1, session_burst: float = 6.0, queue_size: int = 100,
+                 max_age: float = 60.0, max_sessions: int = 10000, track: int = 10000):
+        self.fetch = fetch
+        self.enabled = enabled
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.queue_size = queue_size
+        self.max_age = max_age
+        self.max_sessions = max_sessions
+        self.track = track
+        self.budget = TokenBucket(rate, burst)
+        self.active = 0
+        self.counts = Counter()
+        self._sessions = OrderedDict()
+        self._queue = deque()
+        # Keys fetched recently, and of those the stored ones not yet used
+        self._seen = OrderedDict()
+        self._stored = OrderedDict()
+        self._wake = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = None
+
+    @contextmanager
+    def foreground(self):
+        """Marks a foreground request; prefetching pauses until none are left"""
+        self.active += 1
+        self._idle.clear()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            if not self.active:
+                self._idle.set()
+
+    def offer(self, session_id: str, lang_code: str, titles: list):
+        """Queue ``titles`` for prefetching as far as the session's budget allows"""
+        if not self.enabled:
+            return
+        bucket = self._sessions.get(session_id)
+        if bucket is None:
+            bucket = self._sessions[session_id] = TokenBucket(self.session_rate, self.session_burst)
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        now = time.monotonic()
+        for title in titles:
+            key = f"{lang_code}:{title_key(title)}"
+            if key in self._seen or any(item[2] == key for item in self._queue):
+                continue
+            if bucket.take():
+                self.counts["session_budget"] += 1
+                break
+            if len(self._queue) >= self.queue_size:
+                self._queue.popleft()
+                self.counts["queue_full"] += 1
+            self._queue.append((lang_code, title, key, now))
+            self.counts["queued"] += 1
+        if self._queue:
+            self._wake.set()
+
+    def record_hit(self, key: str):
+        """A foreground lookup was served from the cache under ``key``"""
+        if self._stored.pop(key, None) is not None:
+            self.counts["hits"] += 1
+
+    def _remember(self, table: OrderedDict, key: str):
+        table[key] = True
+        if len(table) > self.track:
+            table.popitem(last=False)
+
+    async def run(self):
+        if not self.enabled:
+            return
+        while True:
+            await self._wake.wait()
+            if not self._queue:
+                self._wake.clear()
+                continue
+            await self._idle.wait()
+            wait = self.budget.take()
+            if wait:
+                await asyncio.sleep(wait)
+                continue
+            lang_code, title, key, queued_at = item = self._queue.popleft()
+            if time.monotonic() - queued_at > self.max_age:
+                self.counts["expired"] += 1
+                self.budget.tokens += 1
+                continue
+            self._task = asyncio.ensure_future(self.fetch(lang_code, title))
+            try:
+                await asyncio.wait([self._task])
+                if self._task.cancelled():
+                    # A foreground request arrived: try again once it is done
+                    self.counts["preempted"] += 1
+                    self.budget.tokens += 1
+                    self._queue.appendleft(item)
+                    continue
+                self._remember(self._seen, key)
+                self.counts["fetched"] += 1
+                if self._task.result():
+                    self.counts["stored"] += 1
+                    self._remember(self._stored, key)
+            except asyncio.CancelledError:
+                self._task.cancel()
+                raise
+            except Exception as e:
+                self.counts["errors"] += 1
+                logger.warning("prefetch_error", title=title, error=repr(e))
+            finally:
+                self._task = None
+
+    def stats(self) -> dict:
+        stored = self.counts["stored"]
+        names = ("queued", "session_budget", "queue_full", "expired", "preempted", "fetched", "stored", "errors", "hits")
+        return {
+            "enabled": self.enabled,
+            "queue": len(self._queue),
+            **{name: self.counts[name] for name in names},
+            # Share of stored pages a later foreground lookup used
+            "hit_rate": round(self.counts["hits"] / stored, 3) if stored else None
+        }
@@ -0,0 +1,55 @@
+import gc
+import os
+import signal
+import socket
+
+import uvicorn
+
+from logs import logger
+
+
+def serve(app, host: str, port: int, workers: int, server_factory=uvicorn.Server, **config):
+    """Run ``workers`` uvicorn servers forked from this already-initialised process.
+
+    Everything loaded before the fork (notably the model weights) is shared
+    copy-on-write. ``uvicorn --workers`` can't do this because it spawns fresh
+    interpreters that import the app again. ``config`` is passed on to
+    uvicorn.Config, and each worker's server is ``server_factory(config)``.
+    """
+    # Move everything allocated so far out of the collector's reach; otherwise
+    # the first GC pass in each child writes to every object and unshares it
+    gc.collect()
+    gc.freeze()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            server = server_factory(uvicorn.Config(app, host=host, port=port, **config))
+            server.run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+    logger.info("prefork_workers", workers=workers, pids=children)
+
+    def stop(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for child in children:
+        try:
+            os.waitpid(child, 0)
+        except ChildProcessError:
+            pass
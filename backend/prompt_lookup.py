@@ -0,0 +1,130 @@
+import torch
+
+
+class NgramIndex:
+    """Maps each n-gram of a token sequence to the position after its latest occurrence.
+
+    An n-gram is registered once the token following it is known, so looking
+    up the sequence's own tail finds its previous occurrence, if any.
+    """
+
+    def __init__(self, tokens: list, max_ngram: int = 3):
+        self.max_ngram = max_ngram
+        self.tokens = []
+        self.table = {}
+        for token in tokens:
+            self.append(token)
+
+    def append(self, token: int):
+        length = len(self.tokens)
+        for n in range(1, min(self.max_ngram, length) + 1):
+            self.table[tuple(self.tokens[length - n:])] = length
+        self.tokens.append(token)
+
+    def draft(self, count: int) -> list:
+        """Tokens that followed the longest earlier match of the current tail"""
+        if count <= 0:
+            return []
+        for n in range(min(self.max_ngram, len(self.tokens)), 0, -1):
+            position = self.table.get(tuple(self.tokens[-n:]))
+            if position is not None:
+                return self.tokens[position:position + count]
+        return []
+
+
+def warp(logits: torch.Tensor, temperature: float, top_k: int) -> torch.Tensor:
+    """Same temperature and top-k warping generate() applies before sampling"""
+    logits = logits.float() / temperature
+    if 0 < top_k < logits.shape[-1]:
+        threshold = torch.topk(logits, top_k).values[-1]
+        logits = logits.masked_fill(logits < threshold, float("-inf"))
+    return torch.softmax(logits, dim=-1)
+
+
+def crop_cache(past_key_values, length: int):
+    if hasattr(past_key_values, "crop"):
+        # Cache objects: a negative argument removes that many trailing tokens
+        excess = past_key_values.get_seq_length() - length
+        if excess > 0:
+            past_key_values.crop(-excess)
+        return past_key_values
+    return tuple((key[:, :, :length, :], value[:, :, :length, :]) for key, value in past_key_values)
+
+
+@torch.no_grad()
+def prompt_lookup_generate(model, input_ids: torch.Tensor, max_new_tokens: int, do_sample: bool = True,
+                           temperature: float = 1.0, top_k: int = 50, eos_token_id: int = None,
+                           stopping_criteria=None, max_ngram: int = 3, num_draft: int = 8,
+                           generator: torch.Generator = None, stats: dict = None) -> torch.Tensor:
+    """Decode with drafts copied from earlier in the sequence, verified in one forward pass.
+
+    The draft is whatever followed the last occurrence of the current tail
+    n-gram in the prompt or the reply so far, which is often right when the
+    answer copies from a retrieved passage. Each step feeds the pending token
+    plus the draft through the model once. A drafted token ``d`` is accepted
+    with probability p(d), and on rejection the replacement is sampled from p
+    with ``d`` removed: since the draft is deterministic, that is exactly
+    speculative sampling, so the output distribution is the same as plain
+    sampling (for greedy decoding, the same tokens). Only batch size 1 is
+    supported.
+    """
+    device = input_ids.device
+    tokens = input_ids[0].tolist()
+    index = NgramIndex(tokens, max_ngram)
+    stats = stats if stats is not None else {}
+    stats.setdefault("forward_passes", 0)
+    stats.setdefault("drafted", 0)
+    stats.setdefault("accepted", 0)
+
+    # The cache always covers every token but the last, which is fed next
+    past = None
+    if len(tokens) > 1:
+        past = model(input_ids[:, :-1], use_cache=True).past_key_values
+        stats["forward_passes"] += 1
+
+    generated = 0
+    while generated < max_new_tokens:
+        draft = index.draft(min(num_draft, max_new_tokens - generated - 1))
+        feed = torch.tensor([[tokens[-1]] + draft], device=device)
+        output = model(feed, past_key_values=past, use_cache=True)
+        stats["forward_passes"] += 1
+        stats["drafted"] += len(draft)
+        logits = output.logits[0]
+
+        new_tokens = []
+        for i, token in enumerate(draft):
+            if do_sample:
+                probs = warp(logits[i], temperature, top_k)
+                if torch.rand((), device=probs.device, generator=generator) < probs[token]:
+                    new_tokens.append(token)
+                    continue
+                probs[token] = 0
+                new_tokens.append(int(torch.multinomial(probs / probs.sum(), 1, generator=generator)))
+            else:
+                best = int(torch.argmax(logits[i]))
+                new_tokens.append(best)
+                if best == token:
+                    continue
+            break
+        else:
+            # Every draft token was accepted: the last position gives one more for free
+            if do_sample:
+                probs = warp(logits[len(draft)], temperature, top_k)
+                new_tokens.append(int(torch.multinomial(probs, 1, generator=generator)))
+            else:
+                new_tokens.append(int(torch.argmax(logits[len(draft)])))
+        accepted = len(new_tokens) - 1
+        stats["accepted"] += accepted
+
+        # Keep cache entries for the fed token and the accepted draft tokens only
+        past = crop_cache(output.past_key_values, len(tokens) + accepted)
+
+        for token in new_tokens:
+            tokens.append(token)
+            index.append(token)
+            generated += 1
+            if token == eos_token_id or generated >= max_new_tokens:
+                return torch.tensor([tokens], device=device)
+            if stopping_criteria is not None and stopping_criteria(torch.tensor([tokens], device=device), None):
+                return torch.tensor([tokens], device=device)
+    return torch.tensor([tokens], device=device)
@@ -0,0 +1,126 @@
+import os
+
+import aiohttp
+
+from cancellation import CancellationToken
+from logs import logger
+
+# Everything that can answer a message. templates and cache are free and
+# always tried first; the rest answer in the order they are listed in PROVIDERS
+PROVIDER_NAMES = ("templates", "cache", "web", "huggingface", "ollama", "gpt2")
+FREE_PROVIDERS = ("templates", "cache")
+
+# Hugging Face Inference API; the provider is skipped without a key
+HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
+HUGGINGFACE_URL = os.getenv("HUGGINGFACE_URL", "https://api-inference.huggingface.co/models/microsoft/DialoGPT-medium")
+# A local Ollama server
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama2")
+
+
+def parse_providers(spec: str) -> list:
+    """"templates,web,gpt2" as a list, in order; unknown names raise ValueError"""
+    providers = []
+    for name in filter(None, (part.strip() for part in spec.split(","))):
+        if name not in PROVIDER_NAMES:
+            raise ValueError(f"Unknown provider {name!r}; choose from {', '.join(PROVIDER_NAMES)}")
+        if name not in providers:
+            providers.append(name)
+    return providers
+
+
+def _timeout(cancel_token: CancellationToken, default: float) -> float:
+    if cancel_token is None:
+        return default
+    return max(cancel_token.remaining(default), 0.01)
+
+
+class HuggingFaceProvider:
+    """A hosted model behind the Hugging Face Inference API"""
+    label = "Hugging Face"
+
+    def __init__(self, url: str, api_key: str, timeout: float = 10.0):
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.timeout = timeout
+        # Prepare prompt based on language
+        self.language_prompts = {
+            "spanish": "Responde en español. ",
+            "french": "Réponds en français. ",
+            "german": "Antworte auf Deutsch. ",
+            "portuguese": "Responde em português. ",
+            "italian": "Rispondi in italiano. ",
+            "english": "Respond in English. "
+        }
+
+    async def answer(self, message: str, language: str, cancel_token: CancellationToken = None) -> str:
+        """The model's reply, or None if it failed or said too little"""
+        prompt = self.language_prompts.get(language, self.language_prompts["english"]) + message
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.url, headers=self.headers, json={"inputs": prompt},
+                                        timeout=_timeout(cancel_token, self.timeout)) as response:
+                    if response.status != 200:
+                        return None
+                    result = await response.json()
+            if result and 'generated_text' in result[0]:
+                # Extract only the new response part
+                response_text = result[0]['generated_text'].replace(prompt, "").strip()
+                if len(response_text) > 10:
+                    return response_text
+            return None
+        except Exception as e:
+            logger.error("huggingface_error", error=repr(e))
+            return None
+
+
+class OllamaProvider:
+    """A model served by a local Ollama instance"""
+    label = "Ollama"
+
+    def __init__(self, url: str, model: str, timeout: float = 15.0):
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        # Language-specific system prompts
+        self.system_prompts = {
+            "spanish": "Eres un asistente IA útil que responde en español. Sé conciso pero completo.",
+            "french": "Tu es un assistant IA utile qui répond en français. Sois concis mais complet.",
+            "german": "Du bist ein nützlicher KI-Assistent, der auf Deutsch antwortet. Sei prägnant aber vollständig.",
+            "portuguese": "Você é um assistente de IA útil que responde em português. Seja conciso mas completo.",
+            "italian": "Sei un assistente IA utile che risponde in italiano. Sii conciso ma completo.",
+            "english": "You are a helpful AI assistant that responds in English. Be concise but complete."
+        }
+
+    async def answer(self, message: str, language: str, cancel_token: CancellationToken = None) -> str:
+        """The model's reply, or None if Ollama isn't running or failed"""
+        system_prompt = self.system_prompts.get(language, self.system_prompts["english"])
+        payload = {
+            "model": self.model,
+            "prompt": f"{system_prompt}\n\nUser: {message}\nAssistant:",
+            "stream": False,
+            "options": {"temperature": 0.7, "num_predict": 150}
+        }
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.url, json=payload, timeout=_timeout(cancel_token, self.timeout)) as response:
+                    if response.status != 200:
+                        return None
+                    result = await response.json()
+            return result.get('response', '').strip() or None
+        except Exception as e:
+            logger.error("ollama_error", error=repr(e))
+            return None
+
+
+def remote_providers(names: list) -> dict:
+    """The hosted-model providers among ``names``, by name"""
+    providers = {}
+    if "huggingface" in names:
+        if HUGGINGFACE_API_KEY:
+            providers["huggingface"] = HuggingFaceProvider(HUGGINGFACE_URL, HUGGINGFACE_API_KEY)
+        else:
+            logger.warning("provider_disabled", provider="huggingface", reason="HUGGINGFACE_API_KEY is not set")
+    if "ollama" in names:
+        providers["ollama"] = OllamaProvider(OLLAMA_URL, OLLAMA_MODEL)
+    return providers
@@ -0,0 +1,126 @@
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from cancellation import CancellationToken, RequestCancelled
+
+# Lower runs first: people waiting on a WebSocket, then plain API calls, then
+# batch and background work
+PRIORITIES = {"interactive": 0, "normal": 1, "batch": 2, "background": 3}
+
+# Priority of the request being handled; set by the endpoints
+request_priority = contextvars.ContextVar("request_priority", default="normal")
+
+
+class _Job:
+    __slots__ = ("func", "future", "priority", "cancel_token", "enqueued")
+
+    def __init__(self, func, future: Future, priority: str, cancel_token: CancellationToken):
+        self.func = func
+        self.future = future
+        self.priority = priority
+        self.cancel_token = cancel_token
+        self.enqueued = time.monotonic()
+
+
+class InferenceScheduler:
+    """Runs blocking jobs on a fixed set of threads, most urgent first.
+
+    Jobs are ordered by deadline plus ``aging`` seconds per priority level, so
+    an interactive job goes ahead of a batch job with a similar deadline, but
+    with equal timeouts a batch job is never overtaken by work that arrived
+    more than ``2 * aging`` seconds after it: waiting ages it up the queue.
+    Jobs whose request was cancelled while queued are dropped without running.
+    Threads start on first use, and again in a forked worker.
+    """
+
+    def __init__(self, workers: int = 1, aging: float = 5.0, default_timeout: float = 30.0,
+                 observe=None, name: str = "inference"):
+        self.workers = workers
+        self.aging = aging
+        self.default_timeout = default_timeout
+        self.observe = observe
+        self.running = 0
+        self.skipped = 0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._name = name
+        self._threads = []
+        self._pid = None
+
+    def submit(self, func, priority: str = "normal", cancel_token: CancellationToken = None) -> Future:
+        future = Future()
+        timeout = cancel_token.remaining(self.default_timeout) if cancel_token else self.default_timeout
+        key = time.monotonic() + timeout + PRIORITIES.get(priority, PRIORITIES["normal"]) * self.aging
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("scheduler is shut down")
+            if self._pid != os.getpid():
+                self._start()
+            heapq.heappush(self._heap, (key, next(self._sequence), _Job(func, future, priority, cancel_token)))
+            self._condition.notify()
+        return future
+
+    def _start(self):
+        self._pid = os.getpid()
+        self._threads = [threading.Thread(target=self._work, name=f"{self._name}_{i}", daemon=True)
+                         for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def depth(self) -> int:
+        """Jobs queued or running"""
+        return len(self._heap) + self.running
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while not self._heap and not self._shutdown:
+                    self._condition.wait()
+                if not self._heap:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                self.running += 1
+            try:
+                self._run(job)
+            finally:
+                with self._condition:
+                    self.running -= 1
+
+    def _run(self, job: _Job):
+        if not job.future.set_running_or_notify_cancel():
+            return
+        if job.cancel_token is not None and job.cancel_token.cancelled:
+            self.skipped += 1
+            job.future.set_exception(RequestCancelled(job.cancel_token.reason))
+            return
+        if self.observe is not None:
+            self.observe(job.priority, time.monotonic() - job.enqueued)
+        try:
+            result = job.func()
+        except BaseException as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+
+    def stats(self) -> dict:
+        with self._condition:
+            queued = {}
+            for _, _, job in self._heap:
+                queued[job.priority] = queued.get(job.priority, 0) + 1
+        return {"workers": self.workers, "running": self.running, "queued": queued, "skipped_cancelled": self.skipped}
+
+    def shutdown(self, wait: bool = True):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
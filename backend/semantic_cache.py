@@ -0,0 +1,277 @@
+import re
+import threading
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+
+from memory import approx_size
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+# "isn't" -> "is not", so the negation survives punctuation stripping
+_CONTRACTION = re.compile(r"n['’]t\b")
+
+# Words that carry little meaning in a question; dropped before embedding so
+# "who invented the telephone" and "telephone inventor?" share most features
+STOPWORDS = {
+    'english': {'the', 'a', 'an', 'is', 'are', 'was', 'were', 'of', 'to', 'in', 'on', 'for', 'me', 'about',
+                'what', 'who', 'whom', 'which', 'when', 'where', 'why', 'how', 'do', 'does', 'did', 'tell', 'please', 'can',
+                'you', 'know'},
+    'spanish': {'el', 'la', 'los', 'las', 'un', 'una', 'es', 'son', 'de', 'del', 'en', 'que', 'qué', 'quién', 'quien',
+                'cuál', 'cual', 'cómo', 'como', 'dónde', 'cuándo', 'por', 'me', 'sobre'},
+    'french': {'le', 'la', 'les', 'un', 'une', 'est', 'sont', 'de', 'du', 'des', 'en', 'qui', 'que', 'quoi', 'quel',
+               'quelle', 'comment', 'où', 'quand', 'moi', 'sur'},
+    'german': {'der', 'die', 'das', 'ein', 'eine', 'ist', 'sind', 'von', 'in', 'wer', 'was', 'wie', 'wo', 'wann',
+               'welche', 'mir', 'über'},
+    'portuguese': {'o', 'a', 'os', 'as', 'um', 'uma', 'é', 'são', 'de', 'do', 'da', 'em', 'que', 'quem', 'qual',
+                   'como', 'onde', 'quando', 'me', 'sobre'},
+    'italian': {'il', 'lo', 'la', 'i', 'gli', 'le', 'un', 'una', 'è', 'sono', 'di', 'del', 'della', 'in', 'chi',
+                'che', 'cosa', 'quale', 'come', 'dove', 'quando', 'mi', 'su'}
+}
+
+# Words that turn a question into its opposite; never stopwords, and only ever match themselves
+NEGATIONS = {
+    'english': {'not', 'no', 'never', 'nor', 'none', 'nothing', 'without', 'cannot'},
+    'spanish': {'no', 'nunca', 'sin', 'ni', 'nada', 'ningún', 'ninguna'},
+    'french': {'ne', 'pas', 'non', 'jamais', 'sans', 'rien', 'aucun', 'aucune'},
+    'german': {'nicht', 'kein', 'keine', 'keinen', 'keiner', 'nie', 'niemals', 'ohne', 'nichts'},
+    'portuguese': {'não', 'nao', 'nunca', 'sem', 'nem', 'nada', 'nenhum', 'nenhuma'},
+    'italian': {'non', 'mai', 'senza', 'né', 'niente', 'nessun', 'nessuno', 'nessuna'}
+}
+# Inflectional endings that may differ between paraphrases ("invented"/"inventor"),
+# longest first; other languages have to match word for word
+SUFFIXES = {
+    'english': ('ations', 'ation', 'ings', 'ions', 'ing', 'ion', 'ers', 'ors', 'er', 'or', 'ed', 'es', 's')
+}
+# Shorter words are too ambiguous to strip ("war", "car"): they match exactly
+MIN_STEM = 4
+
+
+def normalize_query(text: str, language: str = 'english') -> list:
+    """Lower-cased, punctuation-free content words of a query"""
+    text = _CONTRACTION.sub(" not", unicodedata.normalize("NFC", text.lower()))
+    text = _SPACES.sub(" ", _PUNCTUATION.sub(" ", text)).strip()
+    stopwords = STOPWORDS.get(language, STOPWORDS['english'])
+    words = [word for word in text.split() if word not in stopwords]
+    return words or text.split()
+
+
+def query_terms(words: list, language: str = 'english') -> frozenset:
+    """Content words of a query for ``conflicts``: numbers, negations and short
+    words as they are, other words without their inflectional ending"""
+    negations = NEGATIONS.get(language, NEGATIONS['english'])
+    suffixes = SUFFIXES.get(language, ())
+    terms = set()
+    for word in words:
+        if word not in negations and not any(char.isdigit() for char in word):
+            for suffix in suffixes:
+                if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+                    word = word[:-len(suffix)]
+                    break
+        terms.add(word)
+    return frozenset(terms)
+
+
+def conflicts(terms: frozenset, other: frozenset, language: str = 'english') -> bool:
+    """Whether two similar queries ask different things: a number or negation
+    that only one has, or a word swapped for another ("austria"/"australia",
+    "boiling"/"freezing"), which is how a different named thing or property
+    shows up in a lower-cased query. Words only added on one side are fine"""
+    only_here, only_there = terms - other, other - terms
+    negations = NEGATIONS.get(language, NEGATIONS['english'])
+    for term in only_here | only_there:
+        if term in negations or any(char.isdigit() for char in term):
+            return True
+    return bool(only_here and only_there)
+
+
+class HashedNgramEmbedder:
+    """Cheap text embedding: signed feature hashing of words and character n-grams.
+
+    Character n-grams let morphological variants ("invented"/"inventor") share
+    features without any model; the vectors are L2-normalised so a dot product
+    is the cosine similarity.
+    """
+
+    def __init__(self, dim: int = 256, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def features(self, words: list) -> list:
+        features = [f"w:{word}" for word in words]
+        for word in words:
+            padded = f"<{word}>"
+            if len(padded) <= self.ngram:
+                features.append(f"c:{padded}")
+                continue
+            features.extend(f"c:{padded[i:i + self.ngram]}" for i in range(len(padded) - self.ngram + 1))
+        return features
+
+    def embed(self, words: list) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self.features(words):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class SemanticCache:
+    """Answer cache that matches paraphrased queries by cosine similarity.
+
+    Of the ``top_k`` nearest entries above the threshold, the closest one
+    whose terms don't ``conflict`` with the query's is the hit: "what is
+    python 3" never gets the answer for "what is python 2", nor "capital of
+    austria" the one for "capital of australia", however close their
+    vectors are. Vectors live in a preallocated ``capacity x dim`` float32
+    matrix so a lookup is one matrix-vector product over the filled rows.
+    Entries only match queries in the same language, each language has its
+    own similarity threshold, and the least recently used entry is replaced
+    when full. Process-local: it is a derived index, rebuilt from traffic
+    after restart. Eviction under memory pressure frees the cached values;
+    the matrix stays allocated and the freed rows are reused first.
+    """
+
+    def __init__(self, capacity: int = 10000, dim: int = 256, thresholds: dict = None,
+                 default_threshold: float = 0.75, ttl: float = None, top_k: int = 8):
+        self.capacity = capacity
+        self.top_k = top_k
+        self.embedder = HashedNgramEmbedder(dim)
+        self.thresholds = thresholds or {}
+        self.default_threshold = default_threshold
+        self.ttl = ttl
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.language_ids = np.full(capacity, -1, dtype=np.int16)
+        self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.expires = np.full(capacity, np.inf, dtype=np.float64)
+        self.keys = [None] * capacity
+        self.terms = [None] * capacity
+        self.values = [None] * capacity
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        # Lookups whose neighbours above the threshold all conflicted with the query
+        self.near_misses = 0
+        self.value_bytes = 0
+        self._free = []
+        self._index = {}
+        self._languages = {}
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    def _language_id(self, language: str) -> int:
+        return self._languages.setdefault(language, len(self._languages))
+
+    def _key(self, words: list, language: str) -> str:
+        return f"{language}:{' '.join(words)}"
+
+    def embed(self, query: str, language: str) -> tuple:
+        words = normalize_query(query, language)
+        return self._key(words, language), query_terms(words, language), self.embedder.embed(words)
+
+    def lookup(self, query: str, language: str = 'english'):
+        """Cached value for the closest paraphrase of ``query``, or None.
+
+        A matrix-vector product over every entry, about 10 ms at 100k entries,
+        so callers on the event loop should run it in a worker thread.
+        """
+        key, terms, vector = self.embed(query, language)
+        with self._lock:
+            # Exact normalised match first, then the nearest neighbours above threshold
+            slot = self._index.get(key)
+            if slot is None and self.size:
+                scores = self.vectors[:self.size] @ vector
+                mask = (self.language_ids[:self.size] != self._language_id(language)) | (self.expires[:self.size] < time.time())
+                scores = np.where(mask, -1.0, scores)
+                candidates = np.flatnonzero(scores >= self.thresholds.get(language, self.default_threshold))
+                if len(candidates) > self.top_k:
+                    candidates = candidates[np.argpartition(scores[candidates], -self.top_k)[-self.top_k:]]
+                for candidate in candidates[np.argsort(-scores[candidates])]:
+                    if not conflicts(terms, self.terms[candidate], language):
+                        slot = int(candidate)
+                        break
+                else:
+                    if len(candidates):
+                        self.near_misses += 1
+            if slot is None or self.expires[slot] < time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._clock += 1
+            self.last_used[slot] = self._clock
+            return self.values[slot]
+
+    def store(self, query: str, language: str, value):
+        key, terms, vector = self.embed(query, language)
+        with self._lock:
+            slot = self._index.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                elif self.size < self.capacity:
+                    slot = self.size
+                    self.size += 1
+                else:
+                    slot = int(np.argmin(self.last_used))
+                    del self._index[self.keys[slot]]
+                self._index[key] = slot
+            if self.keys[slot] is not None:
+                self.value_bytes -= approx_size(self.keys[slot]) + approx_size(self.values[slot])
+            self.value_bytes += approx_size(key) + approx_size(value)
+            self._clock += 1
+            self.vectors[slot] = vector
+            self.language_ids[slot] = self._language_id(language)
+            self.last_used[slot] = self._clock
+            self.expires[slot] = time.time() + self.ttl if self.ttl else np.inf
+            self.keys[slot] = key
+            self.terms[slot] = terms
+            self.values[slot] = value
+
+    def memory_usage(self) -> int:
+        arrays = self.vectors.nbytes + self.language_ids.nbytes + self.last_used.nbytes + self.expires.nbytes
+        return arrays + self.value_bytes
+
+    def evict(self, nbytes: int) -> int:
+        """Drop least recently used entries until ``nbytes`` of values are freed"""
+        freed = 0
+        with self._lock:
+            filled = [slot for slot in np.argsort(self.last_used[:self.size]) if self.keys[slot] is not None]
+            for slot in filled:
+                if freed >= nbytes:
+                    break
+                slot = int(slot)
+                freed += approx_size(self.keys[slot]) + approx_size(self.values[slot])
+                del self._index[self.keys[slot]]
+                self.keys[slot] = None
+                self.terms[slot] = None
+                self.values[slot] = None
+                # Never matches again, and is the first row store() reuses
+                self.expires[slot] = -np.inf
+                self.last_used[slot] = 0
+                self._free.append(slot)
+            self.value_bytes -= freed
+        return freed
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.size,
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "near_misses": self.near_misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def parse_thresholds(spec: str) -> dict:
+    """Parse ``english=0.75,spanish=0.8`` into a dict"""
+    thresholds = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        language, _, value = item.partition("=")
+        thresholds[language.strip()] = float(value)
+    return thresholds
@@ -0,0 +1,235 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+
+from memory import approx_size
+
+
+class StateBackend(ABC):
+    """Storage for conversation history and caches.
+
+    Histories are kept per session, trimmed to the last ``limit`` turns.
+    Caches are namespaced key/value stores holding JSON-serialisable values
+    with an optional time-to-live.
+    """
+
+    @abstractmethod
+    def append_history(self, session_id: str, entry: dict, limit: int = 10):
+        ...
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> list:
+        ...
+
+    @abstractmethod
+    def cache_get(self, namespace: str, key: str):
+        ...
+
+    @abstractmethod
+    def cache_set(self, namespace: str, key: str, value, ttl: float = None):
+        ...
+
+    @abstractmethod
+    def cache_delete(self, namespace: str, key: str):
+        ...
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held in this process"""
+        return 0
+
+    def evict(self, nbytes: int) -> int:
+        """Drop the coldest entries until ``nbytes`` are freed; returns bytes freed"""
+        return 0
+
+
+class InProcessBackend(StateBackend):
+    """Process-local state; each uvicorn worker sees only its own"""
+
+    def __init__(self, max_cache_entries: int = 10000):
+        self.max_cache_entries = max_cache_entries
+        # Both in least recently used order
+        self.histories = OrderedDict()
+        self.caches = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def append_history(self, session_id: str, entry: dict, limit: int = 10):
+        size = approx_size(entry)
+        with self._lock:
+            history = self.histories.get(session_id)
+            if history is None or history.maxlen != limit:
+                if history is not None and len(history) > limit:
+                    self.bytes -= sum(approx_size(old) for old in list(history)[:-limit])
+                history = self.histories[session_id] = deque(history or (), maxlen=limit)
+            if len(history) == history.maxlen:
+                self.bytes -= approx_size(history[0])
+            history.append(entry)
+            self.histories.move_to_end(session_id)
+            self.bytes += size
+
+    def get_history(self, session_id: str) -> list:
+        with self._lock:
+            return list(self.histories.get(session_id, ()))
+
+    def cache_get(self, namespace: str, key: str):
+        with self._lock:
+            cache = self.caches.get(namespace)
+            if cache is None or key not in cache:
+                return None
+            value, expires = cache[key]
+            if expires is not None and expires < time.time():
+                del cache[key]
+                self.bytes -= approx_size(key) + approx_size(value)
+                return None
+            cache.move_to_end(key)
+            return value
+
+    def cache_set(self, namespace: str, key: str, value, ttl: float = None):
+        expires = time.time() + ttl if ttl else None
+        size = approx_size(key) + approx_size(value)
+        with self._lock:
+            cache = self.caches.setdefault(namespace, OrderedDict())
+            if key in cache:
+                self.bytes -= approx_size(key) + approx_size(cache[key][0])
+            cache[key] = (value, expires)
+            cache.move_to_end(key)
+            self.bytes += size
+            while len(cache) > self.max_cache_entries:
+                old_key, (old_value, _) = cache.popitem(last=False)
+                self.bytes -= approx_size(old_key) + approx_size(old_value)
+
+    def cache_delete(self, namespace: str, key: str):
+        with self._lock:
+            entry = self.caches.get(namespace, {}).pop(key, None)
+            if entry is not None:
+                self.bytes -= approx_size(key) + approx_size(entry[0])
+
+    def memory_usage(self) -> int:
+        return self.bytes
+
+    def evict(self, nbytes: int) -> int:
+        """Expired cache entries go first, then cache entries and then whole
+        sessions, least recently used first"""
+        freed = 0
+        now = time.time()
+        with self._lock:
+            for cache in self.caches.values():
+                for key in [key for key, (_, expires) in cache.items() if expires is not None and expires < now]:
+                    freed += approx_size(key) + approx_size(cache.pop(key)[0])
+            while freed < nbytes and any(self.caches.values()):
+                # Oldest entry across namespaces, one namespace at a time
+                for cache in self.caches.values():
+                    if cache and freed < nbytes:
+                        key, (value, _) = cache.popitem(last=False)
+                        freed += approx_size(key) + approx_size(value)
+            while freed < nbytes and self.histories:
+                _, history = self.histories.popitem(last=False)
+                freed += sum(approx_size(entry) for entry in history)
+            self.bytes -= freed
+        return freed
+
+
+class SQLiteBackend(StateBackend):
+    """State shared by every worker on the host through one SQLite file in WAL mode.
+
+    WAL lets readers proceed while a writer commits, so workers don't serialise
+    on history reads. Each thread keeps its own connection.
+    """
+
+    def __init__(self, path: str, max_cache_entries: int = 10000):
+        self.path = path
+        self.max_cache_entries = max_cache_entries
+        self._local = threading.local()
+        db = self._db()
+        db.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                entry TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS history_session ON history (session_id, seq);
+            CREATE TABLE IF NOT EXISTS cache (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires REAL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed);
+        """)
+
+    def _db(self) -> sqlite3.Connection:
+        # A connection inherited across fork() must not be used by the child
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def append_history(self, session_id: str, entry: dict, limit: int = 10):
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT INTO history (session_id, entry) VALUES (?, ?)", (session_id, json.dumps(entry)))
+            db.execute(
+                "DELETE FROM history WHERE session_id = ? AND seq NOT IN "
+                "(SELECT seq FROM history WHERE session_id = ? ORDER BY seq DESC LIMIT ?)",
+                (session_id, session_id, limit)
+            )
+
+    def get_history(self, session_id: str) -> list:
+        rows = self._db().execute(
+            "SELECT entry FROM history WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def cache_get(self, namespace: str, key: str):
+        db = self._db()
+        row = db.execute(
+            "SELECT value, expires FROM cache WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] is not None and row[1] < now:
+            self.cache_delete(namespace, key)
+            return None
+        db.execute("UPDATE cache SET accessed = ? WHERE namespace = ? AND key = ?", (now, namespace, key))
+        return json.loads(row[0])
+
+    def cache_set(self, namespace: str, key: str, value, ttl: float = None):
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), now + ttl if ttl else None, now)
+            )
+            db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN "
+                "(SELECT key FROM cache WHERE namespace = ? ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, self.max_cache_entries)
+            )
+
+    def cache_delete(self, namespace: str, key: str):
+        self._db().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+
+def create_state_backend() -> StateBackend:
+    """Pick the backend from STATE_BACKEND (``memory`` or ``sqlite``)"""
+    kind = os.getenv("STATE_BACKEND", "memory")
+    max_entries = int(os.getenv("STATE_CACHE_ENTRIES", "10000"))
+    if kind == "sqlite":
+        return SQLiteBackend(os.getenv("STATE_DB", "chatbot_state.db"), max_entries)
+    if kind == "memory":
+        return InProcessBackend(max_entries)
+    raise ValueError(f"Unknown STATE_BACKEND: {kind}")
@@ -0,0 +1,400 @@
+import random
+
+# Canned replies for social intents, used by the templates provider and the
+# zero-compute fast path in main_distilgpt2.py; 'busy' is the reply when a
+# request is shed under load
+SOCIAL_RESPONSES = {
+    'english': {
+        'greeting': [
+            "Hello! How can I assist you today?",
+            "Hi there! What can I help you with?",
+            "Greetings! I'm here to help. What's on your mind?",
+            "Hello! Feel free to ask me anything."
+        ],
+        'thanks': [
+            "You're very welcome! I'm glad I could help. Is there anything else I can assist you with?",
+            "My pleasure! Don't hesitate to ask if you need more help.",
+            "You're welcome! I'm here whenever you need assistance.",
+            "Happy to help! Feel free to ask me anything else."
+        ],
+        'goodbye': [
+            "Goodbye! Have a wonderful day, and feel free to come back anytime!",
+            "See you later! It was great chatting with you.",
+            "Farewell! I'm here whenever you need assistance in the future.",
+            "Take care! Don't hesitate to return if you need help."
+        ],
+        'busy': [
+            "I'm getting a lot of questions right now. Please ask me again in a moment."
+        ]
+    },
+    'spanish': {
+        'greeting': [
+            "¡Hola! ¿Cómo puedo ayudarte hoy?",
+            "¡Hola! ¿En qué puedo asistirte?",
+            "¡Saludos! Estoy aquí para ayudar. ¿Qué tienes en mente?",
+            "¡Hola! No dudes en preguntarme lo que necesites."
+        ],
+        'thanks': [
+            "¡De nada! Me alegra haber podido ayudar. ¿Hay algo más en lo que pueda asistirte?",
+            "¡Es un placer! No dudes en pedir más ayuda si la necesitas.",
+            "¡Con gusto! Estoy aquí siempre que necesites asistencia.",
+            "¡Feliz de ayudar! No dudes en preguntarme cualquier otra cosa."
+        ],
+        'goodbye': [
+            "¡Adiós! ¡Que tengas un excelente día, y no dudes en volver cuando quieras!",
+            "¡Hasta luego! Fue un placer conversar contigo.",
+            "¡Nos vemos! Estaré aquí siempre que necesites asistencia en el futuro.",
+            "¡Cuídate! No dudes en regresar si necesitas ayuda."
+        ],
+        'busy': [
+            "Estoy recibiendo muchas preguntas en este momento. Por favor, vuelve a preguntarme en un momento."
+        ]
+    },
+    'french': {
+        'greeting': [
+            "Bonjour ! Comment puis-je vous aider aujourd'hui ?",
+            "Salut ! En quoi puis-je vous aider ?",
+            "Bonjour ! Je suis là pour aider. Qu'est-ce qui vous préoccupe ?",
+            "Bonjour ! N'hésitez pas à me poser des questions."
+        ],
+        'thanks': [
+            "De rien ! Je suis content d'avoir pu aider. Y a-t-il autre chose que je puisse faire pour vous ?",
+            "Avec plaisir ! N'hésitez pas à demander plus d'aide si nécessaire.",
+            "Je vous en prie ! Je suis là quand vous avez besoin d'assistance.",
+            "Heureux d'aider ! N'hésitez pas à me poser d'autres questions."
+        ],
+        'goodbye': [
+            "Au revoir ! Passez une excellente journée, et revenez quand vous voulez !",
+            "À bientôt ! Ce fut un plaisir de discuter avec vous.",
+            "Au revoir ! Je serai là chaque fois que vous aurez besoin d'aide.",
+            "Prenez soin de vous ! N'hésitez pas à revenir si vous avez besoin d'aide."
+        ],
+        'busy': [
+            "Je reçois beaucoup de questions en ce moment. Merci de me reposer la question dans un instant."
+        ]
+    },
+    'german': {
+        'greeting': [
+            "Hallo! Wie kann ich Ihnen heute helfen?",
+            "Hallo! Wobei kann ich Ihnen behilflich sein?",
+            "Grüße! Ich bin hier, um zu helfen. Was beschäftigt Sie?",
+            "Hallo! Fühlen Sie sich frei, mir alles zu fragen."
+        ],
+        'thanks': [
+            "Gern geschehen! Ich freue mich, dass ich helfen konnte. Gibt es noch etwas, wobei ich Ihnen behilflich sein kann?",
+            "Mit Vergnügen! Zögern Sie nicht, um mehr Hilfe zu bitten, wenn Sie sie benötigen.",
+            "Bitte! Ich bin immer da, wenn Sie Unterstützung benötigen.",
+            "Freut mich zu helfen! Fühlen Sie sich frei, mir andere Fragen zu stellen."
+        ],
+        'goodbye': [
+            "Auf Wiedersehen! Einen schönen Tag noch, und kommen Sie jederzeit wieder!",
+            "Bis später! Es war schön, mit Ihnen zu plaudern.",
+            "Tschüss! Ich bin hier, wann immer Sie Unterstützung brauchen.",
+            "Machen Sie es gut! Zögern Sie nicht, zurückzukommen, wenn Sie Hilfe brauchen."
+        ],
+        'busy': [
+            "Ich bekomme gerade sehr viele Fragen. Bitte frag mich gleich noch einmal."
+        ]
+    },
+    'portuguese': {
+        'greeting': [
+            "Olá! Como posso ajudá-lo hoje?",
+            "Oi! Em que posso ajudar?",
+            "Saudações! Estou aqui para ajudar. O que você tem em mente?",
+            "Olá! Sinta-se à vontade para me perguntar qualquer coisa."
+        ],
+        'thanks': [
+            "De nada! Fico feliz em ter podido ajudar. Há mais alguma coisa em que possa ajudar?",
+            "Com prazer! Não hesite em pedir mais ajuda se precisar.",
+            "Por nada! Estou aqui sempre que você precisar de assistência.",
+            "Feliz em ajudar! Sinta-se à vontade para me perguntar qualquer outra coisa."
+        ],
+        'goodbye': [
+            "Tchau! Tenha um ótimo dia, e volte quando quiser!",
+            "Até logo! Foi um prazer conversar com você.",
+            "Até mais! Estarei aqui sempre que você precisar de ajuda.",
+            "Cuide-se! Não hesite em voltar se precisar de ajuda."
+        ],
+        'busy': [
+            "Estou recebendo muitas perguntas agora. Por favor, pergunte novamente em um momento."
+        ]
+    },
+    'italian': {
+        'greeting': [
+            "Ciao! Come posso aiutarti oggi?",
+            "Ciao! In cosa posso aiutarti?",
+            "Saluti! Sono qui per aiutare. Cosa hai in mente?",
+            "Ciao! Sentiti libero di chiedermi qualsiasi cosa."
+        ],
+        'thanks': [
+            "Prego! Sono felice di aver potuto aiutare. C'è altro che posso fare per te?",
+            "Con piacere! Non esitare a chiedere più aiuto se necessario.",
+            "Prego! Sono qui ogni volta che hai bisogno di assistenza.",
+            "Felice di aiutare! Sentiti libero di chiedermi qualsiasi altra cosa."
+        ],
+        'goodbye': [
+            "Arrivederci! Ti auguro una splendida giornata, e torna quando vuoi!",
+            "A presto! È stato un piacere chiacchierare con te.",
+            "Ciao! Sono qui ogni volta che hai bisogno di assistenza.",
+            "Abbi cura di te! Non esitare a tornare se hai bisogno di aiuto."
+        ],
+        'busy': [
+            "Sto ricevendo molte domande in questo momento. Per favore, chiedimelo di nuovo tra un attimo."
+        ]
+    }
+}
+
+
+def get_template_response(language: str, intent: str) -> str:
+    """Random canned reply for a social intent, or None if there is none"""
+    responses = SOCIAL_RESPONSES.get(language, SOCIAL_RESPONSES['english']).get(intent)
+    return random.choice(responses) if responses else None
+
+
+# Multilingual response templates
+def get_multilingual_response(message: str, language: str) -> str:
+    """Get response in the detected language"""
+    
+    if language == 'spanish':
+        message_lower = message.lower().strip()
+        
+        # Spanish greetings
+        if any(greeting in message_lower for greeting in ['hola', 'buenos días', 'buenas tardes', 'buenas noches']):
+            return random.choice(SOCIAL_RESPONSES['spanish']['greeting'])
+        
+        # Spanish help requests
+        elif any(help_word in message_lower for help_word in ['ayuda', 'ayúdame', 'asistencia', 'qué puedes hacer']):
+            return """Puedo ayudarte con diversas tareas incluyendo:
+• Responder preguntas sobre diferentes temas
+• Proporcionar explicaciones y definiciones
+• Ayudar con la resolución de problemas
+• Ofrecer sugerencias y recomendaciones
+• Asistir con aprendizaje e investigación
+• Proporcionar información y consejos generales
+
+¿En qué área específica te gustaría recibir ayuda?"""
+        
+        # Spanish questions
+        elif message_lower.endswith('?') or any(q_word in message_lower for q_word in ['qué', 'cómo', 'por qué', 'cuándo', 'dónde', 'quién', 'cuál']):
+            return f"¡Esa es una excelente pregunta! Basado en tu consulta sobre '{message[:50]}...', estaré encantado de ayudarte. En un entorno de producción, proporcionaría una respuesta detallada y precisa. Por ahora, estoy demostrando el sistema de respuestas. ¿Podrías decirme más sobre qué información específica estás buscando?"
+        
+        # Spanish technology
+        elif any(tech_word in message_lower for tech_word in ['código', 'programación', 'software', 'aplicación', 'página web', 'desarrollo']):
+            return """¡Definitivamente puedo ayudar con temas de tecnología y programación! Puedo asistirte con:
+• Explicaciones de código y depuración
+• Diseño y optimización de algoritmos
+• Mejores prácticas en desarrollo de software
+• Recomendaciones de stack tecnológico
+• Consejos de arquitectura de sistemas
+• Conceptos y tutoriales de programación
+
+¿Qué desafío específico de programación o tema estás trabajando?"""
+        
+        # Spanish thanks
+        elif any(thank_word in message_lower for thank_word in ['gracias', 'agradecido', 'te agradezco']):
+            return random.choice(SOCIAL_RESPONSES['spanish']['thanks'])
+        
+        # Spanish goodbye
+        elif any(bye_word in message_lower for bye_word in ['adiós', 'chao', 'hasta luego', 'nos vemos']):
+            return random.choice(SOCIAL_RESPONSES['spanish']['goodbye'])
+        
+        else:
+            return f"Entiendo que estás preguntando sobre '{message[:30]}...'. ¡Este es un tema interesante! En un entorno de producción con integración de IA, te proporcionaría una respuesta detallada y precisa basada en conocimiento actual. Por ahora, estoy demostrando el flujo de conversación. ¿Qué aspecto específico de este tema te interesa más?"
+    
+    elif language == 'french':
+        message_lower = message.lower().strip()
+        
+        # French greetings
+        if any(greeting in message_lower for greeting in ['bonjour', 'salut', 'bonsoir']):
+            return random.choice(SOCIAL_RESPONSES['french']['greeting'])
+        
+        # French help requests
+        elif any(help_word in message_lower for help_word in ['aide', "aide-moi", 'assistance', 'que peux-tu faire']):
+            return """Je peux vous aider avec diverses tâches notamment :
+• Répondre à des questions sur différents sujets
+• Fournir des explications et des définitions
+• Aider à la résolution de problèmes
+• Offrir des suggestions et recommandations
+• Assister avec l'apprentissage et la recherche
+• Fournir des informations et conseils généraux
+
+Dans quel domaine spécifique aimeriez-vous de l'aide ?"""
+        
+        # French thanks
+        elif any(thank_word in message_lower for thank_word in ['merci', 'remercié', 'je vous remercie']):
+            return random.choice(SOCIAL_RESPONSES['french']['thanks'])
+        
+        else:
+            return f"Je comprends que vous demandez à propos de '{message[:30]}...'. C'est un sujet intéressant ! Dans un environnement de production avec intégration IA, je vous fournirais une réponse détaillée et précise basée sur les connaissances actuelles. Pour l'instant, je démontre le flux de conversation. Quel aspect spécifique de ce sujet vous intéresse le plus ?"
+    
+    elif language == 'german':
+        message_lower = message.lower().strip()
+        
+        # German greetings
+        if any(greeting in message_lower for greeting in ['hallo', 'guten tag', 'guten morgen', 'guten abend']):
+            return random.choice(SOCIAL_RESPONSES['german']['greeting'])
+        
+        # German help requests
+        elif any(help_word in message_lower for help_word in ['hilfe', 'hilf mir', 'unterstützung', 'was kannst du tun']):
+            return """Ich kann Ihnen mit verschiedenen Aufgaben helfen, einschließlich:
+• Beantwortung von Fragen zu verschiedenen Themen
+• Bereitstellung von Erklärungen und Definitionen
+• Hilfe bei der Problemlösung
+• Anbieten von Vorschlägen und Empfehlungen
+• Unterstützung beim Lernen und Forschen
+• Bereitstellung allgemeiner Informationen und Ratschläge
+
+In welchem spezifischen Bereich möchten Sie Hilfe?"""
+        
+        # German thanks
+        elif any(thank_word in message_lower for thank_word in ['danke', 'vielen dank', 'ich danke dir']):
+            return random.choice(SOCIAL_RESPONSES['german']['thanks'])
+        
+        else:
+            return f"Ich verstehe, Sie fragen nach '{message[:30]}...'. Das ist ein interessantes Thema! In einer Produktionsumgebung mit KI-Integration würde ich Ihnen eine detaillierte, genaue Antwort basierend auf aktuellem Wissen geben. Derzeit demonstriere ich den Konversationsablauf. Welcher spezifische Aspekt dieses Themas interessiert Sie am meisten?"
+    
+    elif language == 'portuguese':
+        message_lower = message.lower().strip()
+        
+        # Portuguese greetings
+        if any(greeting in message_lower for greeting in ['olá', 'oi', 'bom dia', 'boa tarde', 'boa noite']):
+            return random.choice(SOCIAL_RESPONSES['portuguese']['greeting'])
+        
+        # Portuguese help requests
+        elif any(help_word in message_lower for help_word in ['ajuda', 'ajude-me', 'assistência', 'o que você pode fazer']):
+            return """Posso ajudá-lo com várias tarefas incluindo:
+• Responder perguntas sobre diferentes tópicos
+• Fornecer explicações e definições
+• Ajudar na resolução de problemas
+• Oferecer sugestões e recomendações
+• Assistir com aprendizado e pesquisa
+• Fornecer informações e conselhos gerais
+
+Em que área específica você gostaria de ajuda?"""
+        
+        # Portuguese thanks
+        elif any(thank_word in message_lower for thank_word in ['obrigado', 'agradecido', 'eu agradeço']):
+            return random.choice(SOCIAL_RESPONSES['portuguese']['thanks'])
+        
+        else:
+            return f"Entendo que você está perguntando sobre '{message[:30]}...'. Este é um tópico interessante! Em um ambiente de produção com integração de IA, eu forneceria uma resposta detalhada e precisa baseada em conhecimento atual. Por enquanto, estou demonstrando o fluxo de conversação. Que aspecto específico deste tópico mais lhe interessa?"
+    
+    elif language == 'italian':
+        message_lower = message.lower().strip()
+        
+        # Italian greetings
+        if any(greeting in message_lower for greeting in ['ciao', 'buongiorno', 'buonasera']):
+            return random.choice(SOCIAL_RESPONSES['italian']['greeting'])
+        
+        # Italian help requests
+        elif any(help_word in message_lower for help_word in ['aiuto', 'aiutami', 'assistenza', 'cosa puoi fare']):
+            return """Posso aiutarti con varie attività tra cui:
+• Rispondere a domande su diversi argomenti
+• Fornire spiegazioni e definizioni
+• Aiutare nella risoluzione dei problemi
+• Offrire suggerimenti e raccomandazioni
+• Assistere con apprendimento e ricerca
+• Fornire informazioni e consigli generali
+
+In quale area specifica vorresti aiuto?"""
+        
+        # Italian thanks
+        elif any(thank_word in message_lower for thank_word in ['grazie', 'ringraziato', 'ti ringrazio']):
+            return random.choice(SOCIAL_RESPONSES['italian']['thanks'])
+        
+        else:
+            return f"Capisco che stai chiedendo di '{message[:30]}...'. Questo è un argomento interessante! In un ambiente di produzione con integrazione IA, ti fornirei una risposta dettagliata e accurata basata sulla conoscenza attuale. Per ora, sto dimostrando il flusso di conversazione. Quale aspetto specifico di questo argomento ti interessa di più?"
+    
+    # Default to English
+    else:
+        return get_english_response(message)
+
+def get_english_response(message: str) -> str:
+    """Original English response system"""
+    message_lower = message.lower().strip()
+    
+    # Greeting patterns
+    if any(greeting in message_lower for greeting in ['hello', 'hi', 'hey', 'good morning', 'good afternoon', 'good evening']):
+        return random.choice(SOCIAL_RESPONSES['english']['greeting'])
+    
+    # Help and assistance patterns
+    elif any(help_word in message_lower for help_word in ['help', 'assist', 'support', 'what can you do']):
+        return """I can help you with various tasks including:
+• Answering questions on different topics
+• Providing explanations and definitions
+• Helping with problem-solving
+• Offering suggestions and recommendations
+• Assisting with learning and research
+• Providing general information and advice
+
+What specific area would you like help with?"""
+    
+    # Question patterns
+    elif message_lower.endswith('?') or any(q_word in message_lower for q_word in ['what', 'how', 'why', 'when', 'where', 'who', 'which']):
+        return f"That's a great question! Based on your query about '{message[:50]}...', I'd be happy to help. In a production environment, I would provide a detailed, accurate answer. For now, I'm demonstrating the response system. Could you tell me more about what specific information you're looking for?"
+    
+    # Technology and programming patterns
+    elif any(tech_word in message_lower for tech_word in ['code', 'programming', 'software', 'app', 'website', 'development']):
+        return """I can definitely help with technology and programming topics! I can assist with:
+• Code explanations and debugging
+• Algorithm design and optimization
+• Best practices in software development
+• Technology stack recommendations
+• System architecture advice
+• Programming concepts and tutorials
+
+What specific programming challenge or topic are you working on?"""
+    
+    # Business and professional patterns
+    elif any(biz_word in message_lower for biz_word in ['business', 'company', 'work', 'career', 'professional', 'job']):
+        return """I'm here to help with business and professional topics! I can provide guidance on:
+• Business strategy and planning
+• Career development and job searching
+• Professional communication
+• Project management
+• Leadership and teamwork
+• Industry trends and insights
+
+What business or professional area would you like to explore?"""
+    
+    # Learning and education patterns
+    elif any(learn_word in message_lower for learn_word in ['learn', 'study', 'education', 'course', 'tutorial', 'explain']):
+        return """I love helping people learn! I can assist with:
+• Explaining complex concepts in simple terms
+• Study strategies and techniques
+• Learning resources and recommendations
+• Subject-specific guidance
+• Skill development advice
+• Educational planning
+
+What subject or skill would you like to learn more about?"""
+    
+    # Personal advice patterns
+    elif any(advice_word in message_lower for advice_word in ['advice', 'suggest', 'recommend', 'opinion', 'think']):
+        return """I'd be happy to offer some thoughtful advice! While I can provide general guidance and suggestions, remember that personal situations are unique. I can help with:
+• General life advice and tips
+• Decision-making frameworks
+• Problem-solving approaches
+• Goal-setting strategies
+• Productivity and time management
+• Personal development ideas
+
+What specific area would you like advice on?"""
+    
+    # Thank you patterns
+    elif any(thank_word in message_lower for thank_word in ['thank', 'thanks', 'appreciate', 'grateful']):
+        return random.choice(SOCIAL_RESPONSES['english']['thanks'])
+    
+    # Goodbye patterns
+    elif any(bye_word in message_lower for bye_word in ['bye', 'goodbye', 'see you', 'farewell', 'exit']):
+        return random.choice(SOCIAL_RESPONSES['english']['goodbye'])
+    
+    # Default intelligent responses
+    else:
+        # Analyze message length and complexity for more contextual responses
+        if len(message.split()) < 3:
+            return "Could you tell me a bit more about that? I'd love to help but need a little more information to give you the best response."
+        elif len(message.split()) > 20:
+            return "That's quite detailed! Let me process what you've shared. In a full implementation, I would provide a comprehensive response addressing all the points you've mentioned. For now, could you help me understand what specific aspect is most important to you?"
+        else:
+            return f"I understand you're asking about '{message[:30]}...'. This is an interesting topic! In a production environment with AI integration, I would provide you with a detailed, accurate response based on current knowledge. For now, I'm demonstrating the conversation flow. What specific aspect of this topic interests you most?"
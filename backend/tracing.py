@@ -0,0 +1,115 @@
+import asyncio
+import contextvars
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from logs import logger
+
+
+class Span:
+    """A timed stage of a request, with nested child spans"""
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: dict = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin: float = None) -> dict:
+        origin = self.start if origin is None else origin
+        data = {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Opt-in per-request tracing.
+
+    A request is traced only inside ``trace_request``; ``span`` is a no-op
+    everywhere else, so instrumented code costs a context-var lookup when
+    tracing is off. Requests slower than ``slow_ms`` are logged with their
+    full span tree and kept in ``recent_slow``.
+    """
+
+    def __init__(self):
+        self.enabled = os.getenv("TRACING_ENABLED", "0") == "1"
+        self.slow_ms = float(os.getenv("TRACE_SLOW_MS", "1000"))
+        self.recent_slow = deque(maxlen=int(os.getenv("TRACE_KEEP", "50")))
+        self.loop_lag_ms = 0.0
+
+    @contextmanager
+    def trace_request(self, name: str, **attrs):
+        if not self.enabled:
+            yield None
+            return
+        root = Span(name, attrs)
+        token = _current_span.set(root)
+        try:
+            yield root
+        finally:
+            root.finish()
+            _current_span.reset(token)
+            if root.duration_ms >= self.slow_ms:
+                self._record_slow(root)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        child = Span(name, attrs)
+        parent.children.append(child)
+        token = _current_span.set(child)
+        try:
+            yield child
+        finally:
+            child.finish()
+            _current_span.reset(token)
+
+    def annotate(self, **attrs):
+        """Attach attributes to the innermost active span, if any"""
+        current = _current_span.get()
+        if current is not None:
+            current.attrs.update(attrs)
+
+    def _record_slow(self, root: Span):
+        trace = root.to_dict()
+        trace["loop_lag_ms"] = round(self.loop_lag_ms, 3)
+        trace["timestamp"] = time.time()
+        self.recent_slow.append(trace)
+        logger.warning("slow_request", trace=trace)
+
+    async def monitor_loop_lag(self, interval: float = 0.5):
+        """Measure how late the event loop wakes us up, as a proxy for loop blocking"""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.loop_lag_ms = max(0.0, (loop.time() - expected) * 1000)
+
+
+tracer = Tracer()
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import time
+
+from logs import logger
+
+# Written by benchmarks/autotune.py and read at startup; set TUNING_FILE= to ignore it
+TUNING_FILE = os.getenv("TUNING_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuning.json"))
+# Settings the tuner chooses; each can still be set explicitly in the environment
+SETTINGS = ("WORKERS", "INFERENCE_THREADS", "TORCH_THREADS", "TORCH_INTEROP_THREADS")
+
+
+def cpu_count() -> int:
+    """CPUs this process may run on, which can be fewer than the machine has"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def load_tuning(path: str = TUNING_FILE) -> dict:
+    """Settings from the tuning file; empty if there is none or it was tuned on a different CPU count"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            tuning = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("tuning_file_error", path=path, error=str(e))
+        return {}
+    if tuning.get("cpus") != cpu_count():
+        logger.warning("tuning_file_stale", path=path, tuned_cpus=tuning.get("cpus"), cpus=cpu_count())
+        return {}
+    return {name: value for name, value in tuning.get("settings", {}).items() if name in SETTINGS}
+
+
+def save_tuning(settings: dict, report: dict, path: str = TUNING_FILE):
+    import torch
+    tuning = {"settings": settings, "cpus": cpu_count(), "torch": torch.__version__,
+              "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **report}
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(tuning, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def apply_tuning(path: str = TUNING_FILE, configure_torch: bool = True) -> dict:
+    """Fill the settings that aren't set in the environment from the tuning file, then size
+    torch's thread pools if ``configure_torch``; returns the settings taken from the file.
+
+    Has to run before torch does any parallel work, since the inter-op pool
+    can only be sized once.
+    """
+    applied = {name: value for name, value in load_tuning(path).items() if name not in os.environ}
+    for name, value in applied.items():
+        os.environ[name] = str(value)
+    if configure_torch:
+        import torch
+        if os.getenv("TORCH_THREADS"):
+            torch.set_num_threads(int(os.environ["TORCH_THREADS"]))
+        if os.getenv("TORCH_INTEROP_THREADS"):
+            try:
+                torch.set_num_interop_threads(int(os.environ["TORCH_INTEROP_THREADS"]))
+            except RuntimeError as e:
+                logger.warning("torch_interop_threads_error", error=str(e))
+    if applied:
+        logger.info("tuning_applied", path=path, **applied)
+    return applied
+
+
+def thread_stats() -> dict:
+    """CPU and torch thread counts; torch's only if something already imported it"""
+    stats = {"cpus": cpu_count()}
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        stats.update(torch_threads=torch.get_num_threads(), torch_interop_threads=torch.get_num_interop_threads())
+    return stats
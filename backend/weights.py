@@ -0,0 +1,85 @@
+import fcntl
+import glob
+import hashlib
+import os
+
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, PreTrainedModel
+from transformers.utils import cached_file
+
+# How model weights are loaded:
+#   private - every process reads its own fp32 copy (from_pretrained)
+#   mmap    - weights are exported once to a torch file and memory-mapped, so all
+#             workers on the host share the same page-cache pages
+#   fork    - the parent process loads the model and forks the workers (see
+#             prefork.py); parameters stay shared copy-on-write
+WEIGHT_LOADING = os.getenv("WEIGHT_LOADING", "private")
+WEIGHTS_DIR = os.getenv("WEIGHTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".weights"))
+WEIGHT_FILES = ("model.safetensors", "model.safetensors.index.json", "pytorch_model.bin", "pytorch_model.bin.index.json")
+
+
+def checkpoint_fingerprint(model_name: str) -> str:
+    """Short hash identifying the checkpoint ``model_name`` resolves to now.
+
+    For a hub id that is the snapshot directory, named after the commit; for a
+    local directory, the names, sizes and modification times of its weight files.
+    """
+    resolved = None
+    for filename in WEIGHT_FILES:
+        resolved = cached_file(model_name, filename, _raise_exceptions_for_missing_entries=False)
+        if resolved is not None:
+            break
+    if resolved is None:
+        raise OSError(f"No weights found for {model_name}")
+    snapshot = os.path.dirname(resolved)
+    digest = hashlib.sha256(os.path.realpath(snapshot).encode())
+    for path in sorted(glob.glob(os.path.join(snapshot, "*"))):
+        if os.path.basename(path).startswith(("model", "pytorch_model")):
+            stat = os.stat(path)
+            digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def export_path(model_name: str, fingerprint: str) -> str:
+    return os.path.join(WEIGHTS_DIR, f"{model_name.strip('/').replace('/', '--')}-{fingerprint}.pt")
+
+
+def export_weights(model_name: str) -> str:
+    """Write the model's state dict to WEIGHTS_DIR once per checkpoint; concurrent
+    workers wait on a file lock. A new upstream revision or rewritten local
+    weights get a new export, and the old ones are removed"""
+    prefix = os.path.join(WEIGHTS_DIR, model_name.strip("/").replace("/", "--"))
+    path = export_path(model_name, checkpoint_fingerprint(model_name))
+    os.makedirs(WEIGHTS_DIR, exist_ok=True)
+    with open(prefix + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            model = AutoModelForCausalLM.from_pretrained(model_name)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            torch.save(model.state_dict(), tmp_path)
+            os.replace(tmp_path, path)
+            # Workers still mapping an old export keep it until they unmap it
+            for stale in glob.glob(glob.escape(prefix) + "-*.pt"):
+                if stale != path:
+                    os.remove(stale)
+    return path
+
+
+def load_mmap(model_name: str) -> PreTrainedModel:
+    """Build the model around memory-mapped weights instead of private copies"""
+    path = export_weights(model_name)
+    config = AutoConfig.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_config(config)
+    state_dict = torch.load(path, mmap=True, weights_only=True)
+    # assign=True makes the parameters the mmapped tensors themselves; the
+    # randomly initialised ones are released
+    model.load_state_dict(state_dict, assign=True)
+    model.tie_weights()
+    return model.eval()
+
+
+def load_model(model_name: str, device: str = "cpu") -> PreTrainedModel:
+    if WEIGHT_LOADING == "mmap" and device == "cpu":
+        return load_mmap(model_name)
+    model = AutoModelForCausalLM.from_pretrained(model_name)
+    return model.to(device).eval()
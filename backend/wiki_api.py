@@ -0,0 +1,90 @@
+from urllib.parse import quote
+
+import aiohttp
+
+REST_URL = "https://{lang}.wikipedia.org/api/rest_v1/page/summary/{title}"
+ACTION_URL = "https://{lang}.wikipedia.org/w/api.php"
+
+# The action API returns plain-text extracts for at most this many pages per request
+MAX_EXTRACTS = 20
+
+# First sentence of a disambiguation page, which is never a useful answer
+DISAMBIGUATION = ("may refer to", "can refer to", "puede referirse a", "peut faire référence à", "peut désigner",
+                  "steht für", "bezeichnet", "pode referir-se a", "può riferirsi a", "può indicare")
+
+
+async def fetch_summary(session: aiohttp.ClientSession, lang: str, title: str, timeout: float,
+                        url: str = REST_URL) -> tuple:
+    """(status, extract) from the REST summary endpoint for one title"""
+    page_url = url.format(lang=lang, title=quote(title.replace(' ', '_'), safe=''))
+    async with session.get(page_url, timeout=timeout) as response:
+        if response.status != 200:
+            return response.status, None
+        data = await response.json(content_type=None)
+        if data.get('extract'):
+            return response.status, data['extract'][:500]
+        if data.get('description'):
+            return response.status, data['description'][:300]
+        return response.status, None
+
+
+def extracts_params(titles: list) -> dict:
+    return {
+        "action": "query",
+        "prop": "extracts",
+        "exintro": "1",
+        "explaintext": "1",
+        "exlimit": str(len(titles)),
+        "redirects": "1",
+        "titles": "|".join(titles),
+        "format": "json",
+        "formatversion": "2"
+    }
+
+
+async def fetch_extracts(session: aiohttp.ClientSession, lang: str, titles: list, timeout: float,
+                         url: str = ACTION_URL) -> dict:
+    """Intro extracts of up to MAX_EXTRACTS titles in one action=query request"""
+    # "|" separates titles and cannot occur in one
+    titles = [title for title in titles if "|" not in title][:MAX_EXTRACTS]
+    if not titles:
+        return {}
+    async with session.get(url.format(lang=lang), params=extracts_params(titles), timeout=timeout) as response:
+        if response.status != 200:
+            return {}
+        return await response.json(content_type=None)
+
+
+def resolve_titles(data: dict, titles: list) -> dict:
+    """Map each requested title to the page it ends up at after normalisation and redirects"""
+    query = data.get("query", {})
+    normalized = {item["from"]: item["to"] for item in query.get("normalized", [])}
+    redirects = {item["from"]: item["to"] for item in query.get("redirects", [])}
+    resolved = {}
+    for title in titles:
+        final = normalized.get(title, title)
+        seen = set()
+        while final in redirects and final not in seen:
+            seen.add(final)
+            final = redirects[final]
+        resolved[title] = final
+    return resolved
+
+
+def best_extract(data: dict, titles: list, max_chars: int = 500):
+    """(page title, extract) for the first of ``titles`` with a real article, or None.
+
+    ``titles`` are in order of preference, so the most specific candidate
+    wins; missing pages and disambiguation pages are skipped.
+    """
+    pages = {page.get("title"): page for page in data.get("query", {}).get("pages", [])}
+    resolved = resolve_titles(data, titles)
+    for title in titles:
+        page = pages.get(resolved[title])
+        if page is None or page.get("missing") or page.get("invalid"):
+            continue
+        extract = (page.get("extract") or "").strip()
+        if not extract or any(marker in extract[:200].lower() for marker in DISAMBIGUATION):
+            continue
+        return page["title"], extract[:max_chars]
+    return None
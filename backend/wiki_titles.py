@@ -0,0 +1,180 @@
+import gzip
+import hashlib
+import re
+import unicodedata
+
+import numpy as np
+
+from semantic_cache import STOPWORDS
+
+_TOKEN = re.compile(r"\w+")
+
+# Longest span of query words tried against the title index
+MAX_TITLE_WORDS = 6
+
+# Verbs that frame a question ("who invented the telephone") and are never
+# the topic; on top of the semantic cache stopwords
+QUESTION_VERBS = {
+    'english': {'invented', 'invent', 'discovered', 'discover', 'founded', 'wrote', 'written', 'created', 'made',
+                'built', 'mean', 'means', 'meaning', 'work', 'works', 'happened', 'located', 'born', 'died',
+                'called', 'known', 'explain', 'define', 'describe', 'know', 'could', 'would', 'should', 'has', 'have'},
+    'spanish': {'inventó', 'descubrió', 'fundó', 'escribió', 'creó', 'significa', 'funciona', 'nació', 'murió',
+                'llama', 'explica', 'háblame', 'dime', 'sabes'},
+    'french': {'inventé', 'découvert', 'fondé', 'écrit', 'créé', 'signifie', 'fonctionne', 'né', 'mort',
+               'appelle', 'explique', 'parle', 'dis', 'sais', 'a'},
+    'german': {'erfunden', 'entdeckt', 'gegründet', 'geschrieben', 'erschaffen', 'bedeutet', 'funktioniert',
+               'geboren', 'gestorben', 'heißt', 'erkläre', 'erzähl', 'erzähle', 'hat', 'weißt'},
+    'portuguese': {'inventou', 'descobriu', 'fundou', 'escreveu', 'criou', 'significa', 'funciona', 'nasceu',
+                   'morreu', 'chama', 'explique', 'fale', 'diga', 'sabe'},
+    'italian': {'inventato', 'scoperto', 'fondato', 'scritto', 'creato', 'significa', 'funziona', 'nato', 'morto',
+                'chiama', 'spiega', 'parlami', 'dimmi', 'sai', 'ha'}
+}
+
+
+def tokenize(text: str) -> list:
+    """Lower-cased word tokens; underscores separate words, as in dump titles"""
+    text = unicodedata.normalize("NFC", text.replace("_", " ")).casefold()
+    return _TOKEN.findall(text)
+
+
+def title_key(text: str) -> str:
+    """Form shared by page titles and queries: 'Eiffel_Tower' and 'eiffel tower?' agree"""
+    return " ".join(tokenize(text))
+
+
+def _stopwords(language: str) -> set:
+    return STOPWORDS.get(language, STOPWORDS['english']) | QUESTION_VERBS.get(language, QUESTION_VERBS['english'])
+
+
+def _content_span(words: list, stopwords: set) -> list:
+    start, end = 0, len(words)
+    while start < end and words[start] in stopwords:
+        start += 1
+    while end > start and words[end - 1] in stopwords:
+        end -= 1
+    return words[start:end]
+
+
+def clean_query(query: str, language: str = 'english') -> str:
+    """The query without leading or trailing question and filler words.
+
+    Works on whole tokens, so "somewhat" keeps its "what".
+    """
+    return " ".join(_content_span(tokenize(query), _stopwords(language)))
+
+
+def query_candidates(query: str, language: str = 'english') -> list:
+    """Keys of the spans of a query that could be a page title, most specific first.
+
+    Spans never start or end with a stopword or question verb, so "what is
+    the capital of france" yields "capital of france", "capital", "france"
+    (longest first, then left to right).
+    """
+    stopwords = _stopwords(language)
+    words = _content_span(tokenize(query), stopwords)
+    candidates = []
+    for length in range(min(len(words), MAX_TITLE_WORDS), 0, -1):
+        for start in range(len(words) - length + 1):
+            span = words[start:start + length]
+            if span[0] in stopwords or span[-1] in stopwords:
+                continue
+            candidates.append(" ".join(span))
+    return candidates
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _open(path: str):
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8")
+
+
+class TitleIndex:
+    """Local map from normalised queries to canonical Wikipedia page titles.
+
+    Loaded from the ``<lang>wiki-latest-all-titles-in-ns0.gz`` dumps, plus
+    optional ``source<TAB>target`` redirect files so redirects resolve to the
+    target page directly. Each language is stored as a sorted array of 64-bit
+    key hashes with the titles packed into one bytes blob, which keeps
+    millions of titles at roughly 16 bytes plus the title length each.
+    """
+
+    def __init__(self):
+        self.languages = {}
+
+    def load(self, lang_code: str, titles_path: str, redirects_path: str = None) -> int:
+        """Build the index for one language; returns the number of keys"""
+        hashes, titles = [], []
+        # Redirects go first so they win over the redirect page's own title
+        if redirects_path:
+            with _open(redirects_path) as f:
+                for line in f:
+                    source, _, target = line.rstrip("\n").partition("\t")
+                    if target:
+                        hashes.append(_hash(title_key(source)))
+                        titles.append(target.replace("_", " "))
+        with _open(titles_path) as f:
+            for line in f:
+                title = line.rstrip("\n")
+                if title and title != "page_title":
+                    hashes.append(_hash(title_key(title)))
+                    titles.append(title.replace("_", " "))
+
+        keys = np.array(hashes, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        # Keep the first title for each key
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        order = order[first]
+        encoded = [titles[i].encode("utf-8") for i in order]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(title) for title in encoded], out=offsets[1:])
+        self.languages[lang_code] = (keys[first], offsets, b"".join(encoded))
+        return len(encoded)
+
+    def has(self, lang_code: str) -> bool:
+        return lang_code in self.languages
+
+    def lookup(self, lang_code: str, key: str):
+        keys, offsets, blob = self.languages[lang_code]
+        h = np.uint64(_hash(key))
+        i = int(np.searchsorted(keys, h))
+        if i < len(keys) and keys[i] == h:
+            return blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+        return None
+
+    def resolve(self, lang_code: str, candidates: list):
+        """Canonical title for the first candidate key that is a page, or None"""
+        for key in candidates:
+            title = self.lookup(lang_code, key)
+            if title is not None:
+                return title
+        return None
+
+    def resolve_all(self, lang_code: str, candidates: list, limit: int) -> list:
+        """Distinct canonical titles for up to ``limit`` candidate keys that are pages"""
+        titles = []
+        for key in candidates:
+            title = self.lookup(lang_code, key)
+            if title is not None and title not in titles:
+                titles.append(title)
+                if len(titles) == limit:
+                    break
+        return titles
+
+    def stats(self) -> dict:
+        return {
+            lang_code: {"titles": len(keys), "bytes": keys.nbytes + offsets.nbytes + len(blob)}
+            for lang_code, (keys, offsets, blob) in self.languages.items()
+        }
+
+
+def parse_paths(spec: str) -> dict:
+    """Parse ``en=/data/enwiki-titles.gz,es=/data/eswiki-titles.gz`` into a dict"""
+    paths = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        lang_code, _, path = item.partition("=")
+        paths[lang_code.strip()] = path.strip()
+    return paths